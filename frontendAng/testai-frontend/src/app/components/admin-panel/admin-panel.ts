@@ -2,7 +2,7 @@ import { Component, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { AuthService, User } from '../../services/auth.service';
-import { AdminService, JobConfig as JobCfg } from '../../services/admin.service';
+import { AdminService, JobConfig as JobCfg, StoredReport } from '../../services/admin.service';
 import { DocumentService } from '../../services/document.service';
 
 
@@ -34,10 +34,12 @@ export interface Document {
   styleUrls: ['./admin-panel.scss']
 })
 export class AdminPanelComponent implements OnInit {
-  async downloadInterviewReportPdf(): Promise<void> {
+  async downloadInterviewReportPdf(sessionId?: string): Promise<void> {
     try {
-      // Get the markdown content and clean it
-      const md = await this.adminService.getReportMarkdown();
+      // Get the markdown content and clean it (dernier rapport si aucune session n'est choisie)
+      const md = sessionId
+        ? await this.adminService.getStoredReport(sessionId).then(r => ({ content: r.content || '', modified: r.finished || r.created }))
+        : await this.adminService.getReportMarkdown();
       const cleanedContent = this.cleanMarkdownContent(md.content);
       const reportDate = new Date(md.modified * 1000).toLocaleDateString('fr-FR');
       const fileName = `rapport_entretien_${new Date(md.modified * 1000).toISOString().split('T')[0]}.html`;
@@ -221,6 +223,12 @@ export class AdminPanelComponent implements OnInit {
   };
 
 
+  // Rapports d'entretien stockés par session (paginés)
+  reports: StoredReport[] = [];
+  reportsTotal = 0;
+  reportsOffset = 0;
+  readonly reportsPageSize = 10;
+
   // Onglet actif
   activeTab = 'config';
 
@@ -232,6 +240,18 @@ export class AdminPanelComponent implements OnInit {
     this.loadJobConfig();
     // Charger la liste des documents du dossier knowledge/
     this.refreshKnowledgeList();
+    this.loadReports();
+  }
+
+  async loadReports(offset = this.reportsOffset): Promise<void> {
+    try {
+      const page = await this.adminService.listReports(offset, this.reportsPageSize);
+      this.reports = page.items;
+      this.reportsTotal = page.total;
+      this.reportsOffset = offset;
+    } catch (e: any) {
+      this.showNotification(e?.message || 'Erreur lors du chargement des rapports', 'error');
+    }
   }
 
   // Méthodes d'authentification et permissions
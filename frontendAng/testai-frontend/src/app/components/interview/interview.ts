@@ -32,6 +32,8 @@ export class InterviewComponent implements OnInit {
   loading: boolean = false;
   backendError: string = '';
   currentBackendQuestion: string | null = null;
+  // Position dans la file d'attente tant que l'entretien n'a pas démarré côté serveur
+  queuePosition: number | null = null;
 
   // Questions par phase (remplies dynamiquement depuis le backend)
   questions: { technical: InterviewQuestion[]; softSkills: InterviewQuestion[] } = {
@@ -89,6 +91,7 @@ export class InterviewComponent implements OnInit {
         offer_soft_skills: [],
       });
       this.sessionId = res.session_id;
+      this.queuePosition = res.position ?? null;
       this.interviewStarted = true;
       // Démarrer par la phase d'introduction (1 seule question)
       this.currentPhase = 'intro';
@@ -191,20 +194,29 @@ export class InterviewComponent implements OnInit {
   }
 
   private pendingQuestion: string | null = null;
+  // Dernier `seq` vu côté backend, pour le long-polling
+  private lastQuestionSeq = -1;
+  private readonly longPollSeconds = 25;
 
   // Méthode pour récupérer la prochaine question après une réponse
   private async fetchNextQuestion() {
     if (!this.sessionId) return;
     
-    // Petite temporisation pour laisser le backend traiter la réponse
-    await new Promise(resolve => setTimeout(resolve, 100));
-    
     let retryCount = 0;
-    const maxRetries = 20; // Maximum 10 secondes d'attente
-    
+    const maxRetries = 20; // long-polling: jusqu'à 20 x 25 secondes d'attente
+
     while (retryCount < maxRetries) {
-      const res = await this.interviewService.getQuestion(this.sessionId);
-      
+      // Le backend garde la requête ouverte jusqu'à la prochaine question
+      const res = await this.interviewService.getQuestion(this.sessionId, { wait: this.longPollSeconds, after: this.lastQuestionSeq });
+      if (res.seq !== undefined) this.lastQuestionSeq = res.seq;
+      this.queuePosition = res.status === 'queued' ? (res.position ?? null) : null;
+
+      if (res.status === 'queued') {
+        // En file d'attente: ne compte pas comme un échec
+        this.cdr.detectChanges();
+        continue;
+      }
+
       if (res.status === 'question' && res.question) {
         // Vérifier que ce n'est pas la même question que la précédente
         if (this.pendingQuestion !== res.question) {
@@ -245,8 +257,6 @@ export class InterviewComponent implements OnInit {
         return;
       }
       
-      // Attendre avant de réessayer
-      await new Promise(resolve => setTimeout(resolve, 500));
       retryCount++;
     }
     
@@ -256,7 +266,9 @@ export class InterviewComponent implements OnInit {
 
   private async fetchQuestion() {
     if (!this.sessionId) return;
-    const res = await this.interviewService.getQuestion(this.sessionId);
+    const res = await this.interviewService.getQuestion(this.sessionId, { wait: this.longPollSeconds, after: this.lastQuestionSeq });
+    if (res.seq !== undefined) this.lastQuestionSeq = res.seq;
+    this.queuePosition = res.status === 'queued' ? (res.position ?? null) : null;
     if (res.status === 'question' && res.question) {
       // Dédupliquer si on reçoit deux fois la même question
       if (this.pendingQuestion === res.question) {
@@ -273,9 +285,10 @@ export class InterviewComponent implements OnInit {
       }
       // Force change detection in zoneless mode so UI updates immediately
       this.cdr.detectChanges();
-    } else if (res.status === 'waiting') {
-      // Petite temporisation avant re-poll + tenter de rafraîchir si une question était en vol
-      setTimeout(() => this.fetchQuestion(), 500);
+    } else if (res.status === 'waiting' || res.status === 'queued') {
+      // Long-poll expiré sans nouvelle question: on relance immédiatement
+      this.cdr.detectChanges();
+      this.fetchQuestion();
     } else if (res.status === 'done') {
       this.currentPhase = 'conclusion';
       // L'entretien est terminé, le rapport sera généré automatiquement par le crew AI
@@ -362,7 +375,7 @@ export class InterviewComponent implements OnInit {
     } catch {}
   }
 
-  // Rapport généré automatiquement par l'AI crew dans interview_report.md
+  // Rapport généré automatiquement par l'AI crew et stocké par session (runtime/reports)
 
   restartInterview() {
     this.initializeInterview();
@@ -2,6 +2,18 @@ import { Injectable } from '@angular/core';
 import { HttpClient } from '@angular/common/http';
 import { firstValueFrom } from 'rxjs';
 
+export interface StoredReport {
+  session_id: string;
+  role_title: string;
+  candidate_name: string;
+  status: 'running' | 'done' | 'error';
+  created: number;
+  finished: number | null;
+  report_size: number;
+  has_analysis: boolean;
+  error: string | null;
+}
+
 export interface JobConfig {
   title: string;
   department: string;
@@ -31,9 +43,19 @@ export class AdminService {
     return firstValueFrom(this.http.put<{ ok: boolean }>(`${this.baseUrl}/admin/job-config`, cfg));
   }
 
+  // Dernier rapport terminé (tous entretiens confondus)
   getReportMarkdown(): Promise<{ name: string; modified: number; size: number; content: string }>{
     return firstValueFrom(this.http.get<{ name: string; modified: number; size: number; content: string }>(`${this.baseUrl}/admin/report/md`));
   }
 
+  // Rapports stockés par session, du plus récent au plus ancien
+  listReports(offset = 0, limit = 20): Promise<{ total: number; offset: number; limit: number; items: StoredReport[] }>{
+    return firstValueFrom(this.http.get<{ total: number; offset: number; limit: number; items: StoredReport[] }>(`${this.baseUrl}/admin/reports`, { params: { offset: String(offset), limit: String(limit) } }));
+  }
+
+  getStoredReport(sessionId: string): Promise<StoredReport & { content: string | null; analysis: any }>{
+    return firstValueFrom(this.http.get<StoredReport & { content: string | null; analysis: any }>(`${this.baseUrl}/admin/reports/${sessionId}`));
+  }
+
 }
 
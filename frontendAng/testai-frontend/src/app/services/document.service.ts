@@ -13,10 +13,15 @@ export class DocumentService {
     return 'http://localhost:8000/api';
   }
 
-  upload(file: File): Promise<{ saved: string }>{
+  upload(file: File): Promise<{ saved: string; job_id?: string; status?: string }>{
     const form = new FormData();
     form.append('file', file, file.name);
-    return firstValueFrom(this.http.post<{ saved: string }>(`${this.baseUrl}/admin/upload`, form));
+    return firstValueFrom(this.http.post<{ saved: string; job_id?: string; status?: string }>(`${this.baseUrl}/admin/upload`, form));
+  }
+
+  // PDF/DOCX text extraction runs in the background after upload
+  uploadStatus(jobId: string): Promise<{ job_id: string; status: 'queued' | 'running' | 'done' | 'error'; chars: number; error?: string | null }>{
+    return firstValueFrom(this.http.get<{ job_id: string; status: 'queued' | 'running' | 'done' | 'error'; chars: number; error?: string | null }>(`${this.baseUrl}/admin/upload/${encodeURIComponent(jobId)}`));
   }
 
   reindex(): Promise<{ ok: boolean }>{
@@ -20,12 +20,18 @@ export class InterviewService {
     offer_tech_skills?: string[];
     offer_education?: string;
     offer_soft_skills?: string[];
-  }): Promise<{ session_id: string }> {
-    return firstValueFrom(this.http.post<{ session_id: string }>(`${this.baseUrl}/start`, payload));
+  }): Promise<{ session_id: string; position?: number }> {
+    return firstValueFrom(this.http.post<{ session_id: string; position?: number }>(`${this.baseUrl}/start`, payload));
   }
 
-  getQuestion(sessionId: string): Promise<{ status: 'waiting' | 'question' | 'done' | 'error'; question?: string; message?: string }>{
-    return firstValueFrom(this.http.get<{ status: 'waiting' | 'question' | 'done' | 'error'; question?: string; message?: string }>(`${this.baseUrl}/${sessionId}/question`));
+  // Long-poll: with `wait` (seconds) the backend holds the request until a question newer
+  // than `after` (the last seen `seq`) is available, the interview ends, or the wait expires.
+  // `queued` + `position`: the session is waiting for a free interview slot.
+  getQuestion(sessionId: string, opts: { wait?: number; after?: number } = {}): Promise<{ status: 'queued' | 'waiting' | 'question' | 'done' | 'error'; question?: string; message?: string; seq?: number; position?: number }>{
+    const params: Record<string, string> = {};
+    if (opts.wait) params['wait'] = String(opts.wait);
+    if (opts.after !== undefined) params['after'] = String(opts.after);
+    return firstValueFrom(this.http.get<{ status: 'queued' | 'waiting' | 'question' | 'done' | 'error'; question?: string; message?: string; seq?: number; position?: number }>(`${this.baseUrl}/${sessionId}/question`, { params }));
   }
 
   sendAnswer(sessionId: string, answer: string): Promise<{ ok: boolean }>{
@@ -0,0 +1,230 @@
+"""Load generator for the web backend: N simulated candidates taking interviews at once.
+
+Each virtual candidate starts a session, long-polls ``/question``, waits a think time
+and posts a scripted answer until the interview is done. The run reports sessions per
+minute, question latency percentiles (answer acknowledged -> next question visible) and
+error rates. Run it against a backend pointed at the stub model for repeatable numbers:
+
+    python -m testai.bench.stub_server --latency lognormal:0.8,0.4 &
+    LLM_API_BASE=http://127.0.0.1:8765 python -m testai.web.backend &
+    python -m testai.bench.loadtest --sessions 50 --concurrency 20 --think uniform:2,6
+"""
+from __future__ import annotations
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from testai.bench.stats import summarize
+from testai.bench.stub_server import LatencyModel
+
+DEFAULT_ANSWERS = [
+    "Je procéderais d'abord à une clarification du besoin, puis j'expliquerais les principes clés "
+    "avec un exemple concret tiré de mon expérience.",
+    "Dans mon dernier projet, j'ai mis en place cette approche : contexte, actions menées et résultat "
+    "mesuré, avec les enseignements que j'en ai tirés.",
+    "J'ai rencontré cette situation en équipe ; j'ai proposé une solution, aligné les parties prenantes "
+    "et suivi les résultats jusqu'à la mise en production.",
+]
+
+
+class ScriptedCandidate:
+    """Answer map like ``SimulatedCandidateTool``: exact question, then keyword match,
+    then a generic answer (varied per session so prompts are not all identical)."""
+
+    def __init__(self, answers: Optional[Dict[str, str]] = None, seed: Optional[int] = None) -> None:
+        self.answers = answers or {}
+        self._rng = random.Random(seed)
+
+    def answer(self, question: str) -> str:
+        if question in self.answers:
+            return self.answers[question]
+        low = question.lower()
+        for key, answer in self.answers.items():
+            if key.lower() in low:
+                return answer
+        return self._rng.choice(DEFAULT_ANSWERS)
+
+
+@dataclass
+class SessionResult:
+    session_id: Optional[str] = None
+    status: str = "pending"  # done | error | rejected | timeout | failed
+    error: Optional[str] = None
+    started: float = 0.0
+    finished: float = 0.0
+    queue_wait: Optional[float] = None
+    first_question: Optional[float] = None
+    questions: int = 0
+    # Answer acknowledged -> next question (or end of interview) visible
+    question_latencies: List[float] = field(default_factory=list)
+    answer_latencies: List[float] = field(default_factory=list)
+
+
+@dataclass
+class LoadTestConfig:
+    base_url: str = "http://127.0.0.1:8000"
+    sessions: int = 10
+    concurrency: int = 5
+    think: str = "uniform:1,3"
+    wait: float = 25.0
+    session_timeout: float = 1800.0
+    ramp_up: float = 0.0
+    role_title: str = "Load Test"
+    answers: Dict[str, str] = field(default_factory=dict)
+    seed: Optional[int] = None
+
+
+class LoadTest:
+    def __init__(self, config: LoadTestConfig) -> None:
+        self.config = config
+        self.think = LatencyModel(config.think, seed=config.seed)
+        self.results: List[SessionResult] = []
+
+    async def _session(self, client: httpx.AsyncClient, index: int) -> SessionResult:
+        cfg = self.config
+        res = SessionResult(started=time.perf_counter())
+        candidate = ScriptedCandidate(cfg.answers, seed=None if cfg.seed is None else cfg.seed + index)
+        payload = {
+            "role_title": cfg.role_title,
+            "candidate_name": f"Candidat {index + 1}",
+            "offer_tech_skills": ["Python", "FastAPI"],
+            "offer_soft_skills": ["Communication"],
+        }
+        r = await client.post("/api/interview/start", json=payload)
+        if r.status_code == 503:
+            res.status, res.error = "rejected", r.json().get("detail")
+            return res
+        r.raise_for_status()
+        res.session_id = r.json()["session_id"]
+        seq, answered_at, queued = -1, None, True
+        deadline = res.started + cfg.session_timeout
+        while time.perf_counter() < deadline:
+            r = await client.get(f"/api/interview/{res.session_id}/question",
+                                 params={"wait": cfg.wait, "after": seq})
+            r.raise_for_status()
+            state = r.json()
+            now = time.perf_counter()
+            status = state.get("status")
+            if status != "queued" and queued:
+                queued = False
+                res.queue_wait = now - res.started
+            if state.get("seq", seq) <= seq or status in ("queued", "waiting"):
+                seq = max(seq, state.get("seq", seq))
+                continue
+            seq = state["seq"]
+            if answered_at is not None:
+                res.question_latencies.append(now - answered_at)
+                answered_at = None
+            if status in ("done", "error"):
+                res.status, res.error = status, state.get("message")
+                break
+            if status == "question":
+                res.questions += 1
+                if res.first_question is None:
+                    res.first_question = now - res.started
+                await asyncio.sleep(self.think.sample())
+                t0 = time.perf_counter()
+                r = await client.post(f"/api/interview/{res.session_id}/answer",
+                                      json={"answer": candidate.answer(state.get("question") or "")})
+                if r.status_code == 409:  # finished while the candidate was typing
+                    res.status = "done"
+                    break
+                r.raise_for_status()
+                answered_at = time.perf_counter()
+                res.answer_latencies.append(answered_at - t0)
+        else:
+            res.status = "timeout"
+        return res
+
+    async def _worker(self, client: httpx.AsyncClient, queue: "asyncio.Queue[int]") -> None:
+        while True:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            if self.config.ramp_up and self.config.sessions > 1:
+                # Spread session starts over the ramp-up period
+                delay = self.config.ramp_up * index / (self.config.sessions - 1)
+                await asyncio.sleep(max(0.0, delay - (time.perf_counter() - self._t0)))
+            started = time.perf_counter()
+            try:
+                res = await self._session(client, index)
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                res = SessionResult(status="failed", error=f"{type(e).__name__}: {e}", started=started)
+            res.finished = time.perf_counter()
+            self.results.append(res)
+            print(f"[loadtest] session {index + 1}/{self.config.sessions} {res.status} "
+                  f"questions={res.questions} in {res.finished - res.started:.1f}s")
+
+    async def run(self) -> dict:
+        cfg = self.config
+        queue: "asyncio.Queue[int]" = asyncio.Queue()
+        for i in range(cfg.sessions):
+            queue.put_nowait(i)
+        limits = httpx.Limits(max_connections=cfg.concurrency * 2, max_keepalive_connections=cfg.concurrency * 2)
+        timeout = httpx.Timeout(cfg.wait + 30.0, connect=10.0)
+        self._t0 = time.perf_counter()
+        async with httpx.AsyncClient(base_url=cfg.base_url, limits=limits, timeout=timeout) as client:
+            await asyncio.gather(*(self._worker(client, queue) for _ in range(max(1, cfg.concurrency))))
+        return self.report(time.perf_counter() - self._t0)
+
+    def report(self, elapsed: float) -> dict:
+        by_status: Dict[str, int] = {}
+        for r in self.results:
+            by_status[r.status] = by_status.get(r.status, 0) + 1
+        done = by_status.get("done", 0)
+        total = len(self.results) or 1
+        return {
+            "config": {k: v for k, v in asdict(self.config).items() if k != "answers"},
+            "elapsed_s": round(elapsed, 3),
+            "sessions": by_status,
+            "sessions_per_minute": round(done / elapsed * 60.0, 3) if elapsed > 0 else None,
+            "error_rate": round((total - done) / total, 4),
+            "question_latency_s": summarize([x for r in self.results for x in r.question_latencies]),
+            "first_question_s": summarize([r.first_question for r in self.results if r.first_question is not None]),
+            "queue_wait_s": summarize([r.queue_wait for r in self.results if r.queue_wait is not None]),
+            "answer_post_s": summarize([x for r in self.results for x in r.answer_latencies]),
+            "errors": [r.error for r in self.results if r.error][:20],
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Load-test the interview backend with simulated candidates.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--sessions", type=int, default=10, help="interviews to run in total")
+    parser.add_argument("--concurrency", type=int, default=5, help="candidates active at the same time")
+    parser.add_argument("--think", default="uniform:1,3", help="think time per answer (stub_server latency syntax)")
+    parser.add_argument("--wait", type=float, default=25.0, help="long-poll wait per request (s)")
+    parser.add_argument("--session-timeout", type=float, default=1800.0)
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="spread session starts over this many seconds")
+    parser.add_argument("--role", default="Load Test")
+    parser.add_argument("--answers", help="JSON file mapping question (or keyword) -> answer")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_out", help="also write the report to this file")
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+    answers = {}
+    if args.answers:
+        with open(args.answers, encoding="utf-8") as f:
+            answers = json.load(f)
+    config = LoadTestConfig(
+        base_url=args.url, sessions=args.sessions, concurrency=args.concurrency, think=args.think,
+        wait=args.wait, session_timeout=args.session_timeout, ramp_up=args.ramp_up,
+        role_title=args.role, answers=answers, seed=args.seed,
+    )
+    report = asyncio.run(LoadTest(config).run())
+    out = json.dumps(report, ensure_ascii=False, indent=2)
+    print(out)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+"""RAG index benchmark over synthetic corpora of increasing size.
+
+For each corpus (mixed .txt/.md, Zipf-distributed vocabulary, generated once per seed
+and size) and each backend/scoring combination, a fresh process measures:
+
+- cold ``build()`` wall time and peak RSS (next to the RSS after imports; ingest workers
+  reported separately)
+- reload from the persisted index and no-op refresh time
+- persisted index size, chunk and term counts
+- ``search()`` latency percentiles and ``search_many()`` throughput over a query set
+  mixing keyword, natural-language and passage queries
+
+Results are written as JSON; ``--baseline`` compares them with an earlier run:
+
+    python -m testai.bench.rag_bench --sizes 1MB,10MB,100MB --json runtime/rag_bench/latest.json
+    python -m testai.bench.rag_bench --sizes 1MB,10MB --baseline runtime/rag_bench/latest.json
+"""
+from __future__ import annotations
+import os
+import re
+import sys
+import json
+import time
+import queue
+import random
+import shutil
+import argparse
+import platform
+import itertools
+import multiprocessing
+from typing import List, Optional, Tuple
+
+from testai.bench.stats import summarize
+
+RESULT_FORMAT = 1
+BENCH_DIR = os.path.join("runtime", "rag_bench")
+
+_UNITS = {"KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+TECH_TERMS = (
+    "python fastapi django flask asyncio pydantic sqlalchemy postgresql mysql redis kafka rabbitmq "
+    "docker kubernetes helm terraform ansible nginx linux bash git gitlab github jenkins ci cd pytest "
+    "unittest mock api rest graphql grpc http oauth jwt tls cache index query transaction isolation "
+    "replication sharding partition latency throughput scalability microservices monolith queue worker "
+    "thread process coroutine event loop memory garbage collector profiling logging monitoring "
+    "prometheus grafana opentelemetry tracing metrics alerting angular typescript javascript rxjs "
+    "component service module routing observable signal test coverage refactoring solid design pattern "
+    "singleton factory observer strategy dependency injection interface abstraction inheritance "
+    "polymorphism encapsulation algorithm complexity hash tree graph sort search recursion dynamic "
+    "programming security injection xss csrf encryption hashing salt backup recovery deployment rollback "
+    "canary feature flag agile scrum sprint review retrospective documentation"
+).split()
+
+_QUERY_TEMPLATES = (
+    "Comment configurer {a} avec {b} ?",
+    "Quelle est la différence entre {a} et {b} ?",
+    "Expliquez le rôle de {a} dans une architecture {b}",
+    "Bonnes pratiques {a} {b} en production",
+    "Comment optimiser {a} pour réduire la latence de {b} ?",
+)
+
+
+def parse_size(text: str) -> int:
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]B)?\s*", text.upper())
+    if not m:
+        raise ValueError(f"Invalid size {text!r} (expected e.g. 512KB, 10MB, 1GB)")
+    return int(float(m.group(1)) * _UNITS.get(m.group(2) or "", 1))
+
+
+def size_label(n: int) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if n >= _UNITS[unit] and n % _UNITS[unit] == 0:
+            return f"{n // _UNITS[unit]}{unit}"
+    return f"{n}B"
+
+
+class CorpusGenerator:
+    """Deterministic synthetic knowledge base: Zipf word frequencies over real tech terms
+    plus generated words, a vocabulary growing with the corpus (Heaps' law), files of
+    log-normal size (60% Markdown with headings and lists, 40% plain text) in nested dirs."""
+
+    SYLLABLES = "ba be bi bo bu da de di do du ka ke ki ko ku la le li lo lu ma me mi mo mu na ne ni no nu " \
+                "ra re ri ro ru sa se si so su ta te ti to tu va ve vi vo vu za ze zi zo zu".split()
+
+    def __init__(self, total_bytes: int, seed: int = 42, mean_file_kb: float = 24.0) -> None:
+        self.total_bytes = total_bytes
+        self.seed = seed
+        self.mean_file_kb = mean_file_kb
+        rng = random.Random(seed)
+        words = max(1000, total_bytes // 7)
+        vocab_size = max(5000, int(40 * words ** 0.5))
+        vocab = list(TECH_TERMS)
+        seen = set(vocab)
+        while len(vocab) < vocab_size:
+            w = "".join(rng.choice(self.SYLLABLES) for _ in range(rng.randint(2, 4)))
+            if w not in seen:
+                seen.add(w)
+                vocab.append(w)
+        # Tech terms keep frequent ranks, like the vocabulary of a real technical corpus
+        head, tail = vocab[:len(TECH_TERMS)], vocab[len(TECH_TERMS):]
+        rng.shuffle(head)
+        self.vocab = head[:40] + tail[:200] + head[40:] + tail[200:]
+        self._cum = list(itertools.accumulate(1.0 / (r + 1) ** 1.07 for r in range(len(self.vocab))))
+
+    def words(self, rng: random.Random, n: int) -> List[str]:
+        return rng.choices(self.vocab, cum_weights=self._cum, k=n)
+
+    def _paragraph(self, rng: random.Random) -> str:
+        sentences = []
+        for _ in range(rng.randint(2, 6)):
+            w = self.words(rng, rng.randint(6, 18))
+            sentences.append(" ".join(w).capitalize() + ".")
+        return " ".join(sentences)
+
+    def _document(self, rng: random.Random, target: int, markdown: bool) -> str:
+        parts: List[str] = []
+        size = 0
+        if markdown:
+            parts.append("# " + " ".join(self.words(rng, 4)).title())
+        while size < target:
+            if markdown and rng.random() < 0.2:
+                block = "## " + " ".join(self.words(rng, 3)).title()
+            elif markdown and rng.random() < 0.15:
+                block = "\n".join("- " + " ".join(self.words(rng, rng.randint(3, 8))) for _ in range(rng.randint(2, 5)))
+            else:
+                block = self._paragraph(rng)
+            parts.append(block)
+            size += len(block) + 2
+        return "\n\n".join(parts) + "\n"
+
+    def generate(self, root: str) -> dict:
+        """Write the corpus under ``root`` unless a matching one is already there."""
+        manifest_path = os.path.join(root, "corpus.json")
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("seed") == self.seed and manifest.get("target_bytes") == self.total_bytes:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        shutil.rmtree(root, ignore_errors=True)
+        rng = random.Random(self.seed)
+        written, files, t0 = 0, 0, time.perf_counter()
+        while written < self.total_bytes:
+            target = min(self.total_bytes - written,
+                         max(512, int(rng.lognormvariate(0, 0.8) * self.mean_file_kb * 1024)))
+            markdown = rng.random() < 0.6
+            sub = os.path.join(root, f"d{files // 100:04d}")
+            os.makedirs(sub, exist_ok=True)
+            data = self._document(rng, target, markdown).encode("utf-8")
+            with open(os.path.join(sub, f"doc{files:06d}.{'md' if markdown else 'txt'}"), "wb") as f:
+                f.write(data)
+            written += len(data)
+            files += 1
+        manifest = {"seed": self.seed, "target_bytes": self.total_bytes, "bytes": written, "files": files,
+                    "vocab": len(self.vocab), "generated_s": round(time.perf_counter() - t0, 3)}
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        return manifest
+
+    def queries(self, root: str, n: int, seed: int = 7) -> List[str]:
+        """Query set: 40% keywords, 30% natural-language questions, 30% passages from the corpus."""
+        rng = random.Random(seed)
+        files = sorted(os.path.join(d, f) for d, _, fs in os.walk(root) for f in fs if f.endswith((".md", ".txt")))
+        mid = self.vocab[20:min(len(self.vocab), 3000)]
+        out = []
+        for i in range(n):
+            kind = i % 10
+            if kind < 4:
+                out.append(" ".join(rng.sample(mid, rng.randint(2, 4))))
+            elif kind < 7:
+                a, b = rng.sample(TECH_TERMS, 2)
+                out.append(rng.choice(_QUERY_TEMPLATES).format(a=a, b=b))
+            elif files:
+                with open(rng.choice(files), encoding="utf-8") as f:
+                    words = re.findall(r"[A-Za-z0-9]+", f.read(8192))
+                start = rng.randint(0, max(0, len(words) - 12))
+                out.append(" ".join(words[start:start + rng.randint(8, 12)]) or rng.choice(mid))
+            else:
+                out.append(rng.choice(mid))
+        return out
+
+
+def _rss_mb(usage_kb: float) -> float:
+    # ru_maxrss is in KB on Linux, bytes on macOS
+    return round(usage_kb / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _measure(corpus_dir: str, index_path: str, backend: str, scoring: str, workers: Optional[int],
+             queries: List[str], top_k: int, repeat: int, out: "multiprocessing.Queue") -> None:
+    """Runs in a fresh process so peak RSS belongs to this build only."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        resource = None
+    try:
+        from testai.tools.rag_index import RagIndex
+        # Interpreter + package imports, before any index work
+        import_rss = _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource else None
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        idx = RagIndex(corpus_dir, index_path=index_path, backend=backend, scoring=scoring, workers=workers)
+        t0 = time.perf_counter()
+        idx.build(force=True)
+        build_s = time.perf_counter() - t0
+        snap = idx.snapshot
+        res = {
+            "build_s": round(build_s, 4),
+            "import_rss_mb": import_rss,
+            "peak_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) if resource else None,
+            "peak_worker_rss_mb": _rss_mb(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) if resource else None,
+            "index_bytes": os.path.getsize(index_path) if os.path.exists(index_path) else None,
+            "chunks": len(snap.chunks),
+            "terms": len(snap.idf),
+            "postings": sum(len(p) for p in snap.postings.values()),
+            "sparse": idx.use_sparse,
+        }
+        t0 = time.perf_counter()
+        idx.build()
+        res["noop_refresh_s"] = round(time.perf_counter() - t0, 4)
+        reloaded = RagIndex(corpus_dir, index_path=index_path, backend=backend, scoring=scoring, workers=workers)
+        t0 = time.perf_counter()
+        reloaded.build()
+        res["load_s"] = round(time.perf_counter() - t0, 4)
+        del reloaded
+        for q in queries[:min(10, len(queries))]:  # warm-up
+            idx.search(q, top_k=top_k)
+        lat = []
+        for _ in range(repeat):
+            for q in queries:
+                t0 = time.perf_counter()
+                idx.search(q, top_k=top_k)
+                lat.append((time.perf_counter() - t0) * 1000.0)
+        res["search_ms"] = summarize(lat, digits=3)
+        t0 = time.perf_counter()
+        idx.search_many(queries, top_k=top_k)
+        batch_s = time.perf_counter() - t0
+        res["search_many_qps"] = round(len(queries) / batch_s, 1) if batch_s > 0 else None
+        out.put(res)
+    except BaseException as e:  # reported in the results instead of killing the suite
+        out.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def _collect(proc, out) -> dict:
+    # A child killed by the OOM killer or a native crash never puts its result
+    while True:
+        try:
+            res = out.get(timeout=1.0)
+            break
+        except queue.Empty:
+            if not proc.is_alive():
+                try:  # exited right after putting it
+                    res = out.get(timeout=1.0)
+                except queue.Empty:
+                    res = {"error": f"exit code {proc.exitcode}"}
+                break
+    proc.join()
+    return res
+
+
+def run_suite(sizes: List[int], backends: List[str], scorings: List[str], work_dir: str = BENCH_DIR,
+              queries: int = 200, top_k: int = 5, repeat: int = 3, seed: int = 42,
+              workers: Optional[int] = None) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes:
+        label = size_label(size)
+        corpus_dir = os.path.join(work_dir, "corpora", f"{label}-s{seed}")
+        gen = CorpusGenerator(size, seed=seed)
+        print(f"[rag-bench] corpus {label}: generating under {corpus_dir}")
+        manifest = gen.generate(corpus_dir)
+        qset = gen.queries(corpus_dir, queries, seed=seed + 1)
+        for backend, scoring in itertools.product(backends, scorings):
+            index_path = os.path.join(work_dir, "index", f"{label}-s{seed}-{backend}-{scoring}.json.gz")
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            out = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(corpus_dir, index_path, backend, scoring, workers,
+                                                      qset, top_k, repeat, out))
+            proc.start()
+            res = _collect(proc, out)
+            res = {"corpus": label, "bytes": manifest["bytes"], "files": manifest["files"],
+                   "backend": backend, "scoring": scoring, **res}
+            results.append(res)
+            if "error" in res:
+                print(f"[rag-bench] {label} {backend}/{scoring}: {res['error']}")
+            else:
+                print(f"[rag-bench] {label} {backend}/{scoring}: build {res['build_s']}s, "
+                      f"rss {res['peak_rss_mb']}MB, p95 {res['search_ms']['p95']}ms")
+    try:
+        import numpy, scipy  # noqa: F401
+        has_sparse = True
+    except ImportError:
+        has_sparse = False
+    return {
+        "suite": "rag",
+        "format": RESULT_FORMAT,
+        "created": time.time(),
+        "env": {"python": platform.python_version(), "platform": platform.platform(),
+                "cpus": os.cpu_count(), "numpy_scipy": has_sparse},
+        "config": {"queries": queries, "top_k": top_k, "repeat": repeat, "seed": seed, "workers": workers},
+        "results": results,
+    }
+
+
+# Metrics compared against a baseline, lower is better
+_COMPARED = (("build_s",), ("peak_rss_mb",), ("index_bytes",), ("load_s",), ("search_ms", "p50"), ("search_ms", "p95"))
+
+
+def _metric(res: dict, path: Tuple[str, ...]) -> Optional[float]:
+    for key in path:
+        res = res.get(key) if isinstance(res, dict) else None
+    return res if isinstance(res, (int, float)) else None
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2) -> Tuple[List[dict], bool]:
+    """Relative change of each metric per (corpus, backend, scoring); flags regressions
+    worse than ``threshold`` (0.2 = 20% slower/bigger)."""
+    base = {(r["corpus"], r["backend"], r["scoring"]): r for r in baseline.get("results", [])}
+    rows, regressed = [], False
+    for r in current.get("results", []):
+        b = base.get((r["corpus"], r["backend"], r["scoring"]))
+        if b is None:
+            continue
+        for path in _COMPARED:
+            new, old = _metric(r, path), _metric(b, path)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            bad = change > threshold
+            regressed |= bad
+            rows.append({"corpus": r["corpus"], "backend": r["backend"], "scoring": r["scoring"],
+                         "metric": ".".join(path), "baseline": old, "current": new,
+                         "change": round(change, 4), "regression": bad})
+    return rows, regressed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark RagIndex build and search on synthetic corpora.")
+    parser.add_argument("--sizes", default="1MB,10MB,100MB", help="comma-separated corpus sizes, up to e.g. 1GB")
+    parser.add_argument("--backends", default="auto", help="comma-separated: auto, sparse, python")
+    parser.add_argument("--scoring", default="tfidf", help="comma-separated: tfidf, bm25, bm25+")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the query set for latency")
+    parser.add_argument("--workers", type=int, default=None, help="ingest worker processes (default RAG_INGEST_WORKERS)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--work-dir", default=BENCH_DIR, help="where corpora and indexes are kept")
+    parser.add_argument("--json", dest="json_out", help="write results to this file")
+    parser.add_argument("--baseline", help="earlier results JSON to compare with")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="fail (exit 1) beyond this relative change")
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+    report = run_suite(
+        sizes=[parse_size(s) for s in args.sizes.split(",") if s.strip()],
+        backends=[b.strip() for b in args.backends.split(",") if b.strip()],
+        scorings=[s.strip() for s in args.scoring.split(",") if s.strip()],
+        work_dir=args.work_dir, queries=args.queries, top_k=args.top_k, repeat=args.repeat,
+        seed=args.seed, workers=args.workers,
+    )
+    regressed = False
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            rows, regressed = compare(report, json.load(f), args.max_regression)
+        report["comparison"] = {"baseline": args.baseline, "threshold": args.max_regression, "rows": rows}
+        for row in rows:
+            flag = "REGRESSION" if row["regression"] else ""
+            print(f"[rag-bench] {row['corpus']} {row['backend']}/{row['scoring']} {row['metric']}: "
+                  f"{row['baseline']} -> {row['current']} ({row['change']:+.1%}) {flag}")
+    out = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.json_out:
+        os.makedirs(os.path.dirname(args.json_out) or ".", exist_ok=True)
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+    if regressed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
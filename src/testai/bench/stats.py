@@ -0,0 +1,26 @@
+from __future__ import annotations
+import math
+from typing import List, Optional
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (``p`` in 0-100); None without samples."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(p / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+
+def summarize(values: List[float], digits: int = 4) -> dict:
+    """count/mean/p50/p95/p99/max of ``values``, rounded to ``digits``."""
+    def r(x: Optional[float]) -> Optional[float]:
+        return round(x, digits) if x is not None else None
+    return {
+        "count": len(values),
+        "mean": r(sum(values) / len(values)) if values else None,
+        "p50": r(percentile(values, 50)),
+        "p95": r(percentile(values, 95)),
+        "p99": r(percentile(values, 99)),
+        "max": r(max(values)) if values else None,
+    }
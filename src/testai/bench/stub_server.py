@@ -0,0 +1,235 @@
+"""Local stand-in for the Gemini API, for running and timing the crew offline.
+
+Answers ``POST /v1beta/models/<model>:generateContent`` after a latency drawn from a
+configurable distribution, with scripted ReAct turns that walk every interview task to
+its final JSON (questions through AskCandidateTool, scores, report, question bank).
+
+    python -m testai.bench.stub_server --port 8765 --latency lognormal:0.8,0.4
+    LLM_API_BASE=http://127.0.0.1:8765 testai   # or the web backend
+"""
+from __future__ import annotations
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+
+ASK_TOOL = "AskCandidateTool"
+
+
+class LatencyModel:
+    """Response delay in seconds: ``fixed:S``, ``uniform:A,B``, ``normal:MEAN,STD`` or
+    ``lognormal:MEDIAN,SIGMA``, plus an optional per-output-token cost."""
+
+    KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+    def __init__(self, spec: str = "fixed:0", per_token: float = 0.0, seed: Optional[int] = None) -> None:
+        kind, _, args = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"latency kind must be one of {self.KINDS}, got {kind!r}")
+        self.spec = spec
+        self.kind = kind
+        self.args = [float(a) for a in args.split(",") if a.strip()] or [0.0]
+        self.per_token = per_token
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, output_tokens: int = 0) -> float:
+        a = self.args
+        with self._lock:
+            if self.kind == "uniform":
+                d = self._rng.uniform(a[0], a[1] if len(a) > 1 else a[0])
+            elif self.kind == "normal":
+                d = self._rng.gauss(a[0], a[1] if len(a) > 1 else 0.0)
+            elif self.kind == "lognormal":
+                d = self._rng.lognormvariate(math.log(max(a[0], 1e-6)), a[1] if len(a) > 1 else 0.0)
+            else:
+                d = a[0]
+        return max(0.0, d) + self.per_token * output_tokens
+
+
+def _score(*parts: str) -> int:
+    # Deterministic pseudo-score so replays and reruns agree
+    return 55 + int(hashlib.sha256("".join(parts).encode("utf-8")).hexdigest(), 16) % 40
+
+
+class StubResponder:
+    """Scripted model: picks the interview task from the prompt and answers its next step."""
+
+    # (marker in the expected output, result key, questions to ask)
+    QA_TASKS = (('"intro_questions"', "intro_questions", 1), ('"tech_qa"', "tech_qa", 5), ('"soft_qa"', "soft_qa", 5))
+
+    def respond(self, system: str, turns: List[Tuple[str, str]]) -> str:
+        prompt = system + "\n" + "\n".join(t for r, t in turns if r == "user")
+        history = "\n".join(t for r, t in turns if r == "model")
+        react = "Final Answer:" in prompt
+        # crewAI task prompt: match on the task's own expected output, not on the outputs
+        # of earlier tasks passed as context
+        m = re.search(r"expected criteria for your final answer:(.*?)(?:This is the context you're working with:|\Z)",
+                      prompt, re.DOTALL)
+        expected = m.group(1) if m else prompt
+        if "Formule EXACTEMENT une question technique par extrait" in prompt:
+            ids = re.findall(r"^\[(.+?)\]$", prompt, re.MULTILINE)
+            return json.dumps({"questions": [
+                {"q": f"Pouvez-vous expliquer le point clé de {i} ?", "chunk_id": i, "context": f"Extrait {i}"} for i in ids
+            ]}, ensure_ascii=False)
+        if "Propose la prochaine question comportementale" in prompt:
+            n = prompt.count("- Q:") + 1
+            return f"Décrivez une situation n°{n} où vous avez dû convaincre votre équipe ?"
+        for marker, key, count in self.QA_TASKS:
+            if marker in expected:
+                return self._qa_step(key, count, history)
+        if '"profile_summary"' in expected:
+            return self._final(react, self._report(prompt))
+        if '"technical_score": int' in expected or '"soft_skills_score": int' in expected:
+            out = {}
+            if '"technical_score"' in expected:
+                out.update(technical_score=_score("t", prompt), technical_comment="Réponses globalement exactes.")
+            if '"soft_skills_score"' in expected:
+                out.update(soft_skills_score=_score("s", prompt), soft_skills_comment="Communication claire et structurée.")
+            return self._final(react, json.dumps(out, ensure_ascii=False))
+        return self._final(react, "OK")
+
+    @staticmethod
+    def _final(react: bool, text: str) -> str:
+        return f"Thought: I now know the final answer\nFinal Answer: {text}" if react else text
+
+    def _qa_step(self, key: str, count: int, history: str) -> str:
+        asked = re.findall(rf"^Action: {ASK_TOOL}\s*$", history, re.MULTILINE)
+        answers = re.findall(r"Observation:\s*(.*?)(?=\n(?:Thought|Action|Observation)|\Z)", history, re.DOTALL)
+        if len(asked) < count:
+            q = f"Question {key} n°{len(asked) + 1} : pouvez-vous détailler votre expérience sur ce point ?"
+            return (f"Thought: Je pose la question suivante.\nAction: {ASK_TOOL}\n"
+                    f"Action Input: {json.dumps({'question': q}, ensure_ascii=False)}")
+        qa = [{"q": f"Question {key} n°{i + 1}", "a": a.strip()[:500]} for i, a in enumerate(answers[:count])]
+        out = {key: qa}
+        out.update({"consent": True} if key == "intro_questions" else {"count": count})
+        return self._final(True, json.dumps(out, ensure_ascii=False))
+
+    @staticmethod
+    def _report(prompt: str) -> str:
+        t, s = _score("t", prompt), _score("s", prompt)
+        summary = {
+            "profile_summary": "Candidat stub.", "technical_score": t, "technical_comment": "Stub.",
+            "soft_skills_score": s, "soft_skills_comment": "Stub.", "strengths": ["Clarté"],
+            "improvements": ["Approfondir"], "final_recommendation": "A discuter",
+            "recommendation_reason": "Rapport généré par le serveur stub.",
+        }
+        return json.dumps(summary, ensure_ascii=False) + "\n\n# Rapport d'entretien (stub)\n\nScores: technique " \
+            f"{t}/100, soft skills {s}/100.\n"
+
+
+class StubServer:
+    """Threaded HTTP server speaking the ``generateContent`` subset litellm uses for Gemini."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: Optional[LatencyModel] = None,
+                 responder: Optional[StubResponder] = None) -> None:
+        self.latency = latency or LatencyModel()
+        self.responder = responder or StubResponder()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self) -> None:
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                except ValueError:
+                    return self._send(400, {"error": {"code": 400, "message": "invalid JSON"}})
+                self._send(200, server.generate(body))
+
+            def _send(self, code: int, payload: dict) -> None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    def generate(self, body: dict) -> dict:
+        system = " ".join(p.get("text", "") for p in (body.get("systemInstruction") or {}).get("parts", []))
+        turns = [(c.get("role", "user"), " ".join(p.get("text", "") for p in c.get("parts", [])))
+                 for c in body.get("contents", [])]
+        text = self.responder.respond(system, turns)
+        # The agent's stop words end the turn before the tool result, like the real model
+        for stop in (body.get("generationConfig") or {}).get("stopSequences") or []:
+            if stop and stop in text:
+                text = text.split(stop, 1)[0]
+        prompt_tokens = sum(len(t) for _, t in turns) // 4 + len(system) // 4
+        out_tokens = max(1, len(text) // 4)
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency.sample(out_tokens))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        return {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": out_tokens,
+                              "totalTokenCount": prompt_tokens + out_tokens},
+        }
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "in_flight": self.in_flight, "peak_in_flight": self.peak_in_flight,
+                    "latency": self.latency.spec}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Local stub of the Gemini API for offline runs and benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="fixed:0.2",
+                        help="fixed:S | uniform:A,B | normal:MEAN,STD | lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument("--per-token", type=float, default=0.0, help="extra seconds per output token")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv if argv is not None else sys.argv[1:])
+    server = StubServer(args.host, args.port, LatencyModel(args.latency, args.per_token, args.seed))
+    print(f"[stub-llm] serving on {server.url} (latency {args.latency}); set LLM_API_BASE={server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[stub-llm] {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
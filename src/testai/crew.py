@@ -1,12 +1,67 @@
 import os
+import time
+import threading
+from collections import OrderedDict
 from crewai import Agent, Crew, Process, Task, LLM
 from crewai.project import CrewBase, agent, crew, task
 from crewai.agents.agent_builder.base_agent import BaseAgent
-from typing import List
+from crewai.utilities.events import crewai_event_bus, TaskStartedEvent, TaskCompletedEvent, TaskFailedEvent
+from typing import List, Optional, Tuple
 from testai.tools.rag_tool import RAGSearchTool
+from testai.tools.question_bank_tool import QuestionBankTool
 from testai.tools.ask_candidate_tool import AskCandidateTool
 from testai.tools.sim_candidate_tool import SimulatedCandidateTool
-from testai.tools.web_ask_tool import WebAskCandidateTool
+from testai.tools.web_ask_tool import WebAskCandidateTool, SPECULATIVE_QUESTIONS
+from testai.llm_pool import default_llm
+from testai.llm_cache import llm_cache
+from testai.metrics import metrics, TASK
+from testai.log import get_logger
+
+log = get_logger("crew")
+
+# Task id -> (session id, start time) of the crews being run. Async tasks execute on
+# their own threads, so the session is bound again in whichever thread starts the task.
+_task_spans: "OrderedDict[str, Tuple[Optional[str], Optional[float]]]" = OrderedDict()
+_task_spans_lock = threading.Lock()
+
+
+def _track_tasks(tasks: List[Task], session_id: Optional[str]) -> None:
+    with _task_spans_lock:
+        for t in tasks:
+            _task_spans[str(t.id)] = (session_id, None)
+        # Crews that failed before running all their tasks
+        while len(_task_spans) > 10000:
+            _task_spans.popitem(last=False)
+
+
+@crewai_event_bus.on(TaskStartedEvent)
+def _on_task_started(source, event) -> None:
+    key = str(getattr(event.task, "id", ""))
+    with _task_spans_lock:
+        sid = _task_spans.get(key, (None, None))[0]
+        _task_spans[key] = (sid, time.perf_counter())
+    if sid:
+        metrics.bind_session(sid)
+
+
+def _on_task_finished(task, status: str) -> None:
+    with _task_spans_lock:
+        sid, started = _task_spans.pop(str(getattr(task, "id", "")), (None, None))
+    if started is not None:
+        name = getattr(task, "name", None) or "task"
+        metrics.observe(TASK, time.perf_counter() - started, session_id=sid, stage=f"task:{name}",
+                        task=name, status=status)
+
+
+@crewai_event_bus.on(TaskCompletedEvent)
+def _on_task_completed(source, event) -> None:
+    _on_task_finished(event.task, "ok")
+
+
+@crewai_event_bus.on(TaskFailedEvent)
+def _on_task_failed(source, event) -> None:
+    _on_task_finished(event.task, "error")
+
 
 @CrewBase
 class Testai():
@@ -15,24 +70,28 @@ class Testai():
     agents: List[BaseAgent]
     tasks: List[Task]
 
+    def __init__(self, report_file: Optional[str] = 'interview_report.md',
+                 session_id: Optional[str] = None) -> None:
+        # Relative to the working directory (crewAI strips a leading '/'); None disables
+        # the file, e.g. when the web backend stores the report per session itself.
+        self.report_file = report_file
+        # Interview the task timings are attributed to (see testai.metrics)
+        self.session_id = session_id
+
     def _llm(self) -> LLM:
         """Configure Gemini via env (.env): GEMINI_API_KEY or GOOGLE_API_KEY required.
-        Optionally set model via GEMINI_MODEL or MODEL (default: 'gemini-2.0-flash')."""
-        api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
-        if not api_key:
-            raise ValueError('Missing GEMINI_API_KEY or GOOGLE_API_KEY in environment (.env).')
-        raw_model = os.getenv('GEMINI_MODEL') or os.getenv('MODEL') or 'gemini-2.0-flash'
-        model = raw_model if '/' in raw_model else f'gemini/{raw_model}'
-        return LLM(model=model, api_key=api_key)
+        Optionally set model via GEMINI_MODEL or MODEL (default: 'gemini-2.0-flash').
+        The client is shared by all agents and interviews of the process (see llm_pool)."""
+        return default_llm()
 
     # Agents
-    def _tools_for_qna(self):
+    def _tools_for_qna(self, speculative: bool = False):
         # Choose candidate interaction tool based on env switch
         use_web = os.getenv('USE_WEB_UI', '0') in ('1', 'true', 'True')
         if use_web:
-            print('[crew] Using WebAskCandidateTool (web mode)')
-            return [WebAskCandidateTool()]
-        print('[crew] Using CLI tools (AskCandidateTool + SimulatedCandidateTool)')
+            log.debug('using WebAskCandidateTool (web mode)')
+            return [WebAskCandidateTool(speculative=speculative and SPECULATIVE_QUESTIONS)]
+        log.debug('using CLI tools (AskCandidateTool + SimulatedCandidateTool)')
         return [AskCandidateTool(), SimulatedCandidateTool()]
 
     @agent
@@ -48,7 +107,7 @@ class Testai():
     def tech_interviewer(self) -> Agent:
         return Agent(
             config=self.agents_config['tech_interviewer'],  # type: ignore[index]
-            tools=[RAGSearchTool(knowledge_dir='knowledge')] + self._tools_for_qna(),
+            tools=[QuestionBankTool(), RAGSearchTool(knowledge_dir=os.getenv('KNOWLEDGE_DIR', 'knowledge'))] + self._tools_for_qna(),
             llm=self._llm(),
             verbose=True,
             allow_delegation=False
@@ -58,7 +117,8 @@ class Testai():
     def softskills_interviewer(self) -> Agent:
         return Agent(
             config=self.agents_config['softskills_interviewer'],  # type: ignore[index]
-            tools=self._tools_for_qna(),
+            # Soft skills questions barely depend on the previous answer: may be pre-generated
+            tools=self._tools_for_qna(speculative=True),
             llm=self._llm(),
             verbose=True
         )
@@ -71,6 +131,15 @@ class Testai():
             verbose=True
         )
 
+    @agent
+    def softskills_analyst_agent(self) -> Agent:
+        # Separate agent: both scoring tasks run at the same time
+        return Agent(
+            config=self.agents_config['softskills_analyst_agent'],  # type: ignore[index]
+            llm=self._llm(),
+            verbose=True
+        )
+
     @agent
     def reporter_agent(self) -> Agent:
         return Agent(
@@ -80,44 +149,59 @@ class Testai():
         )
 
     # Tasks
+    def _task_config(self, name: str) -> dict:
+        """Task config from tasks.yaml; `llm_cache: true` caches the task's LLM responses
+        on disk (see llm_cache), for steps whose prompt fully determines the answer. Not for
+        tasks whose prompt or context carries candidate data (name, answers): keys would
+        never repeat across interviews and the answers would be written to the cache dir."""
+        config = self.tasks_config[name]  # type: ignore[index]
+        if config.get('llm_cache'):
+            llm_cache.enable_task(name)
+        return config
+
     @task
     def intro_task(self) -> Task:
         return Task(
-            config=self.tasks_config['intro_task'],  # type: ignore[index]
+            config=self._task_config('intro_task'),
         )
 
     @task
     def tech_qna_task(self) -> Task:
         return Task(
-            config=self.tasks_config['tech_qna_task'],  # type: ignore[index]
+            config=self._task_config('tech_qna_task'),
         )
 
     @task
     def softskills_qna_task(self) -> Task:
         return Task(
-            config=self.tasks_config['softskills_qna_task'],  # type: ignore[index]
+            config=self._task_config('softskills_qna_task'),
+        )
+
+    # Both scoring tasks are async in tasks.yaml: they run concurrently once the
+    # soft skills block is over and report_task waits for the two of them
+    @task
+    def tech_scoring_task(self) -> Task:
+        return Task(
+            config=self._task_config('tech_scoring_task'),
         )
 
     @task
-    def analysis_scoring_task(self) -> Task:
+    def softskills_scoring_task(self) -> Task:
         return Task(
-            config=self.tasks_config['analysis_scoring_task'],  # type: ignore[index]
+            config=self._task_config('softskills_scoring_task'),
         )
 
     @task
     def report_task(self) -> Task:
-        # Ensure report is written to workspace root
-        import os
-        workspace_root = os.getcwd()
-        report_path = os.path.join(workspace_root, 'interview_report.md')
         return Task(
-            config=self.tasks_config['report_task'],  # type: ignore[index]
-            output_file=report_path
+            config=self._task_config('report_task'),
+            output_file=self.report_file
         )
 
     @crew
     def crew(self) -> Crew:
         """Creates the Interview crew"""
+        _track_tasks(self.tasks, self.session_id)
         return Crew(
             agents=self.agents,
             tasks=self.tasks,
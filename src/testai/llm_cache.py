@@ -0,0 +1,139 @@
+from __future__ import annotations
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+LLM_CACHE = os.getenv("LLM_CACHE", "1") not in ("0", "false", "False")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("runtime", "llm_cache"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64") or 64)
+
+# Completion parameters that do not change the response (endpoint included, so a replay
+# against another base URL still matches the recording)
+_IGNORED_PARAMS = {"api_key", "client", "stream", "timeout", "api_base", "base_url", "api_version"}
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """Content address of a completion request: model, messages and sampling params."""
+    data = {k: v for k, v in params.items() if k not in _IGNORED_PARAMS}
+    blob = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed LLM response cache, LRU-evicted to ``max_bytes``.
+
+    Entries are ``root/<key[:2]>/<key>.json``; the file mtime is the last access time,
+    so recency survives restarts. Only steps whose prompt holds no candidate data are
+    cached: tasks flagged ``llm_cache: true`` in ``tasks.yaml`` and direct calls made
+    with a ``cache_as`` name, e.g. the question bank (see :meth:`enable_task`).
+    """
+
+    def __init__(self, root: str = LLM_CACHE_DIR, max_bytes: int = int(LLM_CACHE_MAX_MB * 1024 * 1024),
+                 enabled: bool = LLM_CACHE) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tasks: Set[str] = set()
+        self._entries: Optional[Dict[str, list]] = None  # key -> [size, atime], loaded lazily
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def enable_task(self, name: str) -> None:
+        with self._lock:
+            self._tasks.add(name)
+
+    def is_enabled_for(self, name: Optional[str]) -> bool:
+        return self.enabled and name is not None and name in self._tasks
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _index(self) -> Dict[str, list]:
+        # Caller holds self._lock
+        if self._entries is None:
+            self._entries = {}
+            if self.root.exists():
+                for p in self.root.glob("*/*.json"):
+                    st = p.stat()
+                    self._entries[p.stem] = [st.st_size, st.st_mtime]
+            self._bytes = sum(size for size, _ in self._entries.values())
+        return self._entries
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._index().get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            entry[1] = time.time()
+        try:
+            p = self._path(key)
+            value = json.loads(p.read_text(encoding="utf-8"))["response"]
+            os.utime(p)
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self._drop(key)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, response: str, meta: Optional[dict] = None) -> None:
+        data = json.dumps({"response": response, "created": time.time(), **(meta or {})}, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(f"{p.name}.{os.getpid()}.{threading.get_ident()}.part")
+        tmp.write_text(data, encoding="utf-8")
+        os.replace(tmp, p)
+        with self._lock:
+            entries = self._index()
+            self._drop(key, unlink=False)
+            entries[key] = [size, time.time()]
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                for old in sorted(entries, key=lambda k: entries[k][1]):
+                    if self._bytes <= self.max_bytes:
+                        break
+                    if old != key:
+                        self._drop(old)
+                        self.evictions += 1
+
+    def _drop(self, key: str, unlink: bool = True) -> None:
+        # Caller holds self._lock
+        entry = self._index().pop(key, None)
+        if entry is None:
+            return
+        self._bytes -= entry[0]
+        if unlink:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._index())
+            return {
+                "enabled": self.enabled,
+                "tasks": sorted(self._tasks),
+                "entries": entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+llm_cache = ResponseCache()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import os
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from crewai import LLM
+from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+from testai.llm_cache import cache_key, llm_cache
+from testai.llm_transport import LLM_API_BASE, LLM_TRANSPORT, cassette
+from testai.metrics import metrics, LLM_CALL
+
+# Simultaneous in-flight LLM calls per (model, api key), across all crews (0 = unlimited)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8") or 0)
+# Keep-alive connections kept open toward the model endpoint
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "20") or 20)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "600") or 600)
+
+# litellm providers that accept a shared HTTPHandler through the `client` argument
+_HTTPX_PROVIDERS = {"gemini", "vertex_ai", "vertex_ai_beta"}
+
+
+class PooledLLM(LLM):
+    """crewAI ``LLM`` whose calls go through a shared semaphore (concurrency cap) and,
+    for tasks flagged ``llm_cache: true`` and calls made with an enabled ``cache_as``
+    step name, the on-disk response cache. With
+    ``LLM_TRANSPORT=record|replay`` every exchange is saved to / served from the cassette.
+    Every call is timed into ``testai_llm_call_seconds`` (see testai.metrics).
+
+    Instances are shared by every agent and crew; crewAI only mutates ``stop`` on them,
+    which all agents set to the same words.
+    """
+
+    def __init__(self, *args, semaphore: Optional[threading.BoundedSemaphore] = None, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._semaphore = semaphore
+        self._held = threading.local()
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, cache_as: Optional[str] = None):
+        args = (messages, tools, callbacks, available_functions, from_task, from_agent)
+        # call() retries itself (e.g. without `stop`): do not take a second slot then
+        if getattr(self._held, "active", False):
+            return super().call(*args)
+        self._held.active = True
+        # Direct calls (outside a crew task) name their step with cache_as
+        task_name = getattr(from_task, "name", None) or cache_as
+        try:
+            # Task name stands for the agent: each task has its own
+            with metrics.span(LLM_CALL, stage=f"llm:{task_name or 'direct'}", task=task_name or "",
+                              source="live") as labels:
+                use_cache = not tools and llm_cache.is_enabled_for(task_name)
+                key = params = None
+                if use_cache or cassette.active:
+                    params = self._prepare_completion_params(messages, tools)
+                    key = cache_key(params)
+                if use_cache:
+                    cached = llm_cache.get(key)
+                    if cached is not None:
+                        labels["source"] = "cache"
+                        return cached
+                if cassette.mode == "replay":
+                    labels["source"] = "replay"
+                    result = cassette.load(key)
+                elif self._semaphore is None:
+                    result = super().call(*args)
+                else:
+                    with self._semaphore:
+                        result = super().call(*args)
+                if cassette.mode == "record" and isinstance(result, str):
+                    cassette.save(key, params, result, task=task_name)
+                if use_cache and isinstance(result, str) and result.strip():
+                    llm_cache.put(key, result, {"model": self.model, "task": task_name})
+                return result
+        finally:
+            self._held.active = False
+
+_pool: Dict[Tuple[str, str], PooledLLM] = {}
+_pool_lock = threading.Lock()
+
+
+def get_llm(model: str, api_key: str) -> PooledLLM:
+    """Process-wide LLM client for ``model``/``api_key``, created on first use."""
+    key = (model, hashlib.sha256(api_key.encode("utf-8")).hexdigest())
+    with _pool_lock:
+        llm = _pool.get(key)
+        if llm is None:
+            kwargs = {}
+            if model.split("/", 1)[0] in _HTTPX_PROVIDERS:
+                # One keep-alive connection pool toward the endpoint instead of litellm's
+                # per-timeout cached clients
+                kwargs["client"] = HTTPHandler(
+                    timeout=httpx.Timeout(LLM_TIMEOUT, connect=5.0),
+                    concurrent_limit=LLM_POOL_CONNECTIONS,
+                )
+            if LLM_API_BASE:
+                provider, _, name = model.partition("/")
+                # litellm's Gemini route expects the full model URL as api_base
+                kwargs["api_base"] = (f"{LLM_API_BASE.rstrip('/')}/v1beta/models/{name}"
+                                      if provider == "gemini" else LLM_API_BASE)
+            semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY) if LLM_MAX_CONCURRENCY else None
+            llm = PooledLLM(model=model, api_key=api_key, semaphore=semaphore, **kwargs)
+            _pool[key] = llm
+        return llm
+
+
+def default_llm() -> PooledLLM:
+    """Shared client for the model configured in the environment (GEMINI_MODEL/MODEL)."""
+    api_key = os.getenv('GEMINI_API_KEY') or os.getenv('GOOGLE_API_KEY')
+    if not api_key:
+        if LLM_TRANSPORT != 'replay' and not LLM_API_BASE:
+            raise ValueError('Missing GEMINI_API_KEY or GOOGLE_API_KEY in environment (.env).')
+        api_key = 'offline'  # replayed cassette or local stub server: no real key needed
+    raw_model = os.getenv('GEMINI_MODEL') or os.getenv('MODEL') or 'gemini-2.0-flash'
+    model = raw_model if '/' in raw_model else f'gemini/{raw_model}'
+    return get_llm(model, api_key)
+
+
+def llm_pool_stats() -> Dict[str, dict]:
+    with _pool_lock:
+        items = list(_pool.items())
+    out = {}
+    for (model, key_hash), llm in items:
+        sem = llm._semaphore
+        out[f"{model}#{key_hash[:8]}"] = {
+            "model": model,
+            "max_concurrency": LLM_MAX_CONCURRENCY or None,
+            # BoundedSemaphore keeps the remaining slots in _value
+            "in_flight": (LLM_MAX_CONCURRENCY - sem._value) if sem is not None else None,
+        }
+    return out
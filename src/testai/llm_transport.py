@@ -0,0 +1,92 @@
+from __future__ import annotations
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# live: call the model | record: call it and save every exchange | replay: serve saved
+# exchanges only (no network, no API key needed)
+LLM_TRANSPORT = (os.getenv("LLM_TRANSPORT", "live") or "live").lower()
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", os.path.join("runtime", "llm_cassettes"))
+# Model endpoint override, e.g. the local stub server (python -m testai.bench.stub_server)
+LLM_API_BASE = os.getenv("LLM_API_BASE", "")
+
+TRANSPORT_MODES = ("live", "record", "replay")
+
+
+class CassetteMiss(RuntimeError):
+    """Replay mode got a request that was never recorded."""
+
+
+class Cassette:
+    """Recorded LLM exchanges, one ``root/<request key>.json`` file each.
+
+    Keys are the content address of the request (:func:`testai.llm_cache.cache_key`), so
+    a replayed run gets exactly the responses of the recorded run as long as it sends the
+    same prompts, in any order and from any number of threads.
+    """
+
+    def __init__(self, root: str = LLM_CASSETTE_DIR, mode: str = LLM_TRANSPORT) -> None:
+        if mode not in TRANSPORT_MODES:
+            raise ValueError(f"LLM_TRANSPORT must be one of {TRANSPORT_MODES}, got {mode!r}")
+        self.root = Path(root)
+        self.mode = mode
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    @property
+    def active(self) -> bool:
+        return self.mode != "live"
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def load(self, key: str) -> str:
+        p = self._path(key)
+        try:
+            response = json.loads(p.read_text(encoding="utf-8"))["response"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            raise CassetteMiss(f"No recorded LLM response for request {key[:12]} in {self.root}") from None
+        with self._lock:
+            self.replayed += 1
+        return response
+
+    def save(self, key: str, params: Dict[str, Any], response: str, task: Optional[str] = None) -> None:
+        data = {
+            "key": key,
+            "model": params.get("model"),
+            "task": task,
+            "messages": params.get("messages"),
+            "stop": params.get("stop"),
+            "response": response,
+            "recorded_at": time.time(),
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        p = self._path(key)
+        tmp = p.with_name(f"{p.name}.{threading.get_ident()}.part")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+        os.replace(tmp, p)
+        with self._lock:
+            self.recorded += 1
+
+    def keys(self) -> List[str]:
+        return sorted(p.stem for p in self.root.glob("*.json")) if self.root.exists() else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "dir": str(self.root),
+                "recorded": self.recorded,
+                "replayed": self.replayed,
+                "misses": self.misses,
+            }
+
+
+cassette = Cassette()
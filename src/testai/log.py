@@ -0,0 +1,193 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import queue
+import random
+import atexit
+import threading
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+LOG_LEVEL = (os.getenv("LOG_LEVEL", "info") or "info").lower()
+# text: "[broker] set question session=... question='...'" | json: one object per line
+LOG_FORMAT = (os.getenv("LOG_FORMAT", "text") or "text").lower()
+# Records waiting for the writer thread; further records are dropped (and counted)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000") or 0)
+# Fraction of debug/info records kept per logger, e.g. "broker=0.1,web-tool=0.25";
+# warnings and errors are always written
+LOG_SAMPLE = os.getenv("LOG_SAMPLE", "")
+
+# (time, level, logger name, message, fields)
+Record = Tuple[float, int, str, str, Dict[str, Any]]
+
+
+def parse_sample(spec: str) -> Dict[str, float]:
+    rates = {}
+    for part in spec.split(","):
+        name, _, rate = part.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = max(0.0, min(1.0, float(rate)))
+    return rates
+
+
+def _text_value(v: Any) -> str:
+    s = str(v)
+    return repr(s) if isinstance(v, str) and (not s or any(c.isspace() or c in "'\"=" for c in s)) else s
+
+
+class LogWriter:
+    """Writes queued records from a background thread, in batches.
+
+    Callers only pay for a non-blocking ``put``: formatting and stdout I/O happen on the
+    writer thread, so a slow terminal or pipe never stalls request handling or the
+    broker loop. When the queue is full, records are dropped rather than waited for.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, fmt: str = LOG_FORMAT,
+                 max_queue: int = LOG_QUEUE_SIZE, batch: int = 256) -> None:
+        if fmt not in ("text", "json"):
+            raise ValueError(f"LOG_FORMAT must be text or json, got {fmt!r}")
+        self.stream = stream
+        self.fmt = fmt
+        self.batch = max(1, batch)
+        self._queue: "queue.Queue" = queue.Queue(max(0, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._drop_lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+
+    def submit(self, record: Record) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._drop_lock:
+                self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = [r for r in items if not isinstance(r, threading.Event)]
+            if records:
+                self._write([self._format_safe(r) for r in records])
+            for r in items:
+                if isinstance(r, threading.Event):
+                    r.set()
+
+    def _write(self, lines: List[str]) -> None:
+        stream = self.stream or sys.stdout  # resolved late: stdout may be redirected
+        try:
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            self.written += len(lines)
+        except (OSError, ValueError):
+            with self._drop_lock:
+                self.dropped += len(lines)
+
+    def format(self, record: Record) -> str:
+        ts, level, name, msg, fields = record
+        if self.fmt == "json":
+            level_name = next((k for k, v in LEVELS.items() if v == level), str(level))
+            return json.dumps({"ts": round(ts, 3), "level": level_name, "logger": name, "msg": msg, **fields},
+                              ensure_ascii=False, default=str)
+        prefix = f"[{name}] " + ("ERROR " if level >= LEVELS["error"] else "WARNING " if level >= LEVELS["warning"] else "")
+        return prefix + msg + "".join(f" {k}={_text_value(v)}" for k, v in fields.items())
+
+    def _format_safe(self, record: Record) -> str:
+        try:
+            return self.format(record)
+        except Exception as e:  # a bad field must not kill the writer thread
+            return f"[{record[2]}] {record[3]} (unformattable fields: {e})"
+
+    def flush(self, timeout: float = 2.0) -> bool:
+        """Wait until the records queued so far are written (e.g. at exit)."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stats(self) -> dict:
+        return {"format": self.fmt, "queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+class Logger:
+    """Named logger: ``log.info("got answer", session=sid, answer_len=12)``.
+
+    Records below the level, or not picked by the logger's sample rate, cost one
+    comparison; the others are handed to the shared :class:`LogWriter` as-is.
+    """
+
+    def __init__(self, name: str, writer: LogWriter, level: str = LOG_LEVEL, sample: float = 1.0) -> None:
+        if level not in LEVELS:
+            raise ValueError(f"LOG_LEVEL must be one of {tuple(LEVELS)}, got {level!r}")
+        self.name = name
+        self.writer = writer
+        self.level = LEVELS[level]
+        self.sample = sample
+        self.sampled_out = 0
+
+    def enabled_for(self, level: str) -> bool:
+        return LEVELS[level] >= self.level
+
+    def log(self, level: int, msg: str, **fields: Any) -> None:
+        if level < self.level:
+            return
+        if level < LEVELS["warning"] and self.sample < 1.0 and random.random() >= self.sample:
+            self.sampled_out += 1
+            return
+        self.writer.submit((time.time(), level, self.name, msg, fields))
+
+    def debug(self, msg: str, **fields: Any) -> None:
+        self.log(10, msg, **fields)
+
+    def info(self, msg: str, **fields: Any) -> None:
+        self.log(20, msg, **fields)
+
+    def warning(self, msg: str, **fields: Any) -> None:
+        self.log(30, msg, **fields)
+
+    def error(self, msg: str, **fields: Any) -> None:
+        self.log(40, msg, **fields)
+
+
+writer = LogWriter()
+_sample = parse_sample(LOG_SAMPLE)
+_loggers: Dict[str, Logger] = {}
+_loggers_lock = threading.Lock()
+
+
+def get_logger(name: str) -> Logger:
+    with _loggers_lock:
+        logger = _loggers.get(name)
+        if logger is None:
+            logger = _loggers[name] = Logger(name, writer, sample=_sample.get(name, 1.0))
+        return logger
+
+
+def log_stats() -> dict:
+    with _loggers_lock:
+        sampled = {name: lg.sampled_out for name, lg in _loggers.items() if lg.sampled_out}
+    return {**writer.stats(), "level": LOG_LEVEL, "sampled_out": sampled}
+
+
+# Records still queued when the process exits
+atexit.register(writer.flush)
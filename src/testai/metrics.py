@@ -0,0 +1,229 @@
+from __future__ import annotations
+import os
+import time
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from testai.log import get_logger
+
+METRICS_ENABLED = os.getenv("METRICS", "1") not in ("0", "false", "False")
+# Interviews whose per-stage breakdown is kept for /api/admin/metrics/sessions (oldest dropped first)
+METRICS_SESSIONS = int(os.getenv("METRICS_SESSIONS", "500") or 0)
+# Log every span slower than this many seconds, with its session id (0 = off)
+METRICS_SLOW_SPAN = float(os.getenv("METRICS_SLOW_SPAN", "0") or 0)
+
+# Seconds; from a cached RAG lookup up to a candidate thinking for minutes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+log = get_logger("metrics")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(x: float) -> str:
+    return repr(float(x)) if x != int(x) else str(int(x))
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label combination."""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS, stage: Optional[str] = None) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Key of this histogram in per-session breakdowns
+        self.stage = stage or name.removeprefix("testai_").removesuffix("_seconds")
+        self._lock = threading.Lock()
+        # label values -> [count per bucket (non-cumulative, last = +Inf), sum]
+        self._series: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, seconds: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = tuple(str((labels or {}).get(n, "")) for n in self.labelnames)
+        i = bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += seconds
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v[0]), v[1]) for k, v in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in items:
+            acc = 0
+            for le, n in zip(self.buckets, counts):
+                acc += n
+                bucket = _labels(self.labelnames, key, 'le="%s"' % _fmt(le))
+                lines.append(f"{self.name}_bucket{bucket} {acc}")
+            acc += counts[-1]
+            bucket = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket} {acc}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {acc}")
+        return lines
+
+
+class Metrics:
+    """Process-wide latency histograms plus a per-interview breakdown.
+
+    Spans are attributed to the session bound to the current thread
+    (:meth:`bind_session`) unless one is given, so the slow interviews can be listed
+    with the stages where their time went (:meth:`sessions`), while the Prometheus
+    series stay free of per-session labels.
+    """
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, max_sessions: int = METRICS_SESSIONS,
+                 slow_span: float = METRICS_SLOW_SPAN) -> None:
+        self.enabled = enabled
+        self.max_sessions = max(0, max_sessions)
+        self.slow_span = slow_span
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, dict]" = OrderedDict()
+        self._local = threading.local()
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS, stage: Optional[str] = None) -> Histogram:
+        with self._lock:
+            h = self._histograms.get(name)
+            if h is None:
+                h = self._histograms[name] = Histogram(name, help, labelnames, buckets, stage)
+            return h
+
+    # ---- session correlation ----
+    def bind_session(self, session_id: Optional[str]) -> None:
+        """Attribute the spans of this thread to ``session_id`` (None unbinds)."""
+        self._local.session_id = session_id
+
+    def current_session(self) -> Optional[str]:
+        return getattr(self._local, "session_id", None)
+
+    def _session_locked(self, sid: str) -> dict:
+        entry = self._sessions.get(sid)
+        if entry is None:
+            entry = self._sessions[sid] = {"session_id": sid, "started": time.time(), "finished": None,
+                                           "status": "running", "stages": {}}
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return entry
+
+    def tracks(self, session_id: Optional[str]) -> bool:
+        """Whether ``session_id`` has a per-stage breakdown (registered by :meth:`session_started`)."""
+        with self._lock:
+            return session_id in self._sessions
+
+    def session_started(self, session_id: str) -> None:
+        if not self.enabled or not self.max_sessions:
+            return
+        with self._lock:
+            self._session_locked(session_id)["started"] = time.time()
+
+    def session_finished(self, session_id: str, status: str = "done") -> None:
+        if not self.enabled or not self.max_sessions:
+            return
+        with self._lock:
+            entry = self._session_locked(session_id)
+            entry["finished"] = time.time()
+            entry["status"] = status
+
+    # ---- recording ----
+    def observe(self, hist: Histogram, seconds: float, session_id: Optional[str] = None,
+                stage: Optional[str] = None, **labels: str) -> None:
+        if not self.enabled:
+            return
+        hist.observe(seconds, labels)
+        sid = session_id or self.current_session()
+        if self.slow_span and seconds >= self.slow_span:
+            log.warning("slow span", stage=stage or hist.stage, seconds=round(seconds, 3), session=sid, **labels)
+        if sid and self.max_sessions:
+            with self._lock:
+                stages = self._session_locked(sid)["stages"]
+                s = stages.get(stage or hist.stage)
+                if s is None:
+                    s = stages[stage or hist.stage] = {"count": 0, "total_s": 0.0, "max_s": 0.0}
+                s["count"] += 1
+                s["total_s"] += seconds
+                s["max_s"] = max(s["max_s"], seconds)
+
+    @contextmanager
+    def span(self, hist: Histogram, session_id: Optional[str] = None, stage: Optional[str] = None,
+             **labels: str) -> Iterator[Dict[str, str]]:
+        """Time the block into ``hist``. Yields the label dict, which the block may update
+        (e.g. with the outcome); ``status`` is set to ``error`` if it raises."""
+        t0 = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            if "status" in hist.labelnames:
+                labels["status"] = "error"
+            raise
+        finally:
+            self.observe(hist, time.perf_counter() - t0, session_id=session_id, stage=stage, **labels)
+
+    # ---- reading ----
+    def sessions(self, limit: int = 20, running: Optional[bool] = None) -> List[dict]:
+        """Tracked interviews, slowest first, with the time spent per stage."""
+        now = time.time()
+        with self._lock:
+            entries = [dict(e, stages={k: dict(v) for k, v in e["stages"].items()}) for e in self._sessions.values()]
+        if running is not None:
+            entries = [e for e in entries if (e["finished"] is None) == running]
+        for e in entries:
+            e["duration_s"] = round((e["finished"] or now) - e["started"], 3)
+            for s in e["stages"].values():
+                s["total_s"] = round(s["total_s"], 4)
+                s["max_s"] = round(s["max_s"], 4)
+        entries.sort(key=lambda e: e["duration_s"], reverse=True)
+        return entries[:max(0, limit)]
+
+    def session(self, session_id: str) -> Optional[dict]:
+        return next((e for e in self.sessions(limit=len(self._sessions)) if e["session_id"] == session_id), None)
+
+    def render(self, gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+        """Prometheus text exposition of every histogram, plus ``gauges``
+        (``name -> (help, value)``) supplied by the caller."""
+        with self._lock:
+            hists = list(self._histograms.values())
+            tracked = len(self._sessions)
+        lines: List[str] = []
+        for h in hists:
+            lines.extend(h.render())
+        all_gauges = {"testai_metrics_sessions_tracked": ("Interviews with a per-stage breakdown in memory", tracked)}
+        all_gauges.update(gauges or {})
+        for name, (help, value) in all_gauges.items():
+            if value is None:
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_fmt(value)}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+# Interview stages
+RAG_SEARCH = metrics.histogram("testai_rag_search_seconds", "RAGSearchTool lookups", ("cache",))
+TASK = metrics.histogram("testai_task_seconds", "Crew task executions, LLM calls and tools included",
+                         ("task", "status"))
+LLM_CALL = metrics.histogram("testai_llm_call_seconds", "LLM calls by task (source: live, cache or replay)",
+                             ("task", "source"))
+CANDIDATE_WAIT = metrics.histogram("testai_candidate_wait_seconds",
+                                   "Question shown to the candidate until the answer arrives")
+INTERVIEW = metrics.histogram("testai_interview_seconds", "Whole interviews, from crew start to report",
+                              ("status",))
+HTTP_REQUEST = metrics.histogram("testai_http_request_seconds", "HTTP requests by route (long-polls included)",
+                                 ("method", "route", "status"))
@@ -0,0 +1,81 @@
+"""Text splitting, tokenization and per-file ingestion for the RAG index.
+
+Kept free of heavy imports (``testai.tools`` pulls in crewai): ingestion worker
+processes import only this module.
+"""
+from __future__ import annotations
+import re
+import hashlib
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t.lower() for t in TOKEN_RE.findall(text or "")]
+
+
+def split_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """Paragraph-aware splitter, then fixed-size character windows with overlap."""
+    paras = [p.strip() for p in text.split("\n\n") if p.strip()]
+    merged: List[str] = []
+    for p in paras:
+        if not merged:
+            merged.append(p)
+        elif len(merged[-1]) + 2 + len(p) <= chunk_size:
+            merged[-1] = merged[-1] + "\n\n" + p
+        else:
+            merged.append(p)
+    out: List[str] = []
+    for m in merged:
+        if len(m) <= chunk_size:
+            out.append(m)
+        else:
+            i = 0
+            while i < len(m):
+                out.append(m[i:i + chunk_size])
+                i += (chunk_size if overlap == 0 else (chunk_size - overlap))
+    return out
+
+
+def pool_context():
+    """Start method for ingestion pools.
+
+    Builds run on background threads of a multi-threaded server, and forking it would
+    copy locks held by other threads. The fork server is started once from a clean
+    process with only this module preloaded (no crewai), so workers start fast. Spawn
+    is used where the fork server is unavailable.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def ingest_file(path: str, rel: str, prev_sha1: Optional[str], chunk_size: int,
+                overlap: int) -> Optional[Tuple[str, Optional[List[Tuple[str, str, Dict[str, int]]]]]]:
+    """Read, hash, split and tokenize one file (runs in a worker process).
+
+    Returns ``None`` if the file cannot be read, ``(sha1, None)`` if its content still
+    matches ``prev_sha1``, else ``(sha1, [(chunk_id, content, term counts), ...])``.
+    """
+    try:
+        with open(path, "rb") as fh:
+            data = fh.read()
+    except Exception:
+        return None
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == prev_sha1:
+        return digest, None
+    # same normalization as reading in text mode (universal newlines)
+    text = data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    del data
+    out = []
+    for idx, content in enumerate(split_text(text, chunk_size, overlap)):
+        counts: Dict[str, int] = {}
+        for t in tokenize(content):
+            counts[t] = counts.get(t, 0) + 1
+        out.append((f"{rel}::chunk-{idx+1}", content, counts))
+    return digest, out
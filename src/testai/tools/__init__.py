@@ -2,3 +2,4 @@ from .ask_candidate_tool import AskCandidateTool
 from .sim_candidate_tool import SimulatedCandidateTool
 from .rag_tool import RAGSearchTool
 from .web_ask_tool import WebAskCandidateTool
+from .question_bank_tool import QuestionBankTool
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import json
+from typing import Type
+from pydantic import BaseModel, Field
+from crewai.tools import BaseTool
+from testai.log import get_logger
+from testai.web.broker import session_context
+from testai.web.question_bank import question_bank
+
+log = get_logger("question-bank")
+
+
+class QuestionBankInput(BaseModel):
+    count: int = Field(5, description="How many questions to draw (1-10).")
+
+
+class QuestionBankTool(BaseTool):
+    name: str = "QuestionBankTool"
+    description: str = (
+        "Return technical questions pre-generated from the knowledge base for the current job, "
+        "each with its chunk_id citation and context. Call it once before the technical block; "
+        "if it returns no question, fall back to RAGSearchTool."
+    )
+    args_schema: Type[BaseModel] = QuestionBankInput
+
+    def _run(self, count: int = 5) -> str:
+        count = max(1, min(int(count), 10))
+        sid = getattr(session_context, "session_id", None)
+        # Job config the interview started with (set by the backend with the session id)
+        fingerprint = getattr(session_context, "bank_fingerprint", None)
+        questions = question_bank.draw(fingerprint, count, seed=sid)
+        log.info("drew questions", session=sid, count=len(questions))
+        return json.dumps({"questions": questions}, ensure_ascii=False)
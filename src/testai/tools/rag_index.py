@@ -1,14 +1,44 @@
 from __future__ import annotations
 import os
 import math
-import re
-from typing import List, Dict, Tuple
-from dataclasses import dataclass
+import gzip
+import json
+import hashlib
+import heapq
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Tuple, Optional, Any, Iterator
+from dataclasses import dataclass, field, replace
 
-TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+from testai.log import get_logger
+from testai.rag_text import TOKEN_RE, tokenize, split_text, ingest_file, pool_context  # noqa: F401  (re-exported)
 
-def tokenize(text: str) -> List[str]:
-    return [t.lower() for t in TOKEN_RE.findall(text or "")]
+try:  # optional vectorized scoring backend
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # pure-Python fallback
+    np = None
+    sparse = None
+
+
+# Directory holding the persisted indexes (one file per knowledge dir)
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", os.path.join("runtime", "rag_index"))
+INDEX_FORMAT_VERSION = 1
+# Touched by the admin API (upload/delete/reindex) to request an incremental refresh
+MARKER_NAME = ".updated"
+# Scoring backend: "auto" (sparse when NumPy/SciPy are installed), "sparse" or "python"
+RAG_BACKEND = os.getenv("RAG_BACKEND", "auto")
+# Ranking function: "tfidf" (cosine), "bm25" or "bm25+"
+RAG_SCORING = os.getenv("RAG_SCORING", "tfidf")
+SCORING_MODES = ("tfidf", "bm25", "bm25+")
+# Worker processes used to tokenize changed files during a build (0/1 = in-process)
+RAG_INGEST_WORKERS = int(os.getenv("RAG_INGEST_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Changed bytes a build tokenizes in-process before starting the worker pool
+RAG_POOL_MIN_MB = float(os.getenv("RAG_POOL_MIN_MB", "8") or 0)
+
+log = get_logger("rag")
 
 @dataclass
 class Chunk:
@@ -16,84 +46,439 @@ class Chunk:
     source: str
     content: str
     tfidf: Dict[str, float]
+    norm: float = 1.0
+
+@dataclass
+class FileEntry:
+    """Per-file build record used to skip unchanged files on incremental rebuilds."""
+    mtime: float
+    size: int
+    sha1: str
+    # (chunk_id, content, raw term counts) for every chunk of the file
+    chunks: List[Tuple[str, str, Dict[str, int]]]
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """Immutable searchable state. Rebuilds produce a new snapshot that is swapped in
+    with a single reference assignment, so readers never observe a partial build."""
+    chunks: List[Chunk]
+    idf: Dict[str, float]
+    postings: Dict[str, List[Tuple[int, float]]]
+    files: Dict[str, FileEntry]
+    version: int = 0
+    # Sparse backend only: chunk x term CSR matrix with L2-normalized rows, its
+    # term-major transpose (CSR) for query products, and the term -> column map.
+    matrix: Any = None
+    matrix_t: Any = None
+    vocab: Dict[str, int] = field(default_factory=dict)
+    # Token count of every chunk and their mean, computed once per build
+    lengths: List[int] = field(default_factory=list)
+    avg_len: float = 0.0
+    # BM25 modes only: term -> [(chunk position, precomputed BM25 term impact)]
+    bm25: Dict[str, List[Tuple[int, float]]] = field(default_factory=dict)
+
+EMPTY_SNAPSHOT = IndexSnapshot(chunks=[], idf={}, postings={}, files={})
 
 class RagIndex:
-    """Minimal TF-IDF index over .txt and .md files in a directory (no crewai dependency)."""
-    def __init__(self, knowledge_dir: str, chunk_size: int = 800, overlap: int = 120):
+    """Minimal TF-IDF index over .txt and .md files in a directory (no crewai dependency).
+
+    Chunk vectors are stored in an inverted index (term -> [(chunk position, weight)])
+    with precomputed L2 norms, so a query only touches chunks sharing a term with it.
+    The index is persisted under ``runtime/rag_index`` and rebuilt incrementally: only
+    files whose mtime/size and content hash changed are re-read and re-tokenized.
+
+    Searches read the current :class:`IndexSnapshot` without locking; refreshes
+    triggered by the ``.updated`` marker run in a background thread and swap the new
+    snapshot in when complete. Use :func:`get_shared_index` to share one instance.
+
+    When NumPy and SciPy are available the snapshot also carries a CSR matrix and
+    queries (single or batched via :meth:`search_many`) are scored with one sparse
+    product; rankings are identical to the pure-Python path.
+
+    ``scoring`` selects TF-IDF cosine (default) or BM25/BM25+. BM25 term impacts are
+    precomputed at build time from the chunk lengths, so a query costs the same as
+    with TF-IDF.
+    """
+    def __init__(self, knowledge_dir: str, chunk_size: int = 800, overlap: int = 120,
+                 index_path: Optional[str] = None, backend: Optional[str] = None,
+                 scoring: Optional[str] = None, k1: float = 1.2, b: float = 0.75,
+                 delta: float = 1.0, workers: Optional[int] = None, pool_min_bytes: Optional[int] = None):
         self.knowledge_dir = knowledge_dir
         self.chunk_size = max(200, chunk_size)
         self.overlap = max(0, min(overlap, self.chunk_size // 2))
-        self.chunks: List[Chunk] = []
-        self.idf: Dict[str, float] = {}
-        self._built = False
+        self.index_path = index_path or self._default_index_path(knowledge_dir)
+        backend = (backend or RAG_BACKEND).lower()
+        self.use_sparse = backend != "python" and sparse is not None
+        if backend == "sparse" and sparse is None:
+            log.warning("RAG_BACKEND=sparse but NumPy/SciPy are not installed; using pure Python")
+        scoring = (scoring or RAG_SCORING).lower()
+        if scoring not in SCORING_MODES:
+            raise ValueError(f"Unknown RAG scoring {scoring!r} (expected one of {SCORING_MODES})")
+        self.scoring = scoring
+        self.k1 = k1
+        self.b = b
+        # BM25+ lower-bounds the TF component so long chunks are not over-penalized
+        self.delta = delta if scoring == "bm25+" else 0.0
+        self.workers = max(1, RAG_INGEST_WORKERS if workers is None else workers)
+        self.pool_min_bytes = int(RAG_POOL_MIN_MB * 2**20) if pool_min_bytes is None else max(0, pool_min_bytes)
+        self._snap: Optional[IndexSnapshot] = None
+        self._build_lock = threading.Lock()
+        self._marker_mtime: float = 0.0
+        # Background refresh thread, and whether a change arrived while it was running
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refresh_pending = False
+
+    # Read-only views over the current snapshot
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        return self._snap or EMPTY_SNAPSHOT
+
+    @property
+    def chunks(self) -> List[Chunk]:
+        return self.snapshot.chunks
 
-    def _read_files(self) -> List[Tuple[str, str]]:
-        docs: List[Tuple[str, str]] = []
+    @property
+    def idf(self) -> Dict[str, float]:
+        return self.snapshot.idf
+
+    @property
+    def postings(self) -> Dict[str, List[Tuple[int, float]]]:
+        return self.snapshot.postings
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    @staticmethod
+    def _default_index_path(knowledge_dir: str) -> str:
+        key = hashlib.sha1(os.path.abspath(knowledge_dir).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(INDEX_DIR, f"{key}.json.gz")
+
+    def _iter_files(self) -> Iterator[str]:
+        """Yield indexable files lazily, in walk order."""
         if not os.path.isdir(self.knowledge_dir):
-            return docs
+            return
         for root, _, files in os.walk(self.knowledge_dir):
             for f in files:
                 ext = os.path.splitext(f)[1].lower()
                 if ext not in [".txt", ".md"]:
                     continue
-                path = os.path.join(root, f)
+                yield os.path.join(root, f)
+
+    def _split(self, text: str) -> List[str]:
+        return split_text(text, self.chunk_size, self.overlap)
+
+    def _marker_path(self) -> str:
+        return os.path.join(self.knowledge_dir, MARKER_NAME)
+
+    def _current_marker_mtime(self) -> float:
+        try:
+            return os.path.getmtime(self._marker_path())
+        except OSError:
+            return 0.0
+
+    # ---- persistence ----
+    def load(self) -> Optional[IndexSnapshot]:
+        """Read the persisted index if it exists and matches the current chunking settings."""
+        try:
+            with gzip.open(self.index_path, "rt", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if (data.get("version") != INDEX_FORMAT_VERSION
+                or data.get("chunk_size") != self.chunk_size
+                or data.get("overlap") != self.overlap):
+            return None
+        files = {
+            rel: FileEntry(mtime=f["mtime"], size=f["size"], sha1=f["sha1"],
+                           chunks=[(c[0], c[1], c[2]) for c in f["chunks"]])
+            for rel, f in data.get("files", {}).items()
+        }
+        chunks: List[Chunk] = []
+        for rel, entry in files.items():
+            src = os.path.join(self.knowledge_dir, rel)
+            for cid, content, _ in entry.chunks:
+                chunks.append(Chunk(chunk_id=cid, source=src, content=content, tfidf={}))
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for term, (positions, weights) in data.get("postings", {}).items():
+            postings[term] = list(zip(positions, weights))
+            for pos, w in postings[term]:
+                chunks[pos].tfidf[term] = w
+        for ch in chunks:
+            ch.norm = math.sqrt(sum(v*v for v in ch.tfidf.values())) or 1.0
+        return self._finalize(IndexSnapshot(chunks=chunks, idf=data.get("idf", {}),
+                                            postings=postings, files=files))
+
+    def save(self, snap: Optional[IndexSnapshot] = None) -> None:
+        """Atomically write the index (file manifest, chunks, IDF table, postings) to disk."""
+        snap = snap or self.snapshot
+        postings = {t: [[p for p, _ in plist], [w for _, w in plist]]
+                    for t, plist in snap.postings.items()}
+        data = {
+            "version": INDEX_FORMAT_VERSION,
+            "chunk_size": self.chunk_size,
+            "overlap": self.overlap,
+            "files": {
+                rel: {"mtime": e.mtime, "size": e.size, "sha1": e.sha1,
+                      "chunks": [list(c) for c in e.chunks]}
+                for rel, e in snap.files.items()
+            },
+            "idf": snap.idf,
+            "postings": postings,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            tmp = f"{self.index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            # json.dumps uses the C encoder; json.dump to a stream falls back to pure Python
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            with gzip.open(tmp, "wb", compresslevel=3) as fh:
+                fh.write(payload)
+            os.replace(tmp, self.index_path)
+        except OSError as e:
+            log.error("failed to persist index", path=self.index_path, error=str(e))
+
+    # ---- build ----
+    def _scan(self, prev_files: Dict[str, FileEntry]) -> Tuple[Dict[str, FileEntry], bool, bool]:
+        """Stream the knowledge dir through walk -> read -> split -> tokenize.
+
+        Unchanged files (same mtime/size) reuse their previous entry. Changed files are
+        tokenized in-process until they add up to ``pool_min_bytes``, then fanned out
+        to a process pool (if the pool breaks, the build finishes in-process); at most
+        ``2 * workers`` files are in flight, so memory stays bounded whatever the corpus
+        size, and results are consumed in walk order to keep chunk positions stable.
+
+        Returns ``(files, changed, dirty)``: ``changed`` when chunk contents differ and
+        weights must be recomputed, ``dirty`` when the manifest must be persisted again.
+        """
+        files: Dict[str, FileEntry] = {}
+        flags = {"changed": False, "dirty": False}
+        window = max(1, 2 * self.workers)
+        pending: deque = deque()
+        pool: Optional[ProcessPoolExecutor] = None
+        use_pool = self.workers > 1
+        changed_bytes = 0
+
+        def pool_failed(e: Exception) -> None:
+            nonlocal use_pool
+            if use_pool:
+                first = (str(e).strip().splitlines() or [""])[0]
+                log.warning("ingestion pool failed; tokenizing in-process", error=f"{type(e).__name__}: {first}")
+            use_pool = False
+
+        def drain_one() -> None:
+            rel, prev, st, res, args = pending.popleft()
+            if st is None:
+                files[rel] = prev  # unchanged
+                return
+            if isinstance(res, Future):
+                try:
+                    res = res.result()
+                except BrokenProcessPool as e:  # child crashed or could not start
+                    pool_failed(e)
+                    res = ingest_file(*args)
+            if res is None:
+                return  # unreadable
+            digest, chunks = res
+            if chunks is None:
+                # touched but identical content: keep the chunks, refresh the stat
+                files[rel] = FileEntry(st.st_mtime, st.st_size, digest, prev.chunks)
+                flags["dirty"] = True
+                return
+            files[rel] = FileEntry(st.st_mtime, st.st_size, digest, chunks)
+            flags["changed"] = True
+
+        try:
+            for path in self._iter_files():
+                rel = os.path.relpath(path, self.knowledge_dir)
                 try:
-                    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-                        docs.append((path, fh.read()))
-                except Exception:
+                    st = os.stat(path)
+                except OSError:
                     continue
-        return docs
+                prev = prev_files.get(rel)
+                if prev and prev.mtime == st.st_mtime and prev.size == st.st_size:
+                    pending.append((rel, prev, None, None, None))
+                else:
+                    args = (path, rel, prev.sha1 if prev else None, self.chunk_size, self.overlap)
+                    if pool is None and use_pool and changed_bytes >= self.pool_min_bytes:
+                        # small updates are cheaper in-process than starting workers
+                        pool = self._make_pool()
+                        use_pool = pool is not None
+                    res = None
+                    if pool is not None and use_pool:
+                        try:
+                            res = pool.submit(ingest_file, *args)
+                        except (BrokenProcessPool, RuntimeError) as e:
+                            pool_failed(e)
+                    if res is None:
+                        res = ingest_file(*args)
+                    changed_bytes += st.st_size
+                    pending.append((rel, prev, st, res, args))
+                while len(pending) > window:
+                    drain_one()
+            while pending:
+                drain_one()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+        changed = flags["changed"] or list(files) != list(prev_files)
+        return files, changed, flags["dirty"] or changed
 
-    def _split(self, text: str) -> List[str]:
-        paras = [p.strip() for p in text.split("\n\n") if p.strip()]
-        merged: List[str] = []
-        for p in paras:
-            if not merged:
-                merged.append(p)
-            elif len(merged[-1]) + 2 + len(p) <= self.chunk_size:
-                merged[-1] = merged[-1] + "\n\n" + p
-            else:
-                merged.append(p)
-        out: List[str] = []
-        for m in merged:
-            if len(m) <= self.chunk_size:
-                out.append(m)
-            else:
-                i = 0
-                while i < len(m):
-                    out.append(m[i:i + self.chunk_size])
-                    i += (self.chunk_size if self.overlap == 0 else (self.chunk_size - self.overlap))
-        return out
+    def _make_pool(self) -> Optional[ProcessPoolExecutor]:
+        try:
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=pool_context())
+        except (OSError, NotImplementedError, ValueError) as e:
+            log.warning("process pool unavailable; tokenizing in-process", error=str(e))
+            return None
 
-    def build(self) -> None:
-        docs = self._read_files()
-        raw_chunks: List[Tuple[str, str, str]] = []
-        for path, text in docs:
-            parts = self._split(text)
-            for idx, content in enumerate(parts):
-                cid = f"{os.path.relpath(path, self.knowledge_dir)}::chunk-{idx+1}"
-                raw_chunks.append((cid, path, content))
+    def _reweight(self, files: Dict[str, FileEntry], version: int) -> IndexSnapshot:
+        """Compute IDF, TF-IDF vectors, norms and postings from the per-file term counts."""
         df: Dict[str, int] = {}
-        chunk_tokens: List[List[str]] = []
-        for _, _, content in raw_chunks:
-            toks = tokenize(content)
-            chunk_tokens.append(toks)
-            for term in set(toks):
-                df[term] = df.get(term, 0) + 1
-        n_docs = max(1, len(raw_chunks))
-        self.idf = {t: math.log((1 + n_docs) / (1 + c)) + 1.0 for t, c in df.items()}
-        self.chunks = []
-        for (cid, src, content), toks in zip(raw_chunks, chunk_tokens):
-            tf: Dict[str, float] = {}
-            for t in toks:
-                tf[t] = tf.get(t, 0.0) + 1.0
-            norm = sum(tf.values()) or 1.0
-            for t in list(tf.keys()):
-                tf[t] = (tf[t] / norm) * self.idf.get(t, 1.0)
-            self.chunks.append(Chunk(chunk_id=cid, source=src, content=content, tfidf=tf))
-        self._built = True
-
-    def _vec(self, text: str) -> Dict[str, float]:
+        n_chunks = 0
+        for entry in files.values():
+            for _, _, counts in entry.chunks:
+                n_chunks += 1
+                for term in counts:
+                    df[term] = df.get(term, 0) + 1
+        n_docs = max(1, n_chunks)
+        idf = {t: math.log((1 + n_docs) / (1 + c)) + 1.0 for t, c in df.items()}
+        chunks: List[Chunk] = []
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        pos = 0
+        for rel, entry in files.items():
+            src = os.path.join(self.knowledge_dir, rel)
+            for cid, content, counts in entry.chunks:
+                norm = float(sum(counts.values())) or 1.0
+                tf: Dict[str, float] = {}
+                for t, c in counts.items():
+                    tf[t] = (c / norm) * idf.get(t, 1.0)
+                    postings.setdefault(t, []).append((pos, tf[t]))
+                l2 = math.sqrt(sum(v*v for v in tf.values())) or 1.0
+                chunks.append(Chunk(chunk_id=cid, source=src, content=content, tfidf=tf, norm=l2))
+                pos += 1
+        return self._finalize(IndexSnapshot(chunks=chunks, idf=idf, postings=postings,
+                                            files=files, version=version))
+
+    def _finalize(self, snap: IndexSnapshot) -> IndexSnapshot:
+        return self._with_matrix(self._with_bm25(snap))
+
+    def _with_bm25(self, snap: IndexSnapshot) -> IndexSnapshot:
+        """Record chunk lengths and, in BM25 modes, the per-posting BM25 impacts."""
+        lengths = [sum(counts.values()) for e in snap.files.values() for _, _, counts in e.chunks]
+        avg_len = (sum(lengths) / len(lengths)) if lengths else 0.0
+        bm25: Dict[str, List[Tuple[int, float]]] = {}
+        if self.scoring != "tfidf":
+            n = len(lengths)
+            k1, b, delta = self.k1, self.b, self.delta
+            # length normalization factor per chunk, shared by all of its terms
+            norm = [k1 * (1.0 - b + b * (dl / avg_len if avg_len else 0.0)) for dl in lengths]
+            counts_at = [counts for e in snap.files.values() for _, _, counts in e.chunks]
+            for t, plist in snap.postings.items():
+                df = len(plist)
+                idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+                impacts = []
+                for pos, _ in plist:
+                    tf = counts_at[pos][t]
+                    impacts.append((pos, idf * ((tf * (k1 + 1.0)) / (tf + norm[pos]) + delta)))
+                bm25[t] = impacts
+        return replace(snap, lengths=lengths, avg_len=avg_len, bm25=bm25)
+
+    def _with_matrix(self, snap: IndexSnapshot) -> IndexSnapshot:
+        """Attach the CSR chunk-term matrix when the sparse backend is on.
+
+        TF-IDF rows are L2-normalized (cosine); BM25 rows hold the raw term impacts.
+        """
+        if not self.use_sparse:
+            return snap
+        weights = snap.postings if self.scoring == "tfidf" else snap.bm25
+        vocab = {t: j for j, t in enumerate(weights)}
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for t, plist in weights.items():
+            j = vocab[t]
+            for pos, w in plist:
+                rows.append(pos)
+                cols.append(j)
+                vals.append(w)
+        rows_a = np.asarray(rows, dtype=np.int64)
+        data = np.asarray(vals, dtype=np.float64)
+        if self.scoring == "tfidf" and len(rows):
+            norms = np.array([ch.norm for ch in snap.chunks], dtype=np.float64)
+            data = data / norms[rows_a]
+        matrix = sparse.csr_matrix((data, (rows_a, np.asarray(cols, dtype=np.int64))),
+                                   shape=(len(snap.chunks), len(vocab)))
+        return replace(snap, matrix=matrix, matrix_t=matrix.T.tocsr(), vocab=vocab)
+
+    def build(self, force: bool = False) -> None:
+        """Bring the index up to date with the knowledge dir.
+
+        Loads the persisted index on first use, then re-processes only new or modified
+        files. ``force`` discards the persisted state and rebuilds from scratch. Concurrent
+        callers are serialized; searches keep using the previous snapshot meanwhile.
+        """
+        with self._build_lock:
+            self._marker_mtime = max(self._marker_mtime, self._current_marker_mtime())
+            cur = self._snap
+            if force:
+                cur = None
+            elif cur is None:
+                cur = self.load()
+            prev_files = cur.files if cur else {}
+            version = (self._snap.version + 1) if self._snap else 1
+            files, changed, dirty = self._scan(prev_files)
+            if changed or cur is None:
+                new = self._reweight(files, version)
+                dirty = True
+            else:
+                new = replace(cur, files=files, version=cur.version or version)
+            self._snap = new
+            if dirty:
+                self.save(new)
+
+    def refresh_async(self) -> Optional[threading.Thread]:
+        """Start an incremental rebuild in the background. If one is already running, it
+        runs once more when done (the change may have been missed by its scan) and None
+        is returned."""
+        with self._refresh_lock:
+            if self._refresh_thread is not None:
+                self._refresh_pending = True
+                return None
+            t = self._refresh_thread = threading.Thread(target=self._refresh_quietly, name="rag-refresh",
+                                                        daemon=True)
+        t.start()
+        return t
+
+    def _refresh_quietly(self) -> None:
+        while True:
+            try:
+                self.build()
+            except Exception as e:
+                log.error("background refresh failed", knowledge_dir=self.knowledge_dir, error=str(e))
+            with self._refresh_lock:
+                if not self._refresh_pending:
+                    self._refresh_thread = None
+                    return
+                self._refresh_pending = False
+
+    def current_snapshot(self) -> IndexSnapshot:
+        """Snapshot searches would use right now (builds on first use, schedules stale refreshes)."""
+        return self._ensure_fresh()
+
+    def _ensure_fresh(self) -> IndexSnapshot:
+        snap = self._snap
+        if snap is None:
+            # nothing to serve yet: the first build has to complete
+            self.build()
+            return self.snapshot
+        # The marker is consumed by build() when its scan starts, not here: an update
+        # arriving during a build is picked up by the rerun refresh_async schedules
+        if self._current_marker_mtime() > self._marker_mtime:
+            self.refresh_async()
+        return snap
+
+    def _vec(self, text: str, idf: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        idf = self.idf if idf is None else idf
         tf: Dict[str, float] = {}
         toks = tokenize(text)
         if not toks:
@@ -102,36 +487,89 @@ class RagIndex:
             tf[t] = tf.get(t, 0.0) + 1.0
         norm = sum(tf.values()) or 1.0
         for t in list(tf.keys()):
-            tf[t] = (tf[t] / norm) * self.idf.get(t, 1.0)
+            tf[t] = (tf[t] / norm) * idf.get(t, 1.0)
         return tf
 
     @staticmethod
-    def _cos(a: Dict[str, float], b: Dict[str, float]) -> float:
-        if not a or not b:
-            return 0.0
-        if len(a) > len(b):
-            a, b = b, a
-        dot = 0.0
-        for k, va in a.items():
-            vb = b.get(k)
-            if vb is not None:
-                dot += va * vb
-        na = math.sqrt(sum(v*v for v in a.values())) or 1.0
-        nb = math.sqrt(sum(v*v for v in b.values())) or 1.0
-        return dot / (na * nb)
-
-    def search(self, query: str, top_k: int = 5):
-        if not self._built:
-            self.build()
-        qv = self._vec(query)
-        scored = []
-        for ch in self.chunks:
-            sim = self._cos(qv, ch.tfidf)
-            if sim > 0:
-                scored.append((sim, ch))
-        scored.sort(key=lambda x: x[0], reverse=True)
+    def _score(snap: IndexSnapshot, qv: Dict[str, float]) -> Dict[int, float]:
+        """Accumulate cosine similarities for chunks sharing at least one query term."""
+        acc: Dict[int, float] = {}
+        if not qv:
+            return acc
+        for term, wq in qv.items():
+            for pos, wc in snap.postings.get(term, ()):
+                acc[pos] = acc.get(pos, 0.0) + wq * wc
+        qn = math.sqrt(sum(v*v for v in qv.values())) or 1.0
+        chunks = snap.chunks
+        return {pos: dot / (qn * chunks[pos].norm) for pos, dot in acc.items()}
+
+    @staticmethod
+    def _query_counts(text: str) -> Dict[str, float]:
+        counts: Dict[str, float] = {}
+        for t in tokenize(text):
+            counts[t] = counts.get(t, 0.0) + 1.0
+        return counts
+
+    @staticmethod
+    def _score_bm25(snap: IndexSnapshot, qtf: Dict[str, float]) -> Dict[int, float]:
+        """Sum precomputed BM25 impacts, weighted by query term frequency."""
+        acc: Dict[int, float] = {}
+        for term, q in qtf.items():
+            for pos, w in snap.bm25.get(term, ()):
+                acc[pos] = acc.get(pos, 0.0) + q * w
+        return acc
+
+    def _query_weights(self, snap: IndexSnapshot, query: str) -> Dict[str, float]:
+        """Query-side weights such that score = sum(weight * matrix cell)."""
+        if self.scoring != "tfidf":
+            return self._query_counts(query)
+        qv = self._vec(query, snap.idf)
+        # out-of-vocabulary terms still count in the query norm, as in the Python path
+        qn = math.sqrt(sum(v*v for v in qv.values())) or 1.0
+        return {t: w / qn for t, w in qv.items()}
+
+    def _top_python(self, snap: IndexSnapshot, query: str, k: int) -> List[Tuple[int, float]]:
+        if self.scoring == "tfidf":
+            scores = self._score(snap, self._vec(query, snap.idf))
+        else:
+            scores = self._score_bm25(snap, self._query_counts(query))
+        # Ties keep corpus order, matching a stable sort on score.
+        return heapq.nlargest(k, scores.items(), key=lambda kv: (kv[1], -kv[0]))
+
+    def _top_sparse(self, snap: IndexSnapshot, queries: List[str], k: int) -> List[List[Tuple[int, float]]]:
+        """Score a batch of queries with one sparse product against the chunk matrix."""
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for i, q in enumerate(queries):
+            for t, w in self._query_weights(snap, q).items():
+                j = snap.vocab.get(t)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+                    vals.append(w)
+        qm = sparse.csr_matrix((vals, (rows, cols)), shape=(len(queries), len(snap.vocab)))
+        scores = (qm @ snap.matrix_t).tocsr()
+        out: List[List[Tuple[int, float]]] = []
+        for i in range(len(queries)):
+            lo, hi = scores.indptr[i], scores.indptr[i + 1]
+            data = scores.data[lo:hi]
+            idx = scores.indices[lo:hi]
+            if len(data) > k:
+                # keep everything tied with the k-th best so the tie-break below stays exact
+                kth = np.partition(data, len(data) - k)[len(data) - k]
+                keep = data >= kth
+                data, idx = data[keep], idx[keep]
+            order = np.lexsort((idx, -data))[:k]
+            out.append([(int(idx[j]), float(data[j])) for j in order])
+        return out
+
+    def _format(self, snap: IndexSnapshot, best: List[Tuple[int, float]]) -> List[Dict[str, Any]]:
         out = []
-        for sim, ch in scored[:max(1, top_k)]:
+        for pos, sim in best:
+            if sim <= 0:
+                continue
+            ch = snap.chunks[pos]
             out.append({
                 "chunk_id": ch.chunk_id,
                 "source": os.path.relpath(ch.source, self.knowledge_dir),
@@ -140,3 +578,39 @@ class RagIndex:
             })
         return out
 
+    def search_many(self, queries: List[str], top_k: int = 5,
+                    snapshot: Optional[IndexSnapshot] = None) -> List[List[Dict[str, Any]]]:
+        """Run several queries against the same snapshot; one result list per query."""
+        snap = snapshot or self._ensure_fresh()
+        k = max(1, top_k)
+        if not queries:
+            return []
+        if self.use_sparse and snap.matrix is not None and snap.vocab:
+            tops = self._top_sparse(snap, list(queries), k)
+        else:
+            tops = [self._top_python(snap, q, k) for q in queries]
+        return [self._format(snap, best) for best in tops]
+
+    def search(self, query: str, top_k: int = 5, snapshot: Optional[IndexSnapshot] = None):
+        return self.search_many([query], top_k, snapshot)[0]
+
+
+# ---- process-wide registry ----
+_registry: Dict[str, RagIndex] = {}
+_registry_lock = threading.Lock()
+
+def get_shared_index(knowledge_dir: str, **kwargs) -> RagIndex:
+    """Return the process-wide :class:`RagIndex` for ``knowledge_dir``, creating it once.
+
+    ``kwargs`` (chunking, backend, scoring) only apply when the index is first created.
+
+    All tool instances (one per interview crew) share the same index so the corpus is
+    built and held in memory only once.
+    """
+    key = os.path.abspath(knowledge_dir)
+    with _registry_lock:
+        idx = _registry.get(key)
+        if idx is None:
+            idx = RagIndex(knowledge_dir=knowledge_dir, **kwargs)
+            _registry[key] = idx
+        return idx
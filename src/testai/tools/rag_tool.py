@@ -1,162 +1,107 @@
 from __future__ import annotations
 import os
-import math
 import json
-import re
-from typing import List, Dict, Tuple
-from dataclasses import dataclass
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple, Optional
 from pydantic import BaseModel, Field, PrivateAttr
 from crewai.tools import BaseTool
+from testai.tools.rag_index import RagIndex, Chunk, tokenize, get_shared_index  # noqa: F401  (re-exported)
+from testai.metrics import metrics, RAG_SEARCH
 
-TOKEN_RE = re.compile(r"[A-Za-z0-9]+")
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", "256") or 0)
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", "600") or 0)
 
 
-def tokenize(text: str) -> List[str]:
-    return [t.lower() for t in TOKEN_RE.findall(text or "")]
+class QueryCache:
+    """LRU + TTL cache of serialized search results for one index.
 
-
-@dataclass
-class Chunk:
-    chunk_id: str
-    source: str
-    content: str
-    tfidf: Dict[str, float]
-
-
-class RagIndex:
+    Entries are keyed on (normalized query, top_k) and tagged with the index version
+    they were computed from; the whole cache is dropped as soon as a lookup sees a
+    newer version, i.e. after every rebuild.
     """
-    Minimal TF-IDF index over .txt and .md files in a directory.
-    No external dependencies. Designed for small corpora for interview RAG.
-    """
-    def __init__(self, knowledge_dir: str, chunk_size: int = 800, overlap: int = 120):
-        self.knowledge_dir = knowledge_dir
-        self.chunk_size = max(200, chunk_size)
-        self.overlap = max(0, min(overlap, self.chunk_size // 2))
-        self.chunks: List[Chunk] = []
-        self.idf: Dict[str, float] = {}
-        self._built = False
-
-    def _read_files(self) -> List[Tuple[str, str]]:
-        docs: List[Tuple[str, str]] = []
-        if not os.path.isdir(self.knowledge_dir):
-            return docs
-        for root, _, files in os.walk(self.knowledge_dir):
-            for f in files:
-                ext = os.path.splitext(f)[1].lower()
-                if ext not in [".txt", ".md"]:
-                    continue
-                path = os.path.join(root, f)
-                try:
-                    with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-                        docs.append((path, fh.read()))
-                except Exception:
-                    continue
-        return docs
-
-    def _split(self, text: str) -> List[str]:
-        # simple paragraph-aware splitter then window by size
-        paras = [p.strip() for p in text.split("\n\n") if p.strip()]
-        merged = []
-        for p in paras:
-            if not merged:
-                merged.append(p)
-            elif len(merged[-1]) + 2 + len(p) <= self.chunk_size:
-                merged[-1] = merged[-1] + "\n\n" + p
-            else:
-                merged.append(p)
-        # window with overlap on characters
-        out = []
-        for m in merged:
-            if len(m) <= self.chunk_size:
-                out.append(m)
-            else:
-                i = 0
-                while i < len(m):
-                    out.append(m[i:i + self.chunk_size])
-                    if self.overlap == 0:
-                        i += self.chunk_size
-                    else:
-                        i += (self.chunk_size - self.overlap)
-        return out
-
-    def build(self) -> None:
-        docs = self._read_files()
-        raw_chunks: List[Tuple[str, str, str]] = []  # (chunk_id, source, content)
-        for path, text in docs:
-            parts = self._split(text)
-            for idx, content in enumerate(parts):
-                cid = f"{os.path.relpath(path, self.knowledge_dir)}::chunk-{idx+1}"
-                raw_chunks.append((cid, path, content))
-        # compute DF
-        df: Dict[str, int] = {}
-        chunk_tokens: List[List[str]] = []
-        for _, _, content in raw_chunks:
-            toks = tokenize(content)
-            chunk_tokens.append(toks)
-            for term in set(toks):
-                df[term] = df.get(term, 0) + 1
-        n_docs = max(1, len(raw_chunks))
-        self.idf = {t: math.log((1 + n_docs) / (1 + c)) + 1.0 for t, c in df.items()}
-        # build tf-idf per chunk
-        self.chunks = []
-        for (cid, src, content), toks in zip(raw_chunks, chunk_tokens):
-            tf: Dict[str, float] = {}
-            for t in toks:
-                tf[t] = tf.get(t, 0.0) + 1.0
-            norm = sum(tf.values()) or 1.0
-            for t in list(tf.keys()):
-                tf[t] = (tf[t] / norm) * self.idf.get(t, 1.0)
-            self.chunks.append(Chunk(chunk_id=cid, source=src, content=content, tfidf=tf))
-        self._built = True
-
-    def _vec(self, text: str) -> Dict[str, float]:
-        tf: Dict[str, float] = {}
-        toks = tokenize(text)
-        if not toks:
-            return tf
-        for t in toks:
-            tf[t] = tf.get(t, 0.0) + 1.0
-        norm = sum(tf.values()) or 1.0
-        for t in list(tf.keys()):
-            tf[t] = (tf[t] / norm) * self.idf.get(t, 1.0)
-        return tf
+
+    def __init__(self, max_size: int = RAG_CACHE_SIZE, ttl: float = RAG_CACHE_TTL) -> None:
+        self.max_size = max(0, max_size)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, int], Tuple[float, str]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
 
     @staticmethod
-    def _cos(a: Dict[str, float], b: Dict[str, float]) -> float:
-        if not a or not b:
-            return 0.0
-        # dot product on smaller dict
-        if len(a) > len(b):
-            a, b = b, a
-        dot = 0.0
-        for k, va in a.items():
-            vb = b.get(k)
-            if vb is not None:
-                dot += va * vb
-        # norms
-        na = math.sqrt(sum(v*v for v in a.values())) or 1.0
-        nb = math.sqrt(sum(v*v for v in b.values())) or 1.0
-        return dot / (na * nb)
-
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, str]]:
-        if not self._built:
-            self.build()
-        qv = self._vec(query)
-        scored = []
-        for ch in self.chunks:
-            sim = self._cos(qv, ch.tfidf)
-            if sim > 0:
-                scored.append((sim, ch))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        out = []
-        for sim, ch in scored[:max(1, top_k)]:
-            out.append({
-                "chunk_id": ch.chunk_id,
-                "source": os.path.relpath(ch.source, self.knowledge_dir),
-                "score": round(float(sim), 4),
-                "content": ch.content.strip()[:1200]
-            })
-        return out
+    def normalize(query: str) -> str:
+        # Scores only depend on the bag of tokens, so case, punctuation and order don't matter
+        return " ".join(sorted(tokenize(query)))
+
+    def _sync_version(self, version: int) -> None:
+        if self._version != version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self._version = version
+
+    def get(self, key: Tuple[str, int], version: int) -> Optional[str]:
+        with self._lock:
+            self._sync_version(version)
+            item = self._data.get(key)
+            if item is not None and (self.ttl <= 0 or time.monotonic() - item[0] < self.ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Tuple[str, int], version: int, value: str) -> None:
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._sync_version(version)
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "index_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# One cache per shared index (keyed like the index registry)
+_caches: Dict[str, QueryCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_query_cache(knowledge_dir: str) -> QueryCache:
+    key = os.path.abspath(knowledge_dir)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = QueryCache()
+            _caches[key] = cache
+        return cache
+
+
+def rag_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Hit/miss counters of every RAG query cache, keyed by knowledge dir (for monitoring)."""
+    with _caches_lock:
+        items = list(_caches.items())
+    return {k: c.stats() for k, c in items}
 
 
 class RAGSearchToolInput(BaseModel):
@@ -172,13 +117,24 @@ class RAGSearchTool(BaseTool):
     )
     args_schema = RAGSearchToolInput
     _index: RagIndex = PrivateAttr()
+    _cache: QueryCache = PrivateAttr()
 
     def __init__(self, knowledge_dir: str = "knowledge", **data):
         super().__init__(**data)
-        self._index = RagIndex(knowledge_dir=knowledge_dir)
+        # Shared per knowledge dir: every interview crew reads the same index and cache
+        self._index = get_shared_index(knowledge_dir)
+        self._cache = get_query_cache(knowledge_dir)
 
     def _run(self, query: str, top_k: int = 5) -> str:
         top_k = max(1, min(int(top_k), 10))
-        results = self._index.search(query=query, top_k=top_k)
-        return json.dumps({"results": results}, ensure_ascii=False)
-
+        with metrics.span(RAG_SEARCH, cache="miss") as labels:
+            snap = self._index.current_snapshot()
+            key = (QueryCache.normalize(query), top_k)
+            cached = self._cache.get(key, snap.version)
+            if cached is not None:
+                labels["cache"] = "hit"
+                return cached
+            results = self._index.search(query=query, top_k=top_k, snapshot=snap)
+            out = json.dumps({"results": results}, ensure_ascii=False)
+            self._cache.put(key, snap.version, out)
+            return out
@@ -1,14 +1,70 @@
 from __future__ import annotations
-from typing import Type
-from pydantic import BaseModel, Field
+import os
+import re
+import difflib
+import threading
+from concurrent.futures import Future
+from typing import List, Optional, Tuple, Type
+from pydantic import BaseModel, Field, PrivateAttr
 from crewai.tools import BaseTool
-from testai.web.broker import broker, session_context
+from testai.log import get_logger
+from testai.web.broker import broker, session_context, SessionClosed
+
+# Opt-in shadow mode: pre-generate the next soft skills question while the candidate
+# answers and count how often the agent then asks the same one. Never shown to the candidate
+SPECULATIVE_QUESTIONS = os.getenv("SPECULATIVE_QUESTIONS", "0") in ("1", "true", "True")
+# Shorter answers (or answers asking for clarification) are not counted: the agent rephrases
+SPECULATIVE_MIN_ANSWER = int(os.getenv("SPECULATIVE_MIN_ANSWER", "40") or 0)
+
+log = get_logger("web-tool")
+
+# Clarification requests: the answer opens with an explicit request, or ends with "?".
+# Anchored on purpose: "j'ai compris que…" or "par exemple…" inside an answer is no request
+_CLARIFY_RE = re.compile(
+    r"^\s*(?:(?:pouvez|pourriez)[- ]vous|(?:peux|pourrais)[- ]tu)\s+(?:me\s+|nous\s+)?"
+    r"(?:répéter|repeter|reformuler|préciser|preciser|clarifier|réexpliquer|expliquer|donner un exemple)"
+    r"|^\s*(?:je n'ai|j'ai) pas (?:bien )?compris"
+    r"|\?\s*$",
+    re.IGNORECASE,
+)
+
+_SPECULATE_PROMPT = """Tu conduis la partie soft skills d'un entretien (questions comportementales STAR/SAO).
+Questions déjà posées et réponses du candidat :
+{history}
+
+Propose la prochaine question comportementale, différente des précédentes et adaptée au candidat.
+Réponds uniquement par la question, sur une seule ligne."""
+
+
+class InterviewAborted(BaseException):
+    """The candidate's session closed (expired, failed): stops the crew.
+
+    A BaseException so it passes crewAI's tool error handling, which would otherwise
+    hand the error to the agent and let the interview go on to scoring without answers.
+    """
+
+
+def _same_question(a: str, b: str) -> bool:
+    na, nb = (" ".join(re.findall(r"\w+", s.lower())) for s in (a, b))
+    return na == nb or difflib.SequenceMatcher(None, na, nb).ratio() >= 0.85
 
 
 class WebAskCandidateInput(BaseModel):
     question: str = Field(..., description="The exact question to display to the candidate (web UI).")
 
 
+# Speculation outcomes across interviews: hit, miss, skipped (answer changed the plan), not_ready
+_speculation = {"hit": 0, "miss": 0, "skipped": 0, "not_ready": 0}
+_speculation_lock = threading.Lock()
+
+
+def speculation_stats() -> dict:
+    with _speculation_lock:
+        stats = dict(_speculation)
+    counted = stats["hit"] + stats["miss"]
+    return {"enabled": SPECULATIVE_QUESTIONS, **stats, "hit_rate": round(stats["hit"] / counted, 3) if counted else None}
+
+
 class WebAskCandidateTool(BaseTool):
     # Keep the original tool name so LLM prompts that say "Use AskCandidateTool" still match
     name: str = "AskCandidateTool"
@@ -16,17 +72,74 @@ class WebAskCandidateTool(BaseTool):
         "Ask the candidate a question via the web frontend and wait for the HTTP answer (web mode)."
     )
     args_schema: Type[BaseModel] = WebAskCandidateInput
+    # Speculative (shadow) mode: while the candidate types, the next question is generated
+    # in the background and compared with the one the agent asks next. The agent's question
+    # is always the one shown; the speculation only measures whether showing it early would pay
+    speculative: bool = False
+    max_questions: int = 5
+    _history: List[Tuple[str, str]] = PrivateAttr(default_factory=list)
+    # Question expected next, from the previous turn's speculation
+    _expected: Optional[str] = PrivateAttr(default=None)
 
     def _run(self, question: str) -> str:
         # Retrieve session id from thread-local context set by the web backend when starting the crew
         sid = getattr(session_context, "session_id", None)
         if not sid:
             # Fallback: act like simulated
-            print("[web-tool] session not set; returning empty answer")
+            log.warning("session not set; returning empty answer")
             return ""
-        # Ask through the broker and wait for answer
-        print(f"[web-tool] waiting for answer: session={sid} question={question!r}")
-        answer = broker.ask(sid, question)
-        print(f"[web-tool] got answer: session={sid} answer_len={len(answer)}")
+        if self._expected is not None:
+            self._record("hit" if _same_question(self._expected, question) else "miss", sid)
+            self._expected = None
+        # Ask through the broker and wait for answer (blocks this crew thread only)
+        log.info("waiting for answer", session=sid, question=question)
+        speculation = self._speculate(question) if self._can_speculate() else None
+        try:
+            answer = broker.ask_threadsafe(sid, question)
+        except SessionClosed as e:
+            log.warning("session closed, aborting interview", session=sid, reason=str(e))
+            raise InterviewAborted(str(e)) from e
+        log.info("got answer", session=sid, answer_len=len(answer))
+        self._history.append((question, answer))
+        if speculation is not None:
+            self._expect(sid, answer, speculation)
         return answer
 
+    # ---- speculative next question (shadow mode) ----
+    def _can_speculate(self) -> bool:
+        # +1: the question being asked now
+        return self.speculative and len(self._history) + 1 < self.max_questions
+
+    def _speculate(self, question: str) -> Future:
+        """Generate the next question in the background, from the history so far."""
+        history = self._history + [(question, "(réponse en cours)")]
+        fut: Future = Future()
+
+        def run() -> None:
+            try:
+                from testai.llm_pool import default_llm
+                text = default_llm().call(_SPECULATE_PROMPT.format(
+                    history="\n".join(f"- Q: {q}\n  R: {a}" for q, a in history)))
+                lines = str(text or "").strip().splitlines()
+                fut.set_result(lines[0].strip(" \"«»") if lines else "")
+            except Exception as e:
+                fut.set_exception(e)
+
+        threading.Thread(target=run, name="speculate-question", daemon=True).start()
+        return fut
+
+    def _expect(self, sid: str, answer: str, speculation: Future) -> None:
+        """Keep the pre-generated question, privately, to compare with the agent's next one."""
+        nxt = speculation.result() if speculation.done() and not speculation.exception() else ""
+        if not nxt:
+            self._record("not_ready", sid)
+        elif len(answer.strip()) < SPECULATIVE_MIN_ANSWER or _CLARIFY_RE.search(answer):
+            self._record("skipped", sid)
+        else:
+            self._expected = nxt
+
+    @staticmethod
+    def _record(outcome: str, sid: str) -> None:
+        with _speculation_lock:
+            _speculation[outcome] += 1
+        log.info("speculative question", session=sid, outcome=outcome)
@@ -1,9 +1,11 @@
 from __future__ import annotations
 import os
-import threading
+import time
+import asyncio
 from typing import Optional
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request
+from fastapi.responses import StreamingResponse, FileResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict
@@ -13,7 +15,22 @@ import shutil
 import mimetypes
 
 from testai.crew import Testai
-from testai.web.broker import broker, session_context
+from testai.llm_pool import llm_pool_stats
+from testai.llm_cache import llm_cache
+from testai.llm_transport import cassette
+from testai.metrics import metrics, HTTP_REQUEST, INTERVIEW
+from testai.log import get_logger, log_stats
+from testai.web.broker import broker, session_context, SessionLimitReached, SESSION_SWEEP_INTERVAL
+from testai.tools.rag_index import get_shared_index
+from testai.tools.rag_tool import rag_cache_stats
+from testai.tools.web_ask_tool import speculation_stats, InterviewAborted
+from testai.web.ingest import ExtractionQueue, EXTRACTORS
+from testai.web.scheduler import InterviewScheduler, QueueFull
+from testai.web.reports import ReportStore, parse_json_output
+from testai.web.question_bank import question_bank, job_fingerprint
+
+log = get_logger("crew")
+admin_log = get_logger("admin")
 
 # --- Load environment variables from .env early and set sane defaults ---
 from pathlib import Path as _Path
@@ -56,6 +73,8 @@ class StartPayload(BaseModel):
     offer_tech_skills: Optional[list[str]] = None
     offer_education: Optional[str] = None
     offer_soft_skills: Optional[list[str]] = None
+    # Concurrency-cap key for the scheduler; defaults to role_title
+    tenant: Optional[str] = None
 
 class AnswerPayload(BaseModel):
     answer: str
@@ -73,6 +92,48 @@ class JobConfig(BaseModel):
 # FastAPI app
 app = FastAPI(title="RecruTime Interview Backend")
 
+@app.on_event("startup")
+async def _bind_broker_loop() -> None:
+    # Session state lives on the server loop so async endpoints await it directly
+    broker.bind_loop()
+    _resume_sessions()
+    # Loads the stored question bank of the saved job, or builds it if missing
+    question_bank.schedule(_current_job_config.model_dump())
+    global _resume_task
+    _resume_task = asyncio.get_running_loop().create_task(_resume_forever())
+
+@app.on_event("shutdown")
+async def _stop_broker_sweeper() -> None:
+    if _resume_task is not None:
+        _resume_task.cancel()
+    broker.stop()
+
+
+_resume_task: Optional[asyncio.Task] = None
+
+
+def _resume_sessions() -> None:
+    # Interviews that were running when their worker stopped are rebuilt by the broker
+    # and their crews restarted here; recorded answers are replayed to them
+    for sid, meta in broker.recover():
+        try:
+            payload = StartPayload(**meta)
+            interview_scheduler.submit(sid, payload.tenant or payload.role_title, _run_crew_in_thread, sid, payload,
+                                       meta.get("bank_fingerprint"))
+        except Exception as e:
+            log.error("could not resume session", session=sid, error=str(e))
+            broker.mark_error(sid, "Reprise de l'entretien impossible")
+
+
+async def _resume_forever() -> None:
+    # With a shared broker, sessions of a worker that died are taken over once its lease expires
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            await asyncio.to_thread(_resume_sessions)
+        except Exception as e:
+            log.error("session takeover failed", error=str(e))
+
 # CORS for Angular dev server and optional custom origin
 allowed_origins = [
     os.getenv("FRONTEND_ORIGIN", "http://localhost:4200"),
@@ -85,6 +146,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class RequestTimingMiddleware:
+    """Times every HTTP request into ``testai_http_request_seconds``, labelled with the
+    route template (not the raw path) and attributed to the ``session_id`` path param."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = {"code": 500}
+
+        async def send_timed(message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # The router records the matched route in the scope
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            # Only sessions started here get a breakdown: unknown ids (scans, typos) would
+            # push real interviews out of the METRICS_SESSIONS window
+            sid = (scope.get("path_params") or {}).get("session_id")
+            metrics.observe(HTTP_REQUEST, time.perf_counter() - t0,
+                            session_id=sid if metrics.tracks(sid) else None,
+                            stage=f"http:{scope['method']} {route}",
+                            method=scope["method"], route=route, status=str(status["code"]))
+
+
+app.add_middleware(RequestTimingMiddleware)
+
 # In-memory admin storage with file persistence
 CONFIG_PATH = os.getenv("ADMIN_CONFIG_PATH", os.path.join("runtime", "admin_config.json"))
 
@@ -95,7 +191,7 @@ def load_job_config_from_file() -> JobConfig:
             data = json.loads(path.read_text(encoding="utf-8"))
             return JobConfig(**data)
     except Exception as e:
-        print(f"[admin] failed to load job config: {e}")
+        admin_log.error("failed to load job config", path=CONFIG_PATH, error=str(e))
     return JobConfig()
 
 def save_job_config_to_file(cfg: JobConfig) -> None:
@@ -104,14 +200,35 @@ def save_job_config_to_file(cfg: JobConfig) -> None:
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_text(json.dumps(cfg.model_dump(), ensure_ascii=False, indent=2), encoding="utf-8")
     except Exception as e:
-        print(f"[admin] failed to save job config: {e}")
+        admin_log.error("failed to save job config", path=CONFIG_PATH, error=str(e))
 
 _current_job_config: JobConfig = load_job_config_from_file()
 
 
-def _run_crew_in_thread(session_id: str, payload: StartPayload):
+# Per-dimension scoring tasks (run concurrently by the crew), merged into analysis.json
+SCORING_TASKS = ('tech_scoring_task', 'softskills_scoring_task')
+
+
+def _merge_scores(tasks_output) -> Optional[dict]:
+    analysis: dict = {}
+    for out in tasks_output:
+        if out.name in SCORING_TASKS:
+            scores = out.json_dict or parse_json_output(out.raw)
+            analysis.update(scores if isinstance(scores, dict) else {f"{out.name}_raw": out.raw})
+    return analysis or None
+
+
+def _run_crew_in_thread(session_id: str, payload: StartPayload, bank_fingerprint: Optional[str] = None):
+    st = broker.status(session_id)
+    if not st.get("exists") or st.get("done"):
+        # Expired while waiting in the admission queue
+        log.info("session closed before start, skipping", session=session_id)
+        return
     # Attach session id to this worker thread
     session_context.session_id = session_id
+    session_context.bank_fingerprint = bank_fingerprint
+    metrics.bind_session(session_id)
+    metrics.session_started(session_id)
     
     # Ensure we're in the correct working directory (workspace root)
     import os
@@ -136,30 +253,58 @@ def _run_crew_in_thread(session_id: str, payload: StartPayload):
         }
     }
 
+    report_store.open_session(session_id, payload.role_title, inputs['candidate_name'])
+    status = "done"
+    t0 = time.perf_counter()
     try:
         # Ensure the crew uses the web tool path
         os.environ['USE_WEB_UI'] = '1'
-        print(f"[crew] Starting interview execution in directory: {os.getcwd()}")
-        Testai().crew().kickoff(inputs=inputs)
-        print(f"[crew] Interview completed, checking for report file...")
-        
-        # Verify report file was created
-        report_path = workspace_root / "interview_report.md"
-        if report_path.exists():
-            print(f"[crew] Report successfully created at: {report_path}")
-        else:
-            print(f"[crew] WARNING: Report file not found at: {report_path}")
-            
+        log.info("starting interview", session=session_id, cwd=os.getcwd())
+        # No shared interview_report.md: the report is stored per session below
+        result = Testai(report_file=None, session_id=session_id).crew().kickoff(inputs=inputs)
+        analysis = _merge_scores(result.tasks_output)
+        meta = report_store.finish(session_id, report=result.raw, analysis=analysis)
+        log.info("interview completed, report stored", session=session_id, report_bytes=meta.report_size)
         broker.mark_done(session_id)
+    except InterviewAborted as e:
+        # Session already closed by the broker (expired...): no report from partial answers
+        status = "error"
+        log.warning("interview aborted", session=session_id, reason=str(e))
+        report_store.finish(session_id, error=str(e))
     except Exception as e:
-        print(f"[crew] Error during interview execution: {e}")
+        status = "error"
+        log.error("interview failed", session=session_id, error=str(e))
+        report_store.finish(session_id, error=str(e))
         broker.mark_error(session_id, str(e))
+    finally:
+        metrics.observe(INTERVIEW, time.perf_counter() - t0, status=status)
+        metrics.session_finished(session_id, status)
+        # Worker threads are reused by the next interview
+        metrics.bind_session(None)
 
 
 # -------- Admin endpoints --------
 # File upload to knowledge base (RAG)
 KNOWLEDGE_DIR = os.getenv("KNOWLEDGE_DIR", "knowledge")
-ALLOWED_EXTS = {'.txt', '.md', '.pdf', '.doc', '.docx'}
+ALLOWED_EXTS = {'.txt', '.md', '.pdf', '.docx'}
+
+
+def _mark_knowledge_updated(reason: str = "updated") -> None:
+    """Touch the reindex marker and start an incremental rebuild in the background."""
+    marker = Path(KNOWLEDGE_DIR) / ".updated"
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(reason, encoding="utf-8")
+    # Searches keep serving the previous snapshot until the rebuild is swapped in
+    get_shared_index(KNOWLEDGE_DIR).refresh_async()
+    # Pre-generated questions may cite chunks that changed (checked once uploads settle)
+    question_bank.knowledge_changed(_current_job_config.model_dump())
+
+
+# PDF/DOCX text extraction runs off the request path; each finished job reindexes
+extraction_queue = ExtractionQueue(
+    workers=int(os.getenv("EXTRACT_WORKERS", "2") or 2),
+    on_done=lambda job: _mark_knowledge_updated("extracted"),
+)
 
 @app.get("/api/admin/knowledge")
 def list_knowledge() -> Dict[str, list]:
@@ -196,9 +341,7 @@ def delete_knowledge(name: str) -> Dict[str, bool]:
         sidecar = target.with_suffix(target.suffix + ".txt")
         if sidecar.exists():
             sidecar.unlink()
-        # mark reindex
-        marker = d / ".updated"
-        marker.write_text("deleted", encoding="utf-8")
+        _mark_knowledge_updated("deleted")
         return {"ok": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Delete failed: {e}")
@@ -222,45 +365,95 @@ def upload_document(file: UploadFile = File(...)) -> Dict[str, str]:
         i += 1
     with target_path.open('wb') as out:
         shutil.copyfileobj(file.file, out)
-    # If Office/PDF, leave as-is; the RAG indexer currently reads .txt/.md only.
-    # We can optionally extract text here for .pdf/.docx to a parallel .txt file.
-    _maybe_extract_to_text(target_path)
+    # The RAG indexer reads .txt/.md only: PDF/DOCX are queued for extraction to a
+    # parallel .txt sidecar, poll /api/admin/upload/{job_id} for progress.
+    if ext in EXTRACTORS:
+        job = extraction_queue.submit(target_path)
+        return {"saved": str(target_path), "job_id": job.job_id, "status": job.status}
+    if ext in {'.txt', '.md'}:
+        _mark_knowledge_updated("uploaded")
     return {"saved": str(target_path)}
 
+@app.get("/api/admin/upload/{job_id}")
+def get_upload_job(job_id: str):
+    job = extraction_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 @app.get("/api/admin/reindex")
 def trigger_reindex() -> Dict[str, bool]:
-    # The next RAGSearchTool call will rebuild the index automatically.
-    # We touch a marker file to indicate update if needed.
-    marker = Path(KNOWLEDGE_DIR) / ".updated"
-    marker.parent.mkdir(parents=True, exist_ok=True)
-    marker.write_text("updated", encoding="utf-8")
+    # Only the files that changed since the last build are re-processed
+    _mark_knowledge_updated("updated")
     return {"ok": True}
 
+@app.get("/api/admin/rag/cache")
+def get_rag_cache_stats():
+    # Hit/miss counters of the RAGSearchTool query caches (one per knowledge dir)
+    return {"caches": rag_cache_stats()}
+
 # -------- Admin report endpoints --------
-from fastapi.responses import FileResponse
+# One report.md + analysis.json per interview session, see testai.web.reports
+report_store = ReportStore()
+
+
+def _stored_report(session_id: str) -> dict:
+    meta = report_store.get(session_id) if report_store.valid_id(session_id) else None
+    if not meta:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return meta
+
+
+@app.get("/api/admin/reports")
+def list_reports(offset: int = 0, limit: int = 20, status: Optional[str] = None):
+    total, items = report_store.list(offset=offset, limit=max(1, min(limit, 100)), status=status)
+    return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+@app.get("/api/admin/reports/{session_id}")
+def get_stored_report(session_id: str):
+    meta = _stored_report(session_id)
+    return {**meta, "content": report_store.read_report(session_id), "analysis": report_store.read_analysis(session_id)}
+
+
+@app.get("/api/admin/reports/{session_id}/analysis")
+def get_stored_analysis(session_id: str):
+    _stored_report(session_id)
+    analysis = report_store.read_analysis(session_id)
+    if analysis is None:
+        raise HTTPException(status_code=404, detail="Analysis not found")
+    return analysis
+
+
+@app.get("/api/admin/reports/{session_id}/download")
+def download_stored_report(session_id: str):
+    _stored_report(session_id)
+    p = report_store.report_path(session_id)
+    if not p.exists():
+        raise HTTPException(status_code=404, detail="Report not found")
+    # FileResponse streams the file in chunks
+    return FileResponse(p, media_type="text/markdown", filename=f"interview_report_{session_id}.md")
+
+
+def _latest_report() -> dict:
+    meta = report_store.latest()
+    if not meta:
+        raise HTTPException(status_code=404, detail="No interview report yet")
+    return meta
+
 
 @app.get("/api/admin/report/md")
 def get_interview_report_md():
-    # Use absolute path from workspace root
-    workspace_root = Path.cwd()
-    p = workspace_root / "interview_report.md"
-    if not p.exists():
-        raise HTTPException(status_code=404, detail="interview_report.md not found")
-    try:
-        content = p.read_text(encoding="utf-8")
-        stat = p.stat()
-        return {"name": p.name, "modified": stat.st_mtime, "size": stat.st_size, "content": content}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to read report: {e}")
+    # Kept for older clients: the most recently finished report
+    meta = _latest_report()
+    sid = meta["session_id"]
+    return {"name": f"interview_report_{sid}.md", "session_id": sid, "modified": meta["finished"],
+            "size": meta["report_size"], "content": report_store.read_report(sid) or ""}
+
 
 @app.get("/api/admin/report/raw")
 def download_interview_report_raw():
-    # Use absolute path from workspace root
-    workspace_root = Path.cwd()
-    p = workspace_root / "interview_report.md"
-    if not p.exists():
-        raise HTTPException(status_code=404, detail="interview_report.md not found")
-    return FileResponse(p, media_type="text/markdown", filename=p.name)
+    return download_stored_report(_latest_report()["session_id"])
 
 
 @app.get("/api/admin/job-config")
@@ -268,27 +461,21 @@ def get_job_config() -> JobConfig:
     return _current_job_config
 
 
-def _maybe_extract_to_text(path: Path) -> None:
-    try:
-        ext = path.suffix.lower()
-        if ext in {'.txt', '.md'}:
-            return
-        # For now, we create a sidecar .txt to make it searchable by the current RAG indexer
-        # In the future, integrate a proper PDF/DOCX parser.
-        sidecar = path.with_suffix(path.suffix + '.txt')
-        sidecar.write_text(f"[BINARY_PLACEHOLDER] {path.name}\n(Extraction non implémentée)\n", encoding='utf-8')
-    except Exception as e:
-        print(f"[admin] failed to create sidecar text for {path}: {e}")
-
-
 @app.put("/api/admin/job-config")
 def put_job_config(cfg: JobConfig) -> Dict[str, bool]:
     global _current_job_config
     _current_job_config = cfg
     save_job_config_to_file(cfg)
+    # Pre-generate the technical questions of this job while no candidate waits
+    question_bank.schedule(cfg.model_dump())
     return {"ok": True}
 
 
+@app.get("/api/admin/question-bank")
+def get_question_bank_stats():
+    return question_bank.stats()
+
+
 # Root and docs helper
 @app.get("/")
 def root():
@@ -299,37 +486,157 @@ def doc_alias():
     return {"message": "Use /docs for Swagger UI"}
 
 # -------- Interview endpoints --------
+# Crews run on a fixed worker pool; extra sessions wait in a FIFO admission queue
+interview_scheduler = InterviewScheduler(
+    max_workers=int(os.getenv("MAX_CONCURRENT_INTERVIEWS", "8") or 8),
+    per_key_limit=int(os.getenv("MAX_INTERVIEWS_PER_JOB", "0") or 0),
+    max_queue=int(os.getenv("INTERVIEW_QUEUE_MAX", "200") or 0),
+    on_change=broker.touch,
+)
+
+
+async def _session_state(session_id: str) -> Optional[dict]:
+    # A session that has not been admitted yet reports its queue position
+    state = await broker.poll_state_async(session_id)
+    if state is not None and state["status"] == "waiting":
+        pos = interview_scheduler.position(session_id)
+        if pos is not None:
+            state = {"status": "queued", "position": pos, "seq": state["seq"]}
+    return state
+
+
 @app.post("/api/interview/start")
-def start_interview(payload: StartPayload):
-    sid = broker.new_session()
-    t = threading.Thread(target=_run_crew_in_thread, args=(sid, payload), daemon=True)
-    t.start()
-    return {"session_id": sid}
+async def start_interview(payload: StartPayload):
+    try:
+        # The question bank only serves the job config the interview started with
+        bank_fp = job_fingerprint(_current_job_config.model_dump())
+        sid = await broker.new_session_async(meta={**payload.model_dump(), "bank_fingerprint": bank_fp})
+    except SessionLimitReached as e:
+        raise HTTPException(status_code=503, detail=f"Too many live sessions: {e}",
+                            headers={"Retry-After": "30"})
+    metrics.session_started(sid)
+    # The crew is synchronous (LLM calls + tools); it talks to the async broker through
+    # broker.ask_threadsafe, so only its worker thread waits on the candidate.
+    try:
+        pos = interview_scheduler.submit(sid, payload.tenant or payload.role_title,
+                                         _run_crew_in_thread, sid, payload, bank_fp)
+    except QueueFull as e:
+        await broker.mark_error_async(sid, "Serveur saturé, réessayez plus tard")
+        raise HTTPException(status_code=503, detail=f"Interview queue full: {e}",
+                            headers={"Retry-After": "30"})
+    return {"session_id": sid, "position": pos}
+
+
+@app.get("/api/admin/scheduler")
+def get_scheduler_stats():
+    return interview_scheduler.stats()
+
+
+@app.get("/api/admin/llm")
+def get_llm_pool_stats():
+    # Shared LLM clients (one per model/api key), their in-flight calls, the response cache
+    # the record/replay transport and the shadow speculation hit rate
+    return {"clients": llm_pool_stats(), "cache": llm_cache.stats(), "transport": cassette.stats(),
+            "speculation": speculation_stats()}
+
+
+@app.get("/api/admin/sessions/metrics")
+def get_session_metrics():
+    # Live/archived session counts and the broker's approximate memory footprint
+    return broker.metrics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Stage latency histograms (RAG search, crew tasks, LLM calls, candidate wait, HTTP)
+    and current load, in the Prometheus text format."""
+    sessions = broker.metrics()
+    sched = interview_scheduler.stats()
+    in_flight = [c["in_flight"] for c in llm_pool_stats().values() if c["in_flight"] is not None]
+    logs = log_stats()
+    gauges = {
+        "testai_sessions_live": ("Unfinished interview sessions", sessions.get("live")),
+        "testai_sessions_awaiting_answer": ("Sessions showing a question to the candidate",
+                                            sessions.get("awaiting_answer")),
+        "testai_interviews_running": ("Crews running", sched["running"]),
+        "testai_interviews_queued": ("Sessions waiting for a crew worker", sched["queued"]),
+        "testai_llm_in_flight": ("LLM calls in flight", sum(in_flight) if in_flight else None),
+        "testai_log_queued": ("Log records waiting for the writer thread", logs["queued"]),
+        "testai_log_dropped": ("Log records dropped since start (queue full or write error)", logs["dropped"]),
+    }
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/admin/metrics/sessions")
+def get_slow_sessions(limit: int = 20, running: Optional[bool] = None):
+    # Slowest interviews first, with the time spent per stage (task, llm, rag, candidate wait, http)
+    return {"sessions": metrics.sessions(limit=max(1, min(limit, 500)), running=running)}
+
+
+@app.get("/api/admin/metrics/sessions/{session_id}")
+def get_session_timings(session_id: str):
+    timings = metrics.session(session_id)
+    if timings is None:
+        raise HTTPException(status_code=404, detail="No timings for this session")
+    return timings
+
+
+# Upper bound for one long-poll request; SSE streams send keep-alives at this interval
+LONG_POLL_MAX_WAIT = float(os.getenv("LONG_POLL_MAX_WAIT", "25") or 25)
 
 
 @app.get("/api/interview/{session_id}/question")
-def get_question(session_id: str):
-    st = broker.status(session_id)
-    if not st.get("exists"):
+async def get_question(session_id: str, wait: float = 0, after: int = -1):
+    """Current question state. With ``wait`` > 0 this is a long-poll: if the client has
+    already seen state ``after`` (or nothing is ready yet), the request is held until the
+    broker publishes a change or ``wait`` seconds elapse. Sessions still waiting for a
+    crew worker report ``{"status": "queued", "position": n}``."""
+    state = await _session_state(session_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    wait = max(0.0, min(wait, LONG_POLL_MAX_WAIT))
+    if wait and (state["status"] in ("waiting", "queued") or state["seq"] <= after):
+        await broker.wait_update(session_id, max(after, state["seq"]), wait)
+        state = await _session_state(session_id) or state
+    return state
+
+
+@app.get("/api/interview/{session_id}/events")
+async def question_events(session_id: str, request: Request):
+    """Server-Sent Events stream: one ``queued``/``question``/``waiting``/``done``/``error``
+    event per broker change, comment keep-alives in between. The stream ends when the
+    interview does."""
+    if await broker.poll_state_async(session_id) is None:
         raise HTTPException(status_code=404, detail="Session not found")
-    if st.get("error"):
-        return {"status": "error", "message": st["error"]}
-    if st.get("done"):
-        return {"status": "done"}
 
-    q = broker.get_question(session_id)
-    if q:
-        return {"status": "question", "question": q}
-    else:
-        return {"status": "waiting"}
+    async def stream():
+        seq = -1
+        while True:
+            state = await _session_state(session_id)
+            if state is None:
+                return
+            if state["seq"] > seq:
+                seq = state["seq"]
+                yield f"event: {state['status']}\ndata: {json.dumps(state, ensure_ascii=False)}\n\n"
+                if state["status"] in ("done", "error"):
+                    return
+            if await request.is_disconnected():
+                return
+            if await broker.wait_update(session_id, seq, LONG_POLL_MAX_WAIT) <= seq:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.post("/api/interview/{session_id}/answer")
-def post_answer(session_id: str, payload: AnswerPayload):
-    st = broker.status(session_id)
+async def post_answer(session_id: str, payload: AnswerPayload):
+    st = await broker.status_async(session_id)
     if not st.get("exists"):
         raise HTTPException(status_code=404, detail="Session not found")
-    broker.answer(session_id, payload.answer)
+    if st.get("done"):
+        raise HTTPException(status_code=409, detail="Interview already finished")
+    await broker.answer(session_id, payload.answer)
     return {"ok": True}
 
 
@@ -1,109 +1,595 @@
 from __future__ import annotations
+import os
+import sys
+import json
+import time
+import asyncio
 import threading
 import uuid
+from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
-from typing import Dict, Optional, List
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, List, Tuple
+from concurrent.futures import Future
+
+from testai.log import get_logger
+from testai.metrics import metrics, CANDIDATE_WAIT
+from testai.web.session_log import SessionLog
+
+# Idle seconds before an unfinished session is expired (0 disables)
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600") or 0)
+# Seconds a finished session stays in memory before being archived and evicted
+SESSION_RETAIN = float(os.getenv("SESSION_RETAIN", "300") or 0)
+# Upper bound on sessions held in memory (0 = unbounded)
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "500") or 0)
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "30") or 30)
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", os.path.join("runtime", "sessions"))
+# Write-ahead log of every ask/answer so sessions survive a backend restart
+SESSION_WAL = os.getenv("SESSION_WAL", "1") not in ("0", "false", "False")
+# memory: one process (default) | sqlite: state shared by every worker/host using BROKER_DB
+BROKER_BACKEND = os.getenv("BROKER_BACKEND", "memory").lower()
+
+log = get_logger("broker")
+
+
+class SessionLimitReached(Exception):
+    """Raised by :meth:`BaseBroker.new_session` when ``max_sessions`` live sessions exist."""
+
+
+class SessionClosed(RuntimeError):
+    """Raised to a crew asking in a session that finished (expired, failed, swept),
+    including while it was waiting for the answer."""
+
+
+class BaseBroker(ABC):
+    """Interface between crew threads (which ask questions) and HTTP handlers (which
+    serve them and post answers).
+
+    Crew-side calls (:meth:`ask_threadsafe`, :meth:`mark_done`, :meth:`mark_error`) are
+    blocking and made from the crew's worker thread; request-side calls are either
+    cheap reads or awaitables. :meth:`poll_state` returns the client-facing view
+    ``{"status": "error"|"done"|"question"|"waiting", ..., "seq"}``, where ``seq``
+    grows on every visible change.
+    """
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Called once the server loop runs (app startup)."""
+
+    @abstractmethod
+    def new_session(self, meta: Optional[dict] = None) -> str: ...
+
+    @abstractmethod
+    async def ask(self, sid: str, question: str) -> str: ...
+
+    @abstractmethod
+    def ask_threadsafe(self, sid: str, question: str) -> str: ...
+
+    @abstractmethod
+    async def answer(self, sid: str, answer: str) -> None: ...
+
+    @abstractmethod
+    def mark_done(self, sid: str) -> None: ...
+
+    @abstractmethod
+    def mark_error(self, sid: str, msg: str) -> None: ...
+
+    @abstractmethod
+    def touch(self, sid: str) -> None: ...
+
+    @abstractmethod
+    def get_question(self, sid: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def poll_state(self, sid: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def wait_update(self, sid: str, after_seq: int, timeout: float) -> int: ...
+
+    @abstractmethod
+    def status(self, sid: str) -> dict: ...
+
+    @abstractmethod
+    def transcript(self, sid: str) -> List[dict]: ...
+
+    def recover(self) -> List[Tuple[str, dict]]:
+        """Sessions whose crew must be (re)started by this process, as ``(sid, meta)``."""
+        return []
+
+    def stop(self) -> None:
+        """Release background tasks (app shutdown)."""
+
+    def metrics(self) -> dict:
+        return {}
+
+    # Async handlers call these; backends whose reads block (database) run them off the loop
+    async def new_session_async(self, meta: Optional[dict] = None) -> str:
+        return self.new_session(meta)
+
+    async def poll_state_async(self, sid: str) -> Optional[dict]:
+        return self.poll_state(sid)
+
+    async def status_async(self, sid: str) -> dict:
+        return self.status(sid)
+
+    async def mark_error_async(self, sid: str, msg: str) -> None:
+        self.mark_error(sid, msg)
+
+
+def archive_path(archive_dir: Path, sid: str) -> Path:
+    return Path(archive_dir) / f"{sid}.json"
+
+
+def read_archive(archive_dir: Path, sid: str) -> Optional[dict]:
+    """Transcript archived for a finished session, if any."""
+    try:
+        uuid.UUID(sid)  # also keeps arbitrary path segments out of the archive dir
+        return json.loads(archive_path(archive_dir, sid).read_text(encoding="utf-8"))
+    except (ValueError, OSError):
+        return None
+
+
+def write_archive(archive_dir: Path, sid: str, data: dict) -> None:
+    Path(archive_dir).mkdir(parents=True, exist_ok=True)
+    path = archive_path(archive_dir, sid)
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+    tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
 
 
 @dataclass
 class QAState:
     question: Optional[str] = None
-    answer: Optional[str] = None
-    waiting_event: threading.Event = field(default_factory=threading.Event)
+    # Resolved with the candidate's answer; created by ask() on the broker loop
+    pending: Optional[asyncio.Future] = None
     transcript: List[dict] = field(default_factory=list)
     done: bool = False
     error: Optional[str] = None
+    # Bumped whenever a client-visible change happens (new question, done, error)
+    seq: int = 0
+    # Set (then replaced) on every seq bump; long-poll / SSE requests await it
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    created: float = field(default_factory=time.time)
+    last_activity: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # Recovered after a restart: answers the resumed crew gets instead of asking again,
+    # and the question the candidate was looking at when the backend stopped
+    replay: List[str] = field(default_factory=list)
+    resumed_question: Optional[str] = None
+
+
+class InterviewBroker(BaseBroker):
+    """In-process question/answer rendezvous between crew threads and HTTP requests.
 
+    All session state is owned by one asyncio event loop (the server loop once an
+    async endpoint has touched the broker, otherwise a private background loop), so
+    ``ask``/``answer`` are plain awaitables and waiting for a candidate costs a future,
+    not a thread. Crew threads use :meth:`ask_threadsafe`, :meth:`mark_done` and
+    :meth:`mark_error`, which hop onto the loop.
 
-class InterviewBroker:
-    def __init__(self) -> None:
+    A sweeper task on that loop expires sessions idle for ``ttl`` seconds and, once a
+    session has been finished for ``retain`` seconds, archives its transcript to
+    ``archive_dir/<sid>.json`` and drops it from memory. Archived sessions stay readable
+    through :meth:`poll_state`, :meth:`status` and :meth:`transcript`.
+
+    With a :class:`SessionLog`, every event is also appended to the session's
+    write-ahead log: :meth:`transcript` is served from it, answers are acknowledged
+    once durable and :meth:`recover` rebuilds sessions after a restart.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, retain: float = SESSION_RETAIN,
+                 max_sessions: int = MAX_LIVE_SESSIONS, archive_dir: str = SESSION_ARCHIVE_DIR,
+                 sweep_interval: float = SESSION_SWEEP_INTERVAL, log: Optional[SessionLog] = None) -> None:
         self._lock = threading.Lock()
         self._sessions: Dict[str, QAState] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ttl = ttl
+        self.retain = retain
+        self.max_sessions = max_sessions
+        self.archive_dir = Path(archive_dir)
+        self.sweep_interval = sweep_interval
+        self.log = log
+        self._recovered = False
+        self._sweeper: Optional[asyncio.Task] = None
+        self.expired = 0
+        self.archived = 0
+        self.rejected = 0
+
+    # ---- loop plumbing ----
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Attach the broker to ``loop`` (default: the running loop), e.g. at app startup."""
+        with self._lock:
+            self._loop = loop or asyncio.get_running_loop()
+        self._loop.call_soon_threadsafe(self._start_sweeper)
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and not self._loop.is_closed():
+                return self._loop
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                # No server loop (CLI, scripts): run a private loop in the background
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="broker-loop", daemon=True).start()
+                self._loop = loop
+            self._loop.call_soon_threadsafe(self._start_sweeper)
+            return self._loop
+
+    async def _on_loop(self, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Run coroutine ``fn(*args)`` on the broker loop, awaiting it from any loop."""
+        loop = self._get_loop()
+        if asyncio.get_running_loop() is loop:
+            return await fn(*args)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(fn(*args), loop))
+
+    def _call_threadsafe(self, fn: Callable[..., Any], *args: Any) -> None:
+        loop = self._get_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            fn(*args)
+        else:
+            loop.call_soon_threadsafe(fn, *args)
 
-    def new_session(self) -> str:
+    # ---- sessions ----
+    def new_session(self, meta: Optional[dict] = None) -> str:
+        """Create a session; ``meta`` (e.g. the start payload) is kept in the log for :meth:`recover`."""
         sid = str(uuid.uuid4())
+        self._get_loop()
         with self._lock:
+            if self.max_sessions and len(self._sessions) >= self.max_sessions:
+                self._evict_finished_locked(len(self._sessions) - self.max_sessions + 1)
+                if len(self._sessions) >= self.max_sessions:
+                    self.rejected += 1
+                    raise SessionLimitReached(f"{len(self._sessions)} live sessions")
             self._sessions[sid] = QAState()
+        self._log(sid, "open", meta=meta or {}, seq=0)
         return sid
 
-    def mark_done(self, sid: str) -> None:
+    def _log(self, sid: str, op: str, **fields: Any) -> Optional[Future]:
+        return self.log.append(sid, op, **fields) if self.log else None
+
+    def _notify(self, st: QAState) -> None:
+        """Publish a state change to long-poll/SSE waiters. Runs on the broker loop."""
+        st.seq += 1
+        st.changed.set()
+        st.changed = asyncio.Event()
+
+    def _finish(self, sid: str, error: Optional[str]) -> None:
         st = self._sessions.get(sid)
         if not st:
             return
+        if error is not None:
+            st.error = error
         st.done = True
-        # Release any waiter just in case
-        st.waiting_event.set()
+        st.finished_at = time.time()
+        # The crew must not go on (and get scored) without the candidate
+        if st.pending is not None and not st.pending.done():
+            st.pending.set_exception(SessionClosed(st.error or "Session closed"))
+        self._notify(st)
+        if st.error:
+            self._log(sid, "error", error=st.error, seq=st.seq, close=True)
+        else:
+            self._log(sid, "done", seq=st.seq, close=True)
+
+    def _touch(self, sid: str) -> None:
+        st = self._sessions.get(sid)
+        if st:
+            self._notify(st)
+
+    def touch(self, sid: str) -> None:
+        """Wake long-poll/SSE waiters for a change tracked outside the broker (e.g. queue position)."""
+        self._call_threadsafe(self._touch, sid)
+
+    def mark_done(self, sid: str) -> None:
+        self._call_threadsafe(self._finish, sid, None)
 
     def mark_error(self, sid: str, msg: str) -> None:
+        self._call_threadsafe(self._finish, sid, msg)
+
+    async def _ask(self, sid: str, question: str) -> str:
         st = self._sessions.get(sid)
         if not st:
-            return
-        st.error = msg
-        st.done = True
-        st.waiting_event.set()
+            raise SessionClosed("Unknown session")
+        if st.done:
+            raise SessionClosed(st.error or "Session closed")
+        if st.replay:
+            # Answered before a restart: hand the recorded answer to the resumed crew
+            return st.replay.pop(0)
+        if st.resumed_question is not None:
+            # Keep showing the question the candidate already had on screen
+            question, st.resumed_question = st.resumed_question, None
+        else:
+            self._log(sid, "ask", q=question, seq=st.seq + 1)
+        st.question = question
+        st.last_activity = time.time()
+        st.pending = asyncio.get_running_loop().create_future()
+        log.info("set question", session=sid, question=question[:80])
+        self._notify(st)
+        t0 = time.perf_counter()
+        ans = await st.pending or ""
+        metrics.observe(CANDIDATE_WAIT, time.perf_counter() - t0, session_id=sid)
+        st.transcript.append({"question": question, "answer": ans})
+        log.info("got answer", session=sid, answer_len=len(ans))
+        return ans
+
+    async def ask(self, sid: str, question: str) -> str:
+        """Publish ``question`` and wait (without blocking a thread) for the answer."""
+        return await self._on_loop(self._ask, sid, question)
 
-    def ask(self, sid: str, question: str) -> str:
+    def ask_threadsafe(self, sid: str, question: str) -> str:
+        """Blocking bridge for the crew thread: parks only the calling thread."""
+        return asyncio.run_coroutine_threadsafe(self._ask(sid, question), self._get_loop()).result()
+
+    async def _answer(self, sid: str, answer: str) -> None:
         st = self._sessions.get(sid)
         if not st:
             raise RuntimeError("Unknown session")
-        # Record question and wait for answer
-        with self._lock:
-            st.question = question
-            st.answer = None
-            print(f"[broker] set question for {sid}: {question[:80]!r}")
-            st.waiting_event.clear()
-        # Wait until answer is provided
-        st.waiting_event.wait()
-        with self._lock:
-            ans = st.answer or ""
-            st.transcript.append({"question": question, "answer": ans})
-            print(f"[broker] got answer for {sid}: len={len(ans)}")
-            return ans
+        log.info("answer received", session=sid, answer_len=len(answer))
+        st.last_activity = time.time()
+        durable = None
+        if st.pending is not None and not st.pending.done():
+            durable = self._log(sid, "answer", a=answer, seq=st.seq)
+            st.pending.set_result(answer)
+        elif st.resumed_question is not None:
+            # Recovered session whose crew has not asked yet: queue the answer for it
+            durable = self._log(sid, "answer", a=answer, seq=st.seq)
+            st.transcript.append({"question": st.resumed_question, "answer": answer})
+            st.replay.append(answer)
+            st.resumed_question = None
+        # Clear current question (frontend can fetch next)
+        st.question = None
+        if durable is not None:
+            # Acknowledge the answer only once it is on disk
+            try:
+                await asyncio.wrap_future(durable)
+            except OSError as e:
+                log.error("answer not persisted", session=sid, error=str(e))
+
+    async def answer(self, sid: str, answer: str) -> None:
+        await self._on_loop(self._answer, sid, answer)
 
     def get_question(self, sid: str) -> Optional[str]:
+        st = self._sessions.get(sid)
+        return st.question if st else None
+
+    def poll_state(self, sid: str) -> Optional[dict]:
+        """Client-facing view of the session (status/question/seq)."""
         st = self._sessions.get(sid)
         if not st:
-            return None
-        with self._lock:
-            q = st.question
-        # Debug log (short)
-        if q:
-            print(f"[broker] get_question {sid}: delivering question (len={len(q)})")
-        else:
-            print(f"[broker] get_question {sid}: no question yet")
-        return q
+            arch = self._read_archive(sid)
+            if arch is None:
+                return None
+            if arch.get("error"):
+                return {"status": "error", "message": arch["error"], "seq": arch.get("seq", 0)}
+            return {"status": "done", "seq": arch.get("seq", 0)}
+        st.last_activity = time.time()
+        if st.error:
+            return {"status": "error", "message": st.error, "seq": st.seq}
+        if st.done:
+            return {"status": "done", "seq": st.seq}
+        if st.question:
+            return {"status": "question", "question": st.question, "seq": st.seq}
+        return {"status": "waiting", "seq": st.seq}
 
-    def answer(self, sid: str, answer: str) -> None:
+    async def _wait_update(self, sid: str, after_seq: int, timeout: float) -> int:
         st = self._sessions.get(sid)
         if not st:
-            raise RuntimeError("Unknown session")
-        with self._lock:
-            st.answer = answer
-            print(f"[broker] answer for {sid}: len={len(answer)}")
-            # Clear current question (frontend can fetch next)
-            st.question = None
-        # Wake the waiting tool (outside lock to avoid waking into locked state)
-        st.waiting_event.set()
+            return after_seq
+        if st.seq <= after_seq:
+            try:
+                await asyncio.wait_for(st.changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return st.seq
+
+    async def wait_update(self, sid: str, after_seq: int, timeout: float) -> int:
+        """Wait until the session's ``seq`` exceeds ``after_seq`` or ``timeout`` elapses."""
+        return await self._on_loop(self._wait_update, sid, after_seq, timeout)
+
+    def wait_for_update(self, sid: str, after_seq: int, timeout: Optional[float] = None) -> int:
+        """Blocking counterpart of :meth:`wait_update` for non-async callers."""
+        fut = asyncio.run_coroutine_threadsafe(
+            self._wait_update(sid, after_seq, timeout if timeout is not None else 1e9), self._get_loop())
+        return fut.result()
 
     def status(self, sid: str) -> dict:
         st = self._sessions.get(sid)
         if not st:
-            return {"exists": False}
+            arch = self._read_archive(sid)
+            if arch is None:
+                return {"exists": False}
+            return {
+                "exists": True,
+                "done": True,
+                "error": arch.get("error"),
+                "has_question": False,
+                "transcript_len": len(arch.get("transcript", [])),
+                "seq": arch.get("seq", 0),
+                "archived": True,
+            }
         return {
             "exists": True,
             "done": st.done,
             "error": st.error,
             "has_question": st.question is not None,
             "transcript_len": len(st.transcript),
+            "seq": st.seq,
+            "archived": False,
         }
 
     def transcript(self, sid: str) -> List[dict]:
         st = self._sessions.get(sid)
-        return list(st.transcript) if st else []
+        if st:
+            rec = self.log.replay(sid) if self.log else None
+            return rec.transcript if rec else list(st.transcript)
+        arch = self._read_archive(sid)
+        return arch.get("transcript", []) if arch else []
+
+    # ---- lifecycle: expiry, archiving, eviction ----
+    def _read_archive(self, sid: str) -> Optional[dict]:
+        return read_archive(self.archive_dir, sid)
+
+    def _write_archive(self, sid: str, st: QAState) -> None:
+        write_archive(self.archive_dir, sid, {
+            "session_id": sid,
+            "error": st.error,
+            "seq": st.seq,
+            "created": st.created,
+            "finished": st.finished_at,
+            "transcript": list(st.transcript),
+        })
+
+    def _evict_finished_locked(self, n: int) -> int:
+        """Archive and drop up to ``n`` finished sessions, oldest first. Caller holds ``_lock``."""
+        done = sorted((st.finished_at or 0, sid) for sid, st in self._sessions.items() if st.done)
+        evicted = 0
+        for _, sid in done[:max(0, n)]:
+            try:
+                self._write_archive(sid, self._sessions[sid])
+            except OSError as e:
+                log.error("archive failed", session=sid, error=str(e))
+                continue
+            if self.log:
+                self.log.remove(sid)
+            del self._sessions[sid]
+            self.archived += 1
+            evicted += 1
+        return evicted
+
+    def _start_sweeper(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._sweeper is not None and not self._sweeper.done():
+            if self._sweeper.get_loop() is loop:
+                return
+            # Re-bound to another loop: the old sweeper must not touch sessions any more
+            self._sweeper.get_loop().call_soon_threadsafe(self._sweeper.cancel)
+        self._sweeper = loop.create_task(self._sweep_forever())
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                log.error("sweep failed", error=str(e))
+
+    async def sweep(self, now: Optional[float] = None) -> dict:
+        """Expire idle sessions, then archive/evict sessions finished for ``retain`` seconds."""
+        now = time.time() if now is None else now
+        expired = 0
+        if self.ttl:
+            for sid, st in list(self._sessions.items()):
+                if not st.done and now - st.last_activity > self.ttl:
+                    self._finish(sid, "Session expirée (inactivité)")
+                    expired += 1
+        self.expired += expired
+        stale = [sid for sid, st in list(self._sessions.items())
+                 if st.done and now - (st.finished_at or now) >= self.retain]
+        if not stale:
+            return {"expired": expired, "archived": 0}
+
+        def archive() -> int:
+            # Disk writes stay off the event loop; finished sessions no longer change
+            with self._lock:
+                done = {sid: self._sessions[sid] for sid in stale if sid in self._sessions}
+            written = []
+            for sid, st in done.items():
+                try:
+                    self._write_archive(sid, st)
+                    if self.log:
+                        self.log.remove(sid)
+                    written.append(sid)
+                except OSError as e:
+                    log.error("archive failed", session=sid, error=str(e))
+            with self._lock:
+                for sid in written:
+                    self._sessions.pop(sid, None)
+                self.archived += len(written)
+            return len(written)
 
+        archived = await asyncio.get_running_loop().run_in_executor(None, archive)
+        return {"expired": expired, "archived": archived}
 
-broker = InterviewBroker()
+    def recover(self) -> List[Tuple[str, dict]]:
+        """Rebuild sessions from the write-ahead log after a restart.
+
+        Returns ``(sid, meta)`` for interviews that were still running so the caller can
+        start their crews again; the answers already given are replayed to the new crew
+        instead of being asked again.
+        """
+        if not self.log or self._recovered:
+            return []
+        # Only sessions of a previous process can need resuming: scan the logs once
+        self._recovered = True
+        resume: List[Tuple[str, dict]] = []
+        for sid in self.log.session_ids():
+            if sid in self._sessions:
+                continue
+            rec = self.log.replay(sid)
+            if rec is None:
+                continue
+            # seq moves past anything a client saw before the restart
+            st = QAState(transcript=rec.transcript, done=rec.done, error=rec.error, seq=rec.seq + 1,
+                         created=rec.created or time.time(), finished_at=rec.finished)
+            if not rec.done:
+                st.replay = [qa["answer"] for qa in rec.transcript]
+                st.question = st.resumed_question = rec.question
+                resume.append((sid, rec.meta))
+            with self._lock:
+                self._sessions[sid] = st
+        if resume:
+            log.info("recovered running sessions from the log", count=len(resume))
+        return resume
+
+    def stop(self) -> None:
+        """Cancel the sweeper task (app shutdown)."""
+        if self._sweeper is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._sweeper.cancel)
+        self._sweeper = None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        footprint = 0
+        for st in sessions:
+            footprint += sys.getsizeof(st) + sys.getsizeof(st.transcript) + sys.getsizeof(st.question or "")
+            for qa in st.transcript:
+                footprint += sys.getsizeof(qa) + sum(sys.getsizeof(v) for v in qa.values())
+        try:
+            on_disk = sum(1 for e in os.scandir(self.archive_dir) if e.name.endswith(".json"))
+        except OSError:
+            on_disk = 0
+        return {
+            "live": sum(1 for st in sessions if not st.done),
+            "finished_in_memory": sum(1 for st in sessions if st.done),
+            "awaiting_answer": sum(1 for st in sessions if st.question is not None and not st.done),
+            "max_sessions": self.max_sessions,
+            "ttl_s": self.ttl,
+            "retain_s": self.retain,
+            "expired_total": self.expired,
+            "archived_total": self.archived,
+            "archived_on_disk": on_disk,
+            "rejected_total": self.rejected,
+            "memory_bytes_estimate": footprint,
+            "wal": self.log.stats() if self.log else None,
+        }
+
+
+def create_broker(backend: str = BROKER_BACKEND) -> BaseBroker:
+    if backend == "sqlite":
+        # Needed with several uvicorn workers or hosts: a question set by the crew in one
+        # worker must be visible to the request that lands on another
+        from testai.web.broker_sqlite import SQLiteBroker
+        return SQLiteBroker()
+    if backend != "memory":
+        raise ValueError(f"Unknown BROKER_BACKEND: {backend!r}")
+    return InterviewBroker(log=SessionLog() if SESSION_WAL else None)
+
+
+broker = create_broker()
 
 # Thread-local context to carry the current session id inside the Crew execution thread
 session_context = threading.local()
-
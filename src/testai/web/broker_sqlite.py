@@ -0,0 +1,462 @@
+from __future__ import annotations
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from testai.log import get_logger
+from testai.metrics import metrics, CANDIDATE_WAIT
+from testai.web.broker import (
+    BaseBroker, SessionClosed, SessionLimitReached, SESSION_TTL, SESSION_RETAIN, MAX_LIVE_SESSIONS, SESSION_SWEEP_INTERVAL,
+    SESSION_ARCHIVE_DIR, read_archive, write_archive,
+)
+
+BROKER_DB = os.getenv("BROKER_DB", os.path.join("runtime", "broker.sqlite3"))
+# How often waiters re-read the database for changes made by other processes
+BROKER_POLL_MS = float(os.getenv("BROKER_POLL_MS", "100") or 100)
+# A running session whose owner has not heartbeaten for this long is taken over
+BROKER_LEASE = float(os.getenv("BROKER_LEASE", "60") or 60)
+
+log = get_logger("broker")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    sid TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL DEFAULT 0,
+    question TEXT,
+    done INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    meta TEXT,
+    owner TEXT,
+    heartbeat REAL,
+    created REAL NOT NULL,
+    last_activity REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS sessions_live ON sessions(done, heartbeat);
+CREATE TABLE IF NOT EXISTS qa (
+    sid TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT,
+    answered_at REAL,
+    PRIMARY KEY (sid, n)
+);
+"""
+
+
+class SQLiteBroker(BaseBroker):
+    """Broker whose state lives in one SQLite database (WAL mode) shared by every
+    backend worker process, or by several hosts on a shared volume.
+
+    The worker that accepted ``/start`` owns the session and runs its crew; any worker
+    can serve the question and take the answer. Questions are rows of the ``qa`` table;
+    an answer fills its row and the owner picks it up. Same-process waiters are woken
+    immediately, cross-process changes are seen within ``poll_interval``.
+
+    Owners heartbeat their running sessions. :meth:`recover` takes over sessions whose
+    owner stopped heartbeating for ``lease`` seconds; the new crew gets the recorded
+    answers back instead of asking again. The idle ``ttl`` counts from the last
+    question, answer or client poll (like the in-memory broker; polls write at most once
+    per ``ttl / 10``, 30 s max, to spare the database lock); sessions finished for ``retain`` seconds are archived to
+    ``archive_dir`` (shared by the workers, like the database) and deleted.
+
+    Async handlers never touch the database on the event loop: single reads and writes
+    go through ``asyncio.to_thread`` and long-poll waiters are resolved by one watcher
+    thread that reads the ``seq`` of every watched session once per ``poll_interval``.
+    """
+
+    def __init__(self, path: str = BROKER_DB, poll_interval: float = BROKER_POLL_MS / 1000,
+                 ttl: float = SESSION_TTL, retain: float = SESSION_RETAIN, max_sessions: int = MAX_LIVE_SESSIONS,
+                 lease: float = BROKER_LEASE, sweep_interval: float = SESSION_SWEEP_INTERVAL,
+                 archive_dir: str = SESSION_ARCHIVE_DIR) -> None:
+        self.path = path
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        # Polls refresh last_activity only when it is older than this
+        self.activity_step = min(30.0, ttl / 10) if ttl else 0.0
+        self.retain = retain
+        self.archive_dir = archive_dir
+        self.max_sessions = max_sessions
+        self.lease = lease
+        self.sweep_interval = sweep_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._local = threading.local()
+        # Wakes this process's crew threads when an answer arrives through this process
+        self._cond = threading.Condition()
+        # Crew progress of the sessions owned here: number of qa rows already consumed
+        self._cursor: Dict[str, int] = {}
+        self._stopped = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+        # Long-poll waiters: sid -> [(loop, future, seq seen by the client)]
+        self._watchers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Future, int]]] = {}
+        self._watch_lock = threading.Lock()
+        self._watcher: Optional[threading.Thread] = None
+        self._poke = threading.Event()
+        self.expired = 0
+        self.archived = 0
+        self.rejected = 0
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+
+    # ---- storage ----
+    def _db(self) -> sqlite3.Connection:
+        # One connection per thread; autocommit, explicit BEGIN IMMEDIATE for writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _tx(self) -> Iterator[sqlite3.Connection]:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    def _write(self, sql: str, *params) -> int:
+        return self._db().execute(sql, params).rowcount
+
+    def _row(self, sid: str) -> Optional[sqlite3.Row]:
+        return self._db().execute("SELECT * FROM sessions WHERE sid = ?", (sid,)).fetchone()
+
+    def _wake(self) -> None:
+        with self._cond:
+            self._cond.notify_all()
+        # Long-poll waiters of this process see the change without waiting for the next poll
+        self._poke.set()
+
+    def _start_heartbeat(self) -> None:
+        if self._heartbeat is None:
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="broker-heartbeat", daemon=True)
+            self._heartbeat.start()
+
+    def bind_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        # Heartbeats and idle expiry run on a thread: nothing is tied to the server loop
+        self._start_heartbeat()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopped.wait(min(self.lease / 3, self.sweep_interval)):
+            try:
+                now = time.time()
+                self._write("UPDATE sessions SET heartbeat = ? WHERE owner = ? AND done = 0", now, self.owner)
+                if self.ttl:
+                    self.expired += self._write(
+                        "UPDATE sessions SET done = 1, error = ?, finished_at = ?, question = NULL, seq = seq + 1 "
+                        "WHERE done = 0 AND last_activity < ?",
+                        "Session expirée (inactivité)", now, now - self.ttl)
+                self._wake()
+                self._archive_finished(now)
+            except sqlite3.Error as e:
+                log.warning("heartbeat failed", error=str(e))
+
+    def _archive_finished(self, now: float) -> int:
+        """Archive sessions finished for ``retain`` seconds, then delete their rows."""
+        db = self._db()
+        stale = db.execute("SELECT * FROM sessions WHERE done = 1 AND finished_at <= ?",
+                           (now - self.retain,)).fetchall()
+        archived = 0
+        for row in stale:
+            sid = row["sid"]
+            try:
+                write_archive(self.archive_dir, sid, {
+                    "session_id": sid,
+                    "error": row["error"],
+                    "seq": row["seq"],
+                    "created": row["created"],
+                    "finished": row["finished_at"],
+                    "transcript": self.transcript(sid),
+                })
+            except OSError as e:
+                log.error("archive failed", session=sid, error=str(e))
+                continue
+            # Another worker may archive the same session: the file is identical and the
+            # delete below simply finds nothing
+            with self._tx() as tx:
+                tx.execute("DELETE FROM qa WHERE sid = ?", (sid,))
+                archived += tx.execute("DELETE FROM sessions WHERE sid = ?", (sid,)).rowcount
+        self.archived += archived
+        return archived
+
+    # ---- sessions ----
+    def new_session(self, meta: Optional[dict] = None) -> str:
+        sid = str(uuid.uuid4())
+        now = time.time()
+        with self._tx() as db:
+            if self.max_sessions:
+                live = db.execute("SELECT COUNT(*) FROM sessions WHERE done = 0").fetchone()[0]
+                if live >= self.max_sessions:
+                    self.rejected += 1
+                    raise SessionLimitReached(f"{live} live sessions")
+            db.execute("INSERT INTO sessions (sid, meta, owner, heartbeat, created, last_activity) "
+                       "VALUES (?, ?, ?, ?, ?, ?)", (sid, json.dumps(meta or {}, ensure_ascii=False),
+                                                     self.owner, now, now, now))
+        self._cursor[sid] = 0
+        self._start_heartbeat()
+        return sid
+
+    def ask_threadsafe(self, sid: str, question: str) -> str:
+        row = self._row(sid)
+        if row is None:
+            raise SessionClosed("Unknown session")
+        if row["done"]:
+            raise SessionClosed(row["error"] or "Session closed")
+        n = self._cursor.get(sid, 0) + 1
+        db = self._db()
+        qa = db.execute("SELECT question, answer FROM qa WHERE sid = ? AND n = ?", (sid, n)).fetchone()
+        if qa is None:
+            with self._tx() as tx:
+                tx.execute("INSERT INTO qa (sid, n, question) VALUES (?, ?, ?)", (sid, n, question))
+                tx.execute("UPDATE sessions SET question = ?, seq = seq + 1, last_activity = ? WHERE sid = ?",
+                           (question, time.time(), sid))
+            self._poke.set()
+            log.info("set question", session=sid, question=question[:80])
+        # else: recorded before a takeover; an existing answer is returned straight away and
+        # an unanswered question stays the one the candidate sees
+        t0 = time.perf_counter()
+        while True:
+            qa = db.execute("SELECT answer FROM qa WHERE sid = ? AND n = ?", (sid, n)).fetchone()
+            if qa["answer"] is not None:
+                self._cursor[sid] = n
+                metrics.observe(CANDIDATE_WAIT, time.perf_counter() - t0, session_id=sid)
+                log.info("got answer", session=sid, answer_len=len(qa["answer"]))
+                return qa["answer"]
+            row = self._row(sid)
+            if row is None or row["done"]:
+                raise SessionClosed((row["error"] if row else None) or "Session closed")
+            with self._cond:
+                self._cond.wait(self.poll_interval)
+
+    async def new_session_async(self, meta: Optional[dict] = None) -> str:
+        # BEGIN IMMEDIATE may wait busy_timeout for other writers
+        return await asyncio.to_thread(self.new_session, meta)
+
+    async def ask(self, sid: str, question: str) -> str:
+        return await asyncio.to_thread(self.ask_threadsafe, sid, question)
+
+    def _answer(self, sid: str, answer: str) -> None:
+        log.info("answer received", session=sid, answer_len=len(answer))
+        now = time.time()
+        with self._tx() as db:
+            db.execute("UPDATE qa SET answer = ?, answered_at = ? WHERE sid = ? AND answer IS NULL "
+                       "AND n = (SELECT MAX(n) FROM qa WHERE sid = ?)", (answer, now, sid, sid))
+            # Clear current question (frontend can fetch next)
+            db.execute("UPDATE sessions SET question = NULL, last_activity = ? WHERE sid = ?", (now, sid))
+        self._wake()
+
+    async def answer(self, sid: str, answer: str) -> None:
+        await asyncio.to_thread(self._answer, sid, answer)
+
+    def _finish(self, sid: str, error: Optional[str]) -> None:
+        self._write("UPDATE sessions SET done = 1, error = COALESCE(?, error), finished_at = ?, "
+                    "question = NULL, seq = seq + 1 WHERE sid = ?", error, time.time(), sid)
+        self._cursor.pop(sid, None)
+        self._wake()
+
+    def mark_done(self, sid: str) -> None:
+        self._finish(sid, None)
+
+    def mark_error(self, sid: str, msg: str) -> None:
+        self._finish(sid, msg)
+
+    async def mark_error_async(self, sid: str, msg: str) -> None:
+        await asyncio.to_thread(self._finish, sid, msg)
+
+    def _touch(self, sid: str) -> None:
+        self._write("UPDATE sessions SET seq = seq + 1 WHERE sid = ?", sid)
+        self._poke.set()
+
+    def touch(self, sid: str) -> None:
+        try:
+            # Called by the scheduler, possibly from the server loop (/start)
+            asyncio.get_running_loop().run_in_executor(None, self._touch, sid)
+        except RuntimeError:
+            self._touch(sid)
+
+    def get_question(self, sid: str) -> Optional[str]:
+        row = self._row(sid)
+        return row["question"] if row else None
+
+    def poll_state(self, sid: str) -> Optional[dict]:
+        row = self._row(sid)
+        if row is None:
+            arch = read_archive(self.archive_dir, sid)
+            if arch is None:
+                return None
+            if arch.get("error"):
+                return {"status": "error", "message": arch["error"], "seq": arch.get("seq", 0)}
+            return {"status": "done", "seq": arch.get("seq", 0)}
+        if row["error"]:
+            return {"status": "error", "message": row["error"], "seq": row["seq"]}
+        if row["done"]:
+            return {"status": "done", "seq": row["seq"]}
+        now = time.time()
+        if self.ttl and now - row["last_activity"] > self.activity_step:
+            # A candidate still polling (queued, or thinking) keeps the session alive
+            self._write("UPDATE sessions SET last_activity = ? WHERE sid = ? AND done = 0", now, sid)
+        if row["question"]:
+            return {"status": "question", "question": row["question"], "seq": row["seq"]}
+        return {"status": "waiting", "seq": row["seq"]}
+
+    async def poll_state_async(self, sid: str) -> Optional[dict]:
+        return await asyncio.to_thread(self.poll_state, sid)
+
+    # ---- long-poll ----
+    async def wait_update(self, sid: str, after_seq: int, timeout: float) -> int:
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future(), after_seq)
+        with self._watch_lock:
+            self._watchers.setdefault(sid, []).append(waiter)
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch_loop, name="broker-watch", daemon=True)
+                self._watcher.start()
+        self._poke.set()
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter[1]), timeout)
+        except asyncio.TimeoutError:
+            return after_seq
+        finally:
+            with self._watch_lock:
+                waiters = self._watchers.get(sid, [])
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._watchers.pop(sid, None)
+
+    def _watch_loop(self) -> None:
+        db = self._db()
+        while not self._stopped.is_set():
+            self._poke.wait(self.poll_interval)
+            self._poke.clear()
+            with self._watch_lock:
+                sids = list(self._watchers)
+            if not sids:
+                continue
+            seqs: Dict[str, int] = {}
+            try:
+                for i in range(0, len(sids), 500):  # SQLite bound-parameter limit
+                    part = sids[i:i + 500]
+                    rows = db.execute(f"SELECT sid, seq FROM sessions WHERE sid IN ({','.join('?' * len(part))})",
+                                      part).fetchall()
+                    seqs.update((r["sid"], r["seq"]) for r in rows)
+            except sqlite3.Error as e:
+                log.warning("watch failed", error=str(e))
+                continue
+            with self._watch_lock:
+                for sid in sids:
+                    seq = seqs.get(sid)
+                    for loop, fut, after in self._watchers.get(sid, []):
+                        # A vanished row (archived) ends the wait too
+                        if seq is None or seq > after:
+                            loop.call_soon_threadsafe(self._resolve, fut, after if seq is None else seq)
+
+    @staticmethod
+    def _resolve(fut: asyncio.Future, seq: int) -> None:
+        if not fut.done():
+            fut.set_result(seq)
+
+    def status(self, sid: str) -> dict:
+        row = self._row(sid)
+        if row is None:
+            arch = read_archive(self.archive_dir, sid)
+            if arch is None:
+                return {"exists": False}
+            return {
+                "exists": True,
+                "done": True,
+                "error": arch.get("error"),
+                "has_question": False,
+                "transcript_len": len(arch.get("transcript", [])),
+                "seq": arch.get("seq", 0),
+                "archived": True,
+            }
+        n = self._db().execute("SELECT COUNT(*) FROM qa WHERE sid = ? AND answer IS NOT NULL", (sid,)).fetchone()[0]
+        return {
+            "exists": True,
+            "done": bool(row["done"]),
+            "error": row["error"],
+            "has_question": row["question"] is not None,
+            "transcript_len": n,
+            "seq": row["seq"],
+            "owner": row["owner"],
+            "archived": False,
+        }
+
+    async def status_async(self, sid: str) -> dict:
+        return await asyncio.to_thread(self.status, sid)
+
+    def transcript(self, sid: str) -> List[dict]:
+        rows = self._db().execute("SELECT question, answer FROM qa WHERE sid = ? AND answer IS NOT NULL "
+                                  "ORDER BY n", (sid,)).fetchall()
+        if not rows and self._row(sid) is None:
+            arch = read_archive(self.archive_dir, sid)
+            return arch.get("transcript", []) if arch else []
+        return [{"question": r["question"], "answer": r["answer"]} for r in rows]
+
+    # ---- ownership ----
+    def recover(self) -> List[Tuple[str, dict]]:
+        """Take over running sessions whose owner's lease expired (crash, redeploy)."""
+        now = time.time()
+        db = self._db()
+        stale = db.execute("SELECT sid FROM sessions WHERE done = 0 AND owner != ? AND "
+                           "(heartbeat IS NULL OR heartbeat < ?)", (self.owner, now - self.lease)).fetchall()
+        resume: List[Tuple[str, dict]] = []
+        for r in stale:
+            # The conditional update makes the claim atomic between competing workers
+            claimed = self._write("UPDATE sessions SET owner = ?, heartbeat = ?, seq = seq + 1 WHERE sid = ? "
+                                  "AND done = 0 AND (heartbeat IS NULL OR heartbeat < ?)",
+                                  self.owner, now, r["sid"], now - self.lease)
+            if claimed:
+                meta = json.loads(self._row(r["sid"])["meta"] or "{}")
+                self._cursor[r["sid"]] = 0
+                resume.append((r["sid"], meta))
+        if resume:
+            self._start_heartbeat()
+            log.info("took over running sessions", count=len(resume))
+        return resume
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._poke.set()
+
+    def metrics(self) -> dict:
+        db = self._db()
+        live, finished = db.execute("SELECT COALESCE(SUM(done = 0), 0), COALESCE(SUM(done = 1), 0) "
+                                    "FROM sessions").fetchone()
+        awaiting = db.execute("SELECT COUNT(*) FROM sessions WHERE done = 0 AND question IS NOT NULL").fetchone()[0]
+        owners = db.execute("SELECT COUNT(DISTINCT owner) FROM sessions WHERE done = 0").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "db": self.path,
+            "db_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "live": live,
+            "finished": finished,
+            "awaiting_answer": awaiting,
+            "owned_here": len(self._cursor),
+            "owners": owners,
+            "max_sessions": self.max_sessions,
+            "ttl_s": self.ttl,
+            "retain_s": self.retain,
+            "expired_total": self.expired,
+            "archived_total": self.archived,
+            "rejected_total": self.rejected,
+            "long_poll_waiters": sum(len(w) for w in list(self._watchers.values())),
+        }
@@ -0,0 +1,253 @@
+from __future__ import annotations
+import os
+import re
+import time
+import uuid
+import zlib
+import queue
+import zipfile
+import threading
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from testai.log import get_logger
+
+try:  # optional, pure-Python and more complete than the built-in PDF fallback
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+log = get_logger("admin")
+
+
+# ---------------- Text extraction ----------------
+
+_W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def extract_docx(path: Path) -> str:
+    """Extract paragraph text from a .docx (zip + WordprocessingML), one blank line between paragraphs."""
+    with zipfile.ZipFile(path) as zf:
+        xml = zf.read("word/document.xml")
+    root = ET.fromstring(xml)
+    paras: List[str] = []
+    for p in root.iter(f"{_W_NS}p"):
+        parts: List[str] = []
+        for node in p.iter():
+            if node.tag == f"{_W_NS}t" and node.text:
+                parts.append(node.text)
+            elif node.tag == f"{_W_NS}tab":
+                parts.append("\t")
+            elif node.tag in (f"{_W_NS}br", f"{_W_NS}cr"):
+                parts.append("\n")
+        text = "".join(parts).strip()
+        if text:
+            paras.append(text)
+    return "\n\n".join(paras)
+
+
+_PDF_STREAM_RE = re.compile(rb"<<(.*?)>>\s*stream\r?\n(.*?)\r?\nendstream", re.S)
+_PDF_TEXT_BLOCK_RE = re.compile(rb"BT(.*?)ET", re.S)
+_PDF_TOKEN_RE = re.compile(rb"\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>|\[|\]|T\*|Tj|TJ|Td|TD|'|\"")
+_PDF_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f",
+                b"(": b"(", b")": b")", b"\\": b"\\"}
+
+
+def _pdf_unescape(raw: bytes) -> bytes:
+    out = bytearray()
+    i = 0
+    while i < len(raw):
+        c = raw[i:i + 1]
+        if c != b"\\":
+            out += c
+            i += 1
+            continue
+        nxt = raw[i + 1:i + 2]
+        if nxt in _PDF_ESCAPES:
+            out += _PDF_ESCAPES[nxt]
+            i += 2
+        elif nxt and nxt in b"01234567":
+            m = re.match(rb"[0-7]{1,3}", raw[i + 1:i + 4])
+            out.append(int(m.group(0), 8) & 0xFF)
+            i += 1 + len(m.group(0))
+        elif nxt in (b"\r", b"\n"):  # line continuation
+            i += 3 if raw[i + 1:i + 3] == b"\r\n" else 2
+        else:  # unknown escape: the backslash is ignored
+            out += nxt
+            i += 2
+    return bytes(out)
+
+
+def _pdf_unhex(raw: bytes) -> Optional[bytes]:
+    """Decode a ``<...>`` string; None when it holds multi-byte glyph ids (Type0 fonts),
+    which only the font's ToUnicode map can turn into text."""
+    digits = re.sub(rb"\s+", b"", raw)
+    data = bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii"))
+    if any(b < 0x20 and b not in b"\t\n\r" for b in data):
+        return None
+    return data
+
+
+def _extract_pdf_builtin(data: bytes) -> str:
+    """Best-effort text extraction for simple PDFs (Flate streams, literal and hex string
+    text operators). Raises when the only text is glyph ids of embedded fonts."""
+    paras: List[str] = []
+    glyph_strings = 0
+    for header, body in _PDF_STREAM_RE.findall(data):
+        if b"/FlateDecode" in header:
+            try:
+                body = zlib.decompress(body)
+            except zlib.error:
+                continue
+        elif b"/Filter" in header:
+            continue  # images and other encodings
+        for block in _PDF_TEXT_BLOCK_RE.findall(body):
+            line: List[str] = []
+            lines: List[str] = []
+            for tok in _PDF_TOKEN_RE.findall(block):
+                if tok.startswith(b"("):
+                    line.append(_pdf_unescape(tok[1:-1]).decode("latin-1"))
+                elif tok.startswith(b"<"):
+                    data = _pdf_unhex(tok[1:-1])
+                    if data is None:
+                        glyph_strings += 1
+                    else:
+                        line.append(data.decode("latin-1"))
+                elif tok in (b"T*", b"Td", b"TD", b"'", b"\"") and line:
+                    lines.append("".join(line))
+                    line = []
+            if line:
+                lines.append("".join(line))
+            text = "\n".join(s.strip() for s in lines if s.strip())
+            if text:
+                paras.append(text)
+    if not paras and glyph_strings:
+        raise ValueError("PDF text is encoded as embedded-font glyph ids, which the built-in "
+                         "extractor cannot map to characters; install pypdf or upload a .docx/.txt")
+    return "\n\n".join(paras)
+
+
+def extract_pdf(path: Path) -> str:
+    if PdfReader is not None:
+        reader = PdfReader(str(path))
+        return "\n\n".join((page.extract_text() or "").strip() for page in reader.pages).strip()
+    return _extract_pdf_builtin(path.read_bytes())
+
+
+EXTRACTORS: Dict[str, Callable[[Path], str]] = {
+    ".pdf": extract_pdf,
+    ".docx": extract_docx,
+}
+
+
+def sidecar_path(path: Path) -> Path:
+    # Same naming the knowledge endpoints already use: report.pdf -> report.pdf.txt
+    return path.with_suffix(path.suffix + ".txt")
+
+
+# ---------------- Background job queue ----------------
+
+@dataclass
+class ExtractionJob:
+    job_id: str
+    path: str
+    status: str = "queued"  # queued | running | done | error
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    chars: int = 0
+    sidecar: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ExtractionQueue:
+    """Worker threads that turn uploaded PDF/DOCX files into ``.txt`` sidecars for the RAG index.
+
+    Uploads only enqueue a job and return its id; ``on_done`` is called after each
+    successful extraction (used to trigger the incremental reindex).
+    """
+
+    def __init__(self, workers: int = 2, on_done: Optional[Callable[[ExtractionJob], None]] = None,
+                 max_jobs: int = 500) -> None:
+        self._q: "queue.Queue[str]" = queue.Queue()
+        self._jobs: Dict[str, ExtractionJob] = {}
+        self._lock = threading.Lock()
+        self._on_done = on_done
+        self._max_jobs = max_jobs
+        self._workers = max(1, workers)
+        self._threads: List[threading.Thread] = []
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        for i in range(self._workers):
+            t = threading.Thread(target=self._worker, name=f"extract-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, path: Path) -> ExtractionJob:
+        job = ExtractionJob(job_id=str(uuid.uuid4()), path=str(path))
+        with self._lock:
+            self._ensure_started()
+            self._jobs[job.job_id] = job
+            self._trim()
+        self._q.put(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return asdict(job) if job else None
+
+    def _trim(self) -> None:
+        # Forget the oldest finished jobs so the status table stays bounded
+        if len(self._jobs) <= self._max_jobs:
+            return
+        for jid in [j.job_id for j in sorted(self._jobs.values(), key=lambda j: j.created)
+                    if j.status in ("done", "error")][:len(self._jobs) - self._max_jobs]:
+            del self._jobs[jid]
+
+    def _worker(self) -> None:
+        while True:
+            job_id = self._q.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job:
+                    job.status = "running"
+                    job.started = time.time()
+            if job:
+                self._run(job)
+            self._q.task_done()
+
+    def _run(self, job: ExtractionJob) -> None:
+        path = Path(job.path)
+        try:
+            extractor = EXTRACTORS.get(path.suffix.lower())
+            if extractor is None:
+                raise ValueError(f"Extraction not supported for {path.suffix} files")
+            text = extractor(path).strip()
+            if not text:
+                raise ValueError("No extractable text found")
+            out = sidecar_path(path)
+            tmp = out.with_name(out.name + ".part")  # not .txt/.md: invisible to the indexer
+            tmp.write_text(text + "\n", encoding="utf-8")
+            os.replace(tmp, out)
+            with self._lock:
+                job.status = "done"
+                job.chars = len(text)
+                job.sidecar = str(out)
+                job.finished = time.time()
+        except Exception as e:
+            log.error("extraction failed", path=str(path), error=str(e))
+            with self._lock:
+                job.status = "error"
+                job.error = str(e)
+                job.finished = time.time()
+            return
+        if self._on_done:
+            try:
+                self._on_done(job)
+            except Exception as e:
+                log.error("post-extraction hook failed", path=str(path), error=str(e))
@@ -0,0 +1,292 @@
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from testai.llm_cache import llm_cache
+from testai.llm_pool import default_llm
+from testai.log import get_logger
+from testai.web.reports import parse_json_output
+
+QUESTION_BANK_DIR = os.getenv("QUESTION_BANK_DIR", os.path.join("runtime", "question_bank"))
+# Questions pre-generated per job config, and how many chunks go into one LLM call
+QUESTION_BANK_SIZE = int(os.getenv("QUESTION_BANK_SIZE", "15") or 0)
+QUESTION_BANK_BATCH = int(os.getenv("QUESTION_BANK_BATCH", "5") or 5)
+# Quiet seconds after the last knowledge change before the bank is checked against it
+QUESTION_BANK_DEBOUNCE = float(os.getenv("QUESTION_BANK_DEBOUNCE", "10") or 0)
+
+log = get_logger("question-bank")
+
+# The generation prompt is the job config and knowledge chunks only: identical batches
+# (unchanged chunks after a rebuild, other workers building the same bank) hit the cache
+CACHE_STEP = "question_bank"
+llm_cache.enable_task(CACHE_STEP)
+
+# Job config fields the questions depend on
+_JOB_FIELDS = ("title", "department", "experience", "requirements", "company_name")
+
+_PROMPT = """Tu prépares un entretien technique pour le poste « {title} » ({experience}).
+Exigences du poste : {requirements}
+
+Voici des extraits de la base de connaissances, chacun avec son chunk_id :
+{chunks}
+
+Formule EXACTEMENT une question technique par extrait, fondée uniquement sur son contenu.
+Réponds uniquement en JSON :
+{{"questions": [{{"q": "question", "chunk_id": "chunk_id de l'extrait", "context": "court contexte extrait du chunk"}}]}}"""
+
+
+def job_fingerprint(job: Dict[str, Any]) -> str:
+    data = {k: (job.get(k) or "") for k in _JOB_FIELDS}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def job_queries(job: Dict[str, Any]) -> List[str]:
+    """RAG queries for a job: its title plus each requirement line/item."""
+    parts = [job.get("title") or ""]
+    parts += re.split(r"[\n,;•]+", job.get("requirements") or "")
+    seen, out = set(), []
+    for p in parts:
+        p = p.strip(" -*\t")
+        if p and p.lower() not in seen:
+            seen.add(p.lower())
+            out.append(p)
+    return out
+
+
+class QuestionBank:
+    """RAG-grounded technical questions generated ahead of interviews, per job config.
+
+    :meth:`schedule` (called when the admin saves the job) builds the bank of the active
+    job in a background thread, unless it is already stored; requests arriving during a
+    build are coalesced into one more build. :meth:`knowledge_changed` waits until the
+    knowledge base has been quiet for ``debounce`` seconds, then rebuilds only if a
+    chunk cited by the bank changed or disappeared. Banks are stored as
+    ``root/<job fingerprint>.json`` and :meth:`draw` serves questions from the active one
+    to the interviews started for that same job config.
+    """
+
+    def __init__(self, root: str = QUESTION_BANK_DIR, size: int = QUESTION_BANK_SIZE,
+                 batch: int = QUESTION_BANK_BATCH, knowledge_dir: Optional[str] = None,
+                 debounce: float = QUESTION_BANK_DEBOUNCE) -> None:
+        self.root = Path(root)
+        self.size = size
+        self.batch = max(1, batch)
+        self.debounce = debounce
+        self.knowledge_dir = knowledge_dir or os.getenv("KNOWLEDGE_DIR", "knowledge")
+        self._lock = threading.Lock()
+        self._job: Optional[Dict[str, Any]] = None
+        self._bank: Optional[dict] = None
+        self._pending = False
+        # Time of the last knowledge change not yet checked against the bank
+        self._recheck_at: Optional[float] = None
+        self.skipped = 0
+        self._thread: Optional[threading.Thread] = None
+        self.status = "idle"  # idle | building | ready | error
+        self.error: Optional[str] = None
+
+    def _path(self, fingerprint: str) -> Path:
+        return self.root / f"{fingerprint}.json"
+
+    # ---- building ----
+    def schedule(self, job: Dict[str, Any]) -> None:
+        """Make ``job`` the active job and build its bank in the background, unless a
+        bank for the same config is stored already."""
+        if self.size <= 0 or not (job.get("title") or job.get("requirements")):
+            return
+        fp = job_fingerprint(job)
+        with self._lock:
+            self._job = dict(job)
+            if self._bank is None or self._bank.get("fingerprint") != fp:
+                self._bank = None
+                self.status = "idle"
+            if self._load_locked(fp):
+                return
+            self._pending = True
+            self._start_locked()
+
+    def knowledge_changed(self, job: Dict[str, Any]) -> None:
+        """Re-check the bank of ``job`` once the knowledge base has been quiet for a while."""
+        if self.size <= 0 or not (job.get("title") or job.get("requirements")):
+            return
+        with self._lock:
+            if self._job is None or job_fingerprint(self._job) != job_fingerprint(job):
+                self._job = dict(job)
+                self._pending = True
+            self._recheck_at = time.time()
+            self._start_locked()
+
+    def _start_locked(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._build_loop, name="question-bank", daemon=True)
+            self._thread.start()
+
+    def _load_locked(self, fp: str) -> bool:
+        p = self._path(fp)
+        if not p.exists():
+            return False
+        try:
+            self._bank = json.loads(p.read_text(encoding="utf-8"))
+        except ValueError:
+            return False
+        self.status = "ready"
+        return True
+
+    def _build_loop(self) -> None:
+        while True:
+            with self._lock:
+                wait = (self._recheck_at + self.debounce - time.time()) if self._recheck_at else 0.0
+                if not self._pending and self._recheck_at is None:
+                    self._thread = None
+                    return
+            if wait > 0:
+                time.sleep(wait)  # more changes may arrive; they push the deadline
+                continue
+            with self._lock:
+                rebuild, self._pending = self._pending, False
+                self._recheck_at = None
+                job = dict(self._job or {})
+                bank = self._bank
+            try:
+                if not rebuild:
+                    if bank is not None and bank.get("fingerprint") == job_fingerprint(job) and not self._stale(bank):
+                        self.skipped += 1
+                        log.info("knowledge change does not affect the bank", job=job.get("title"))
+                        continue
+                with self._lock:
+                    self.status = "building"
+                bank = self.build(job)
+                with self._lock:
+                    if self._job is not None and job_fingerprint(self._job) == bank["fingerprint"]:
+                        self._bank = bank
+                        self.status, self.error = "ready", None
+                log.info("bank ready", questions=len(bank["questions"]), job=job.get("title"))
+            except Exception as e:
+                with self._lock:
+                    self.status, self.error = "error", str(e)
+                log.error("build failed", job=job.get("title"), error=str(e))
+
+    def _stale(self, bank: dict) -> bool:
+        """Whether a chunk cited by ``bank`` changed or disappeared from the index."""
+        cited = bank.get("chunks")
+        if not cited or not bank.get("questions"):
+            return True  # bank written before chunk digests were stored, or nothing to keep
+        # Imported here: the tools package imports this module for QuestionBankTool
+        from testai.tools.rag_index import get_shared_index
+        index = get_shared_index(self.knowledge_dir)
+        index.build()
+        current = {c.chunk_id: c.content for c in index.snapshot.chunks if c.chunk_id in cited}
+        return any(cid not in current or _digest(current[cid]) != h for cid, h in cited.items())
+
+    def build(self, job: Dict[str, Any]) -> dict:
+        """Generate and store the bank for ``job`` (blocking)."""
+        # Imported here: the tools package imports this module for QuestionBankTool
+        from testai.tools.rag_index import get_shared_index
+        index = get_shared_index(self.knowledge_dir)
+        index.build()  # picks up documents added since the last refresh
+        snap = index.snapshot
+        # Distinct chunks, round-robin over the queries so every requirement is covered
+        per_query = index.search_many(job_queries(job), top_k=max(3, self.size), snapshot=snap)
+        chunks: Dict[str, dict] = {}
+        for rank in range(max((len(r) for r in per_query), default=0)):
+            for results in per_query:
+                if rank < len(results) and len(chunks) < self.size:
+                    chunks.setdefault(results[rank]["chunk_id"], results[rank])
+        questions: List[dict] = []
+        items = list(chunks.values())
+        if items:
+            llm = default_llm()
+            for i in range(0, len(items), self.batch):
+                questions += self._generate(llm, job, items[i:i + self.batch])
+        bank = {
+            "fingerprint": job_fingerprint(job),
+            "job": {k: job.get(k) or "" for k in _JOB_FIELDS},
+            "index_version": snap.version,
+            "built_at": time.time(),
+            "questions": questions,
+            # Content digests of the cited chunks, to tell whether a knowledge change matters
+            "chunks": {q["chunk_id"]: _digest(chunks[q["chunk_id"]]["content"]) for q in questions},
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        p = self._path(bank["fingerprint"])
+        tmp = p.with_name(p.name + ".part")
+        tmp.write_text(json.dumps(bank, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp, p)
+        return bank
+
+    def _generate(self, llm, job: Dict[str, Any], items: List[dict]) -> List[dict]:
+        prompt = _PROMPT.format(
+            title=job.get("title") or "",
+            experience=job.get("experience") or "niveau non précisé",
+            requirements=job.get("requirements") or "non précisées",
+            chunks="\n\n".join(f"[{c['chunk_id']}]\n{c['content']}" for c in items),
+        )
+        data = parse_json_output(llm.call([{"role": "user", "content": prompt}], cache_as=CACHE_STEP)) or {}
+        by_id = {c["chunk_id"]: c for c in items}
+        out = []
+        for q in data.get("questions") or []:
+            # Keep only questions citing one of the chunks they were generated from
+            if isinstance(q, dict) and q.get("q") and q.get("chunk_id") in by_id:
+                out.append({
+                    "q": str(q["q"]).strip(),
+                    "chunk_id": q["chunk_id"],
+                    "source": by_id[q["chunk_id"]].get("source"),
+                    "context": str(q.get("context") or by_id[q["chunk_id"]]["content"][:200]).strip(),
+                })
+        return out
+
+    # ---- reads ----
+    def draw(self, fingerprint: Optional[str], count: int = 5, seed: Optional[str] = None) -> List[dict]:
+        """Up to ``count`` questions of the active bank, citing distinct chunks when possible.
+
+        Nothing is returned unless the active bank was built for ``fingerprint`` (the job
+        config the interview started with): after the admin changes the job, interviews
+        already running fall back to RAG search instead of getting the new job's questions.
+        The selection is random but stable per ``seed`` (the session id), so candidates
+        of the same job get different questions and a resumed interview the same ones.
+        """
+        with self._lock:
+            bank = self._bank or {}
+            if not fingerprint or bank.get("fingerprint") != fingerprint:
+                return []
+            questions = list(bank.get("questions") or [])
+        rng = random.Random(seed)
+        rng.shuffle(questions)
+        picked, used = [], set()
+        for q in questions:
+            if len(picked) < count and q["chunk_id"] not in used:
+                picked.append(q)
+                used.add(q["chunk_id"])
+        for q in questions:
+            if len(picked) < count and q not in picked:
+                picked.append(q)
+        return picked
+
+    def stats(self) -> dict:
+        with self._lock:
+            bank = self._bank or {}
+            return {
+                "status": self.status,
+                "error": self.error,
+                "job_title": (self._job or {}).get("title"),
+                "fingerprint": bank.get("fingerprint"),
+                "questions": len(bank.get("questions") or []),
+                "index_version": bank.get("index_version"),
+                "built_at": bank.get("built_at"),
+                "pending": self._pending,
+                "recheck_pending": self._recheck_at is not None,
+                "skipped_rebuilds": self.skipped,
+            }
+
+
+question_bank = QuestionBank()
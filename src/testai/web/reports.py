@@ -0,0 +1,233 @@
+from __future__ import annotations
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:  # POSIX; elsewhere the backend runs a single worker
+    import fcntl
+except ImportError:
+    fcntl = None
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", os.path.join("runtime", "reports"))
+INDEX_NAME = "index.jsonl"
+LOCK_NAME = "index.lock"
+REPORT_NAME = "report.md"
+ANALYSIS_NAME = "analysis.json"
+
+_SID_RE = re.compile(r"^[A-Za-z0-9-]{1,64}$")
+
+
+def parse_json_output(text: str) -> Optional[Any]:
+    """First JSON object in an LLM output (tolerates ```json fences and trailing prose)."""
+    if not text:
+        return None
+    start = text.find("{")
+    while start != -1:
+        try:
+            obj, _ = json.JSONDecoder().raw_decode(text, start)
+            return obj
+        except ValueError:
+            start = text.find("{", start + 1)
+    return None
+
+
+@dataclass
+class ReportMeta:
+    session_id: str
+    role_title: str = ""
+    candidate_name: str = ""
+    status: str = "running"  # running | done | error
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    report_size: int = 0
+    has_analysis: bool = False
+    error: Optional[str] = None
+
+
+class ReportStore:
+    """Per-session interview reports under ``root/<session_id>/``.
+
+    Each session directory holds ``report.md`` and ``analysis.json``; ``index.jsonl``
+    is an append-only log of :class:`ReportMeta` records (last record per session
+    wins) kept in memory for listing. The log is compacted when it grows to twice the
+    number of sessions.
+
+    Several backend workers may share the directory: every read first picks up the
+    lines other workers appended since, and appends and compaction hold an exclusive
+    lock on ``index.lock``, re-reading the log before rewriting it.
+    """
+
+    def __init__(self, root: Optional[str] = None) -> None:
+        self.root = Path(root or REPORTS_DIR)
+        self._lock = threading.Lock()
+        self._meta: Dict[str, ReportMeta] = {}
+        self._log_lines = 0
+        # Position in index.jsonl read so far, and the file it belongs to (compaction replaces it)
+        self._offset = 0
+        self._inode: Optional[int] = None
+        with self._lock:
+            self._refresh()
+
+    # ---- paths ----
+    @staticmethod
+    def valid_id(session_id: str) -> bool:
+        return bool(_SID_RE.match(session_id or ""))
+
+    def session_dir(self, session_id: str) -> Path:
+        if not self.valid_id(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return self.root / session_id
+
+    def report_path(self, session_id: str) -> Path:
+        return self.session_dir(session_id) / REPORT_NAME
+
+    def analysis_path(self, session_id: str) -> Path:
+        return self.session_dir(session_id) / ANALYSIS_NAME
+
+    # ---- index ----
+    def _index_path(self) -> Path:
+        return self.root / INDEX_NAME
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        # Serializes appends and compaction across worker processes
+        if fcntl is None:
+            yield
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        with (self.root / LOCK_NAME).open("a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """Read the records appended to the index since the last call (caller holds self._lock)."""
+        p = self._index_path()
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # First read, or compacted by another worker: the new file holds every session
+            self._meta, self._offset, self._log_lines, self._inode = {}, 0, 0, st.st_ino
+        if st.st_size == self._offset:
+            return
+        with p.open("rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a line still being written is read next time
+        fields = set(ReportMeta.__dataclass_fields__)
+        for line in data[:end].splitlines():
+            try:
+                rec = json.loads(line)
+                meta = ReportMeta(**{k: v for k, v in rec.items() if k in fields})
+            except (ValueError, TypeError):
+                continue  # torn line after a crash
+            self._meta[meta.session_id] = meta
+            self._log_lines += 1
+        self._offset += end
+
+    def _append(self, meta: ReportMeta) -> None:
+        # Caller holds self._lock
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._file_lock():
+            self._refresh()
+            self._meta[meta.session_id] = meta
+            if self._log_lines >= 2 * max(len(self._meta), 64):
+                self._compact()
+                return
+            with self._index_path().open("ab") as f:
+                if f.tell() > self._offset:
+                    f.write(b"\n")  # seal a line torn by a crash
+                f.write((json.dumps(asdict(meta), ensure_ascii=False) + "\n").encode("utf-8"))
+            self._refresh()
+
+    def _compact(self) -> None:
+        # Caller holds the file lock and has just refreshed: _meta has every worker's records
+        tmp = self._index_path().with_suffix(".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for meta in sorted(self._meta.values(), key=lambda m: m.created):
+                f.write(json.dumps(asdict(meta), ensure_ascii=False) + "\n")
+        os.replace(tmp, self._index_path())
+        st = self._index_path().stat()
+        self._offset, self._inode, self._log_lines = st.st_size, st.st_ino, len(self._meta)
+
+    @staticmethod
+    def _write_atomic(path: Path, text: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, path)
+
+    # ---- writes ----
+    def open_session(self, session_id: str, role_title: str = "", candidate_name: str = "") -> ReportMeta:
+        meta = ReportMeta(session_id=session_id, role_title=role_title or "", candidate_name=candidate_name or "")
+        self.session_dir(session_id)
+        with self._lock:
+            self._refresh()
+            prev = self._meta.get(session_id)
+            if prev is not None:  # crew restarted after a backend restart
+                meta.created = prev.created
+            self._append(meta)
+        return meta
+
+    def finish(self, session_id: str, report: Optional[str] = None, analysis: Any = None,
+               error: Optional[str] = None) -> ReportMeta:
+        """Store the final report/analysis of a session and mark it done (or errored)."""
+        if report is not None:
+            self._write_atomic(self.report_path(session_id), report)
+        if analysis is not None:
+            self._write_atomic(self.analysis_path(session_id), json.dumps(analysis, ensure_ascii=False, indent=2))
+        rp = self.report_path(session_id)
+        with self._lock:
+            self._refresh()
+            prev = self._meta.get(session_id) or ReportMeta(session_id=session_id)
+            meta = ReportMeta(**asdict(prev))
+            meta.status = "error" if error else "done"
+            meta.error = error
+            meta.finished = time.time()
+            meta.report_size = rp.stat().st_size if rp.exists() else 0
+            meta.has_analysis = self.analysis_path(session_id).exists()
+            self._append(meta)
+        return meta
+
+    # ---- reads ----
+    def get(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            self._refresh()
+            meta = self._meta.get(session_id)
+            return asdict(meta) if meta else None
+
+    def list(self, offset: int = 0, limit: int = 20, status: Optional[str] = None) -> Tuple[int, List[dict]]:
+        """Newest first; returns ``(total, page)``."""
+        with self._lock:
+            self._refresh()
+            metas = [m for m in self._meta.values() if status is None or m.status == status]
+        metas.sort(key=lambda m: m.created, reverse=True)
+        offset = max(0, offset)
+        return len(metas), [asdict(m) for m in metas[offset:offset + max(0, limit)]]
+
+    def latest(self) -> Optional[dict]:
+        """Most recently finished session that produced a report."""
+        with self._lock:
+            self._refresh()
+            done = [m for m in self._meta.values() if m.report_size]
+        if not done:
+            return None
+        return asdict(max(done, key=lambda m: m.finished or m.created))
+
+    def read_report(self, session_id: str) -> Optional[str]:
+        p = self.report_path(session_id)
+        return p.read_text(encoding="utf-8") if p.exists() else None
+
+    def read_analysis(self, session_id: str) -> Optional[Any]:
+        p = self.analysis_path(session_id)
+        return json.loads(p.read_text(encoding="utf-8")) if p.exists() else None
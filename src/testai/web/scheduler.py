@@ -0,0 +1,140 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from testai.log import get_logger
+
+log = get_logger("scheduler")
+
+
+class QueueFull(Exception):
+    """Raised by :meth:`InterviewScheduler.submit` when the admission queue is at capacity."""
+
+
+@dataclass
+class _Job:
+    sid: str
+    key: str
+    fn: Callable[..., Any]
+    args: tuple
+    enqueued: float = field(default_factory=time.time)
+
+
+class InterviewScheduler:
+    """Fixed pool of crew worker threads fed by a FIFO admission queue.
+
+    At most ``max_workers`` interviews run at once and at most ``per_key_limit`` per
+    key (tenant / job offer); ``0`` means no per-key cap. A queued job is started as
+    soon as a worker is free and its key is under the cap; jobs whose key is saturated
+    are skipped without losing their place. ``max_queue`` bounds the waiting room.
+    ``on_change(sid)`` is called for every queued or started session whose visible
+    state changed (start, queue position), so clients can be notified.
+    """
+
+    def __init__(self, max_workers: int = 8, per_key_limit: int = 0, max_queue: int = 200,
+                 on_change: Optional[Callable[[str], None]] = None) -> None:
+        self.max_workers = max(1, max_workers)
+        self.per_key_limit = max(0, per_key_limit)
+        self.max_queue = max(0, max_queue)
+        self._on_change = on_change
+        self._cond = threading.Condition()
+        self._queue: Deque[_Job] = deque()
+        self._running: Dict[str, str] = {}  # sid -> key
+        self._per_key: Dict[str, int] = {}
+        self._threads: List[threading.Thread] = []
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _ensure_workers(self) -> None:
+        # Caller holds self._cond
+        while len(self._threads) < self.max_workers:
+            t = threading.Thread(target=self._worker, name=f"crew-{len(self._threads)}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, sid: str, key: str, fn: Callable[..., Any], *args: Any) -> int:
+        """Queue ``fn(*args)`` for session ``sid``. Returns the 1-based queue position."""
+        with self._cond:
+            if self.max_queue and len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{len(self._queue)} interviews already waiting")
+            self._ensure_workers()
+            self._queue.append(_Job(sid=sid, key=key or "", fn=fn, args=args))
+            pos = len(self._queue)
+            self._cond.notify()
+        return pos
+
+    def _eligible(self, job: _Job) -> bool:
+        return not self.per_key_limit or self._per_key.get(job.key, 0) < self.per_key_limit
+
+    def _next_job(self) -> Optional[_Job]:
+        # Caller holds self._cond; first eligible job in FIFO order
+        for i, job in enumerate(self._queue):
+            if self._eligible(job):
+                del self._queue[i]
+                return job
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running[job.sid] = job.key
+                self._per_key[job.key] = self._per_key.get(job.key, 0) + 1
+                self.started += 1
+                waiting = [j.sid for j in self._queue]
+            self._changed([job.sid] + waiting)
+            try:
+                job.fn(*job.args)
+            except Exception as e:
+                log.error("interview failed", session=job.sid, error=str(e))
+            finally:
+                with self._cond:
+                    self._running.pop(job.sid, None)
+                    left = self._per_key.get(job.key, 1) - 1
+                    if left > 0:
+                        self._per_key[job.key] = left
+                    else:
+                        self._per_key.pop(job.key, None)
+                    self.completed += 1
+                    # a freed key slot may unblock a job another worker skipped
+                    self._cond.notify_all()
+
+    def _changed(self, sids: List[str]) -> None:
+        if not self._on_change:
+            return
+        for sid in sids:
+            try:
+                self._on_change(sid)
+            except Exception:
+                pass
+
+    def position(self, sid: str) -> Optional[int]:
+        """1-based position in the admission queue, or None if not queued."""
+        with self._cond:
+            for i, job in enumerate(self._queue):
+                if job.sid == sid:
+                    return i + 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "max_workers": self.max_workers,
+                "per_key_limit": self.per_key_limit,
+                "max_queue": self.max_queue,
+                "running": len(self._running),
+                "queued": len(self._queue),
+                "running_per_key": dict(self._per_key),
+                "oldest_wait_s": round(time.time() - self._queue[0].enqueued, 1) if self._queue else 0.0,
+                "started": self.started,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
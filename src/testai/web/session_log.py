@@ -0,0 +1,209 @@
+from __future__ import annotations
+import os
+import json
+import time
+import threading
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Dict, List, Optional, Set
+
+from testai.log import get_logger
+
+SESSION_LOG_DIR = os.getenv("SESSION_LOG_DIR", os.path.join("runtime", "sessions"))
+# Group-commit window: records appended within it share one write + fsync per file
+SESSION_LOG_FSYNC_MS = float(os.getenv("SESSION_LOG_FSYNC_MS", "50") or 0)
+LOG_SUFFIX = ".wal"
+
+log = get_logger("wal")
+
+
+@dataclass
+class SessionRecord:
+    """Session state rebuilt from its log."""
+    session_id: str
+    meta: dict = field(default_factory=dict)
+    transcript: List[dict] = field(default_factory=list)
+    question: Optional[str] = None  # asked but not answered yet
+    done: bool = False
+    error: Optional[str] = None
+    seq: int = 0
+    created: float = 0.0
+    finished: Optional[float] = None
+
+
+class SessionLog:
+    """Append-only, per-session write-ahead log of interview events.
+
+    Every ``open``/``ask``/``answer``/``done``/``error`` event is one JSON line in
+    ``root/<sid>.wal``. A writer thread batches the records appended within
+    ``flush_interval`` seconds and issues one write + fsync per touched file; the
+    :class:`~concurrent.futures.Future` returned by :meth:`append` resolves once the
+    record is durable.
+    """
+
+    def __init__(self, root: Optional[str] = None, flush_interval: Optional[float] = None) -> None:
+        self.root = Path(root or SESSION_LOG_DIR)
+        self.flush_interval = SESSION_LOG_FSYNC_MS / 1000 if flush_interval is None else flush_interval
+        self._cond = threading.Condition()
+        # Guards _files and the log files: held by the writer for a whole batch
+        self._io_lock = threading.Lock()
+        self._pending: Dict[str, List[str]] = {}
+        self._waiters: List[Future] = []
+        self._closing: Set[str] = set()
+        self._removing: Set[str] = set()
+        self._files: Dict[str, IO[str]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.records = 0
+
+    @staticmethod
+    def _check_id(sid: str) -> str:
+        uuid.UUID(sid)  # raises ValueError; keeps arbitrary names out of root
+        return sid
+
+    def path(self, sid: str) -> Path:
+        return self.root / f"{self._check_id(sid)}{LOG_SUFFIX}"
+
+    # ---- writes ----
+    def append(self, sid: str, op: str, close: bool = False, **fields) -> Future:
+        """Queue one event; ``close`` releases the file handle after it is written."""
+        line = json.dumps({"op": op, "t": time.time(), **fields}, ensure_ascii=False) + "\n"
+        fut: Future = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer, name="session-wal", daemon=True)
+                self._thread.start()
+            self._pending.setdefault(self._check_id(sid), []).append(line)
+            if close:
+                self._closing.add(sid)
+            self._waiters.append(fut)
+            self._cond.notify()
+        return fut
+
+    def _writer(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            if self.flush_interval:
+                time.sleep(self.flush_interval)  # let concurrent sessions join this batch
+            error: Optional[BaseException] = None
+            # Lock order: _io_lock, then _cond. Readers take _io_lock too, so a batch is
+            # always visible either in _pending or on disk.
+            with self._io_lock:
+                with self._cond:
+                    batch, self._pending = self._pending, {}
+                    waiters, self._waiters = self._waiters, []
+                    closing, self._closing = self._closing, set()
+                    removing, self._removing = self._removing, set()
+                for sid, lines in batch.items():
+                    try:
+                        f = self._files.get(sid)
+                        if f is None:
+                            self.root.mkdir(parents=True, exist_ok=True)
+                            f = self._files[sid] = open(self.path(sid), "a", encoding="utf-8")
+                            if f.tell() and not self._ends_with_newline(self.path(sid)):
+                                f.write("\n")  # seal a line torn by a crash
+                        f.write("".join(lines))
+                        f.flush()
+                        os.fsync(f.fileno())
+                    except OSError as e:
+                        log.error("write failed", session=sid, error=str(e))
+                        error = e
+                for sid in closing:
+                    f = self._files.pop(sid, None)
+                    if f is not None:
+                        f.close()
+                for sid in removing:
+                    self._unlink(sid)
+            self.batches += 1
+            self.records += sum(len(v) for v in batch.values())
+            for fut in waiters:
+                if error is None:
+                    fut.set_result(None)
+                else:
+                    fut.set_exception(error)
+
+    @staticmethod
+    def _ends_with_newline(path: Path) -> bool:
+        with path.open("rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def remove(self, sid: str) -> None:
+        """Delete a session's log (after it has been archived elsewhere).
+
+        If records are still queued, the writer deletes the file right after
+        flushing them, so an archived session never comes back at ``recover()``.
+        """
+        with self._io_lock:
+            with self._cond:
+                if sid in self._pending:
+                    self._removing.add(self._check_id(sid))
+                    return
+            self._unlink(sid)
+
+    def _unlink(self, sid: str) -> None:
+        # Caller holds self._io_lock
+        f = self._files.pop(sid, None)
+        if f is not None:
+            f.close()
+        try:
+            self.path(sid).unlink()
+        except FileNotFoundError:
+            pass
+
+    # ---- reads ----
+    def session_ids(self) -> List[str]:
+        try:
+            names = [e.name for e in os.scandir(self.root) if e.name.endswith(LOG_SUFFIX)]
+        except OSError:
+            return []
+        return [n[:-len(LOG_SUFFIX)] for n in names]
+
+    def replay(self, sid: str) -> Optional[SessionRecord]:
+        """Rebuild a session from disk, including records not flushed yet."""
+        try:
+            p = self.path(sid)
+        except ValueError:
+            return None
+        lines: List[str] = []
+        with self._io_lock:
+            with self._cond:
+                pending = list(self._pending.get(sid, ()))
+            if p.exists():
+                with p.open(encoding="utf-8") as f:
+                    lines = f.readlines()
+        if not lines and not pending:
+            return None
+        rec = SessionRecord(session_id=sid)
+        for line in lines + pending:
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                continue  # torn tail after a crash
+            op = ev.get("op")
+            rec.seq = max(rec.seq, int(ev.get("seq", 0)))
+            if op == "open":
+                rec.meta = ev.get("meta") or {}
+                rec.created = ev.get("t", 0.0)
+            elif op == "ask":
+                rec.question = ev.get("q")
+            elif op == "answer":
+                rec.transcript.append({"question": rec.question or "", "answer": ev.get("a", "")})
+                rec.question = None
+            elif op in ("done", "error"):
+                rec.done = True
+                rec.error = ev.get("error") if op == "error" else rec.error
+                rec.finished = ev.get("t")
+        return rec
+
+    def stats(self) -> dict:
+        with self._cond:
+            pending = sum(len(v) for v in self._pending.values())
+            removing = len(self._removing)
+        return {"open_files": len(self._files), "pending_records": pending, "pending_removals": removing,
+                "batches": self.batches, "records": self.records,
+                "flush_interval_ms": self.flush_interval * 1000}
@@ -0,0 +1,5 @@
+import os
+
+# No telemetry from crewAI imports during tests
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from testai.tools.rag_index import RagIndex, MARKER_NAME, sparse
+
+TOPICS = [
+    "FastAPI path parameters are declared with Python type hints and validated by pydantic.",
+    "Dependency injection in FastAPI uses Depends to share database sessions between routes.",
+    "Background tasks run after the response is sent; use them for emails or cleanup.",
+    "Pydantic models validate request bodies and serialize responses to JSON.",
+    "Uvicorn is the ASGI server; run it with workers behind a reverse proxy in production.",
+    "Middleware wraps every request: timing, CORS headers and authentication checks.",
+]
+QUERIES = [
+    "pydantic validation of request bodies",
+    "how does dependency injection work with Depends",
+    "ASGI server workers in production",
+    "middleware CORS",
+    "type hints path parameters",
+    "nothing relevant here zzz",
+]
+
+
+def _write_corpus(root):
+    for i, text in enumerate(TOPICS):
+        # repeat so files span several chunks and term frequencies differ
+        (root / f"doc{i}.txt").write_text((text + "\n") * (3 + i), encoding="utf-8")
+
+
+def _index(tmp_path, backend, scoring):
+    return RagIndex(str(tmp_path / "kb"), chunk_size=200, overlap=40, backend=backend, scoring=scoring,
+                    index_path=str(tmp_path / f"{backend}-{scoring}.json.gz"), workers=1)
+
+
+@pytest.mark.skipif(sparse is None, reason="NumPy/SciPy not installed")
+@pytest.mark.parametrize("scoring", ["tfidf", "bm25", "bm25+"])
+def test_sparse_and_python_rankings_match(tmp_path, scoring):
+    (tmp_path / "kb").mkdir()
+    _write_corpus(tmp_path / "kb")
+    fast, slow = _index(tmp_path, "sparse", scoring), _index(tmp_path, "python", scoring)
+    assert fast.use_sparse and not slow.use_sparse
+    for got, want in zip(fast.search_many(QUERIES, top_k=4), slow.search_many(QUERIES, top_k=4)):
+        assert [r["chunk_id"] for r in got] == [r["chunk_id"] for r in want]
+        assert [r["score"] for r in got] == pytest.approx([r["score"] for r in want], abs=1e-4)
+
+
+def test_query_cache_is_dropped_after_rebuild(tmp_path):
+    from testai.tools.rag_index import get_shared_index
+    from testai.tools.rag_tool import RAGSearchTool, get_query_cache
+
+    kb = tmp_path / "kb"
+    kb.mkdir()
+    (kb / "a.txt").write_text("Uvicorn runs the ASGI application.", encoding="utf-8")
+    index = get_shared_index(str(kb), index_path=str(tmp_path / "idx.json.gz"), workers=1)
+    tool = RAGSearchTool(knowledge_dir=str(kb))
+    cache = get_query_cache(str(kb))
+
+    first = tool._run("asgi uvicorn")
+    assert tool._run("Uvicorn, ASGI?") == first  # same bag of tokens
+    assert cache.hits == 1
+
+    (kb / "b.txt").write_text("Gunicorn manages uvicorn ASGI workers.", encoding="utf-8")
+    (kb / MARKER_NAME).touch()
+    os.utime(kb / MARKER_NAME, (index._marker_mtime + 10,) * 2)
+    index.build()
+
+    fresh = tool._run("asgi uvicorn")
+    assert fresh != first and "b.txt" in fresh
+    assert cache.invalidations == 1
@@ -0,0 +1,42 @@
+import uuid
+
+from testai.web.reports import ReportStore, INDEX_NAME
+
+
+def _lines(store):
+    return (store.root / INDEX_NAME).read_text(encoding="utf-8").splitlines()
+
+
+def test_index_is_compacted_to_one_record_per_session(tmp_path):
+    store = ReportStore(str(tmp_path))
+    sids = [str(uuid.uuid4()) for _ in range(50)]
+    for sid in sids:
+        store.open_session(sid, role_title="dev")
+    for sid in sids:
+        store.finish(sid, report=f"# {sid}")
+    for sid in sids[:30]:
+        store.finish(sid, error="retry")
+    # 130 records for 50 sessions: the log is rewritten once it reaches 2 * 64 lines
+    assert len(_lines(store)) < 130
+
+    total, page = store.list(limit=100)
+    assert total == 50
+    assert {m["session_id"]: m["status"] for m in page} == {sid: "error" if i < 30 else "done"
+                                                           for i, sid in enumerate(sids)}
+    reloaded = ReportStore(str(tmp_path))
+    assert reloaded.list(limit=100)[0] == 50
+    assert reloaded.get(sids[0])["status"] == "error"
+    assert reloaded.get(sids[-1])["report_size"] > 0
+
+
+def test_compaction_keeps_records_of_other_workers(tmp_path):
+    a, b = ReportStore(str(tmp_path)), ReportStore(str(tmp_path))
+    sids = [str(uuid.uuid4()) for _ in range(50)]
+    for i, sid in enumerate(sids):
+        (a if i % 2 else b).open_session(sid)
+    for _ in range(2):
+        for i, sid in enumerate(sids):
+            (b if i % 2 else a).finish(sid)
+    assert len(_lines(a)) < 150
+    assert a.list(limit=100)[0] == b.list(limit=100)[0] == 50
+    assert {m["status"] for m in b.list(limit=100)[1]} == {"done"}
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import pytest
+
+from testai.web.scheduler import InterviewScheduler, QueueFull
+
+
+def _wait_for(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_worker_limit_per_key_cap_and_fifo_skip():
+    release = threading.Event()
+    started = []
+
+    def job(sid):
+        started.append(sid)
+        release.wait(2)
+
+    sched = InterviewScheduler(max_workers=3, per_key_limit=2, max_queue=10)
+    for sid, key in [("a1", "a"), ("a2", "a"), ("a3", "a"), ("b1", "b"), ("b2", "b")]:
+        sched.submit(sid, key, job, sid)
+
+    _wait_for(lambda: len(started) == 3)
+    time.sleep(0.05)
+    # a3 is skipped (key "a" at its cap) without losing its place to b2
+    assert sorted(started) == ["a1", "a2", "b1"]
+    stats = sched.stats()
+    assert stats["running"] == 3 and stats["running_per_key"] == {"a": 2, "b": 1}
+    assert sched.position("a3") == 1 and sched.position("b2") == 2
+
+    release.set()
+    _wait_for(lambda: sched.stats()["completed"] == 5)
+    assert sorted(started[3:]) == ["a3", "b2"]
+
+
+def test_full_queue_rejects():
+    release = threading.Event()
+    sched = InterviewScheduler(max_workers=1, max_queue=1)
+    sched.submit("s1", "", release.wait, 2)
+    _wait_for(lambda: sched.stats()["running"] == 1)
+    assert sched.submit("s2", "", release.wait, 2) == 1
+    with pytest.raises(QueueFull):
+        sched.submit("s3", "", release.wait, 2)
+    assert sched.stats()["rejected"] == 1
+    release.set()
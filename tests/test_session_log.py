@@ -0,0 +1,58 @@
+import asyncio
+import uuid
+
+from testai.web.broker import InterviewBroker
+from testai.web.session_log import SessionLog
+
+
+def test_replay_rebuilds_transcript_and_skips_torn_tail(tmp_path):
+    wal = SessionLog(str(tmp_path), flush_interval=0)
+    sid = str(uuid.uuid4())
+    wal.append(sid, "open", meta={"role": "dev"}, seq=0)
+    wal.append(sid, "ask", q="Q1", seq=1)
+    wal.append(sid, "answer", a="A1", seq=1)
+    wal.append(sid, "ask", q="Q2", seq=2).result()
+    with wal.path(sid).open("a", encoding="utf-8") as f:
+        f.write('{"op": "answer", "a": "to')  # crash mid-write
+
+    rec = SessionLog(str(tmp_path)).replay(sid)
+    assert rec.meta == {"role": "dev"}
+    assert rec.transcript == [{"question": "Q1", "answer": "A1"}]
+    assert rec.question == "Q2"
+    assert not rec.done and rec.seq == 2
+
+
+def test_remove_waits_for_queued_records(tmp_path):
+    wal = SessionLog(str(tmp_path), flush_interval=0.2)
+    sid = str(uuid.uuid4())
+    wal.append(sid, "open", meta={})
+    done = wal.append(sid, "done", close=True)
+    wal.remove(sid)  # records still queued
+    done.result()
+    assert wal.session_ids() == []
+
+
+def test_broker_recovers_running_session_and_replays_answers(tmp_path):
+    async def run_first():
+        broker = InterviewBroker(log=SessionLog(str(tmp_path / "wal"), flush_interval=0),
+                                 archive_dir=str(tmp_path / "archive"))
+        sid = broker.new_session({"job": "x"})
+        ask = asyncio.create_task(broker.ask(sid, "Q1"))
+        await asyncio.sleep(0.05)
+        await broker.answer(sid, "A1")
+        assert await ask == "A1"
+        asyncio.create_task(broker.ask(sid, "Q2"))
+        await asyncio.sleep(0.05)
+        return sid
+
+    sid = asyncio.run(run_first())
+
+    async def run_second():
+        broker = InterviewBroker(log=SessionLog(str(tmp_path / "wal"), flush_interval=0),
+                                 archive_dir=str(tmp_path / "archive"))
+        assert broker.recover() == [(sid, {"job": "x"})]
+        assert broker.poll_state(sid)["question"] == "Q2"
+        # The resumed crew gets the recorded answer instead of asking Q1 again
+        assert await broker.ask(sid, "Q1 (regenerated)") == "A1"
+
+    asyncio.run(run_second())